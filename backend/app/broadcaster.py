@@ -0,0 +1,287 @@
+"""
+WebSocket Fan-out Broadcaster
+Every connected client gets its own bounded send queue and writer task
+
+Key Features:
+- Tokens are enqueued for every peer without awaiting any socket
+- The same Message object is shared by all queues and encoded once per format
+- One slow client (e.g. overlay while Tk is busy) can't stall the others
+- Slow consumers are coalesced or dropped by policy
+- Clients are kept in sets keyed by role for O(1) add/remove
+- Broadcasts only reach clients subscribed to the message's topic
+- Broadcasts can be scoped to one session's clients
+- The writer task also sends keepalives when the queue is idle
+- TokenCoalescer batches LLM tokens into a few frames per response
+"""
+
+import asyncio
+from collections import defaultdict, deque
+from typing import Dict, Optional, Set
+
+from fastapi import WebSocket
+
+from .protocol import Message, MSG_TOKEN, MESSAGE_TOPICS, ALL_TOPICS, PING, token_message
+
+# Max queued frames per client before the slow-client policy kicks in
+SEND_QUEUE_SIZE = 256
+
+# "coalesce": merge queued tokens into one frame, drop the client only if that isn't enough
+# "drop": disconnect a client as soon as its queue is full
+SLOW_CLIENT_POLICY = "coalesce"
+
+# Send an empty frame after this many idle seconds (keeps long generations alive)
+KEEPALIVE_INTERVAL = 20
+
+# Close code for clients dropped for being too slow ("try again later")
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+# Token coalescing: flush buffered LLM tokens as one frame every window or byte budget
+# (COALESCE_WINDOW_MS = 0 sends every token as its own frame)
+COALESCE_WINDOW_MS = 20
+COALESCE_MAX_BYTES = 512
+
+
+class ClientConnection:
+    """A connected WebSocket with its own send queue"""
+
+    def __init__(self, websocket: WebSocket, role: str, structured: bool = False,
+                 topics: frozenset = ALL_TOPICS, session: str = "default"):
+        self.websocket = websocket
+        self.role = role
+        self.session = session  # Conversation this client belongs to
+        self.structured = structured  # JSON envelope vs legacy strings
+        self.topics = topics  # Broadcast topics this client wants
+        self.queue = deque()  # Message objects
+        self.closed = False
+        self.sent = 0
+        self.coalesced = 0
+        self._ready = asyncio.Event()
+        self.writer: Optional[asyncio.Task] = None
+
+    def enqueue(self, message: Message) -> bool:
+        """Queue a frame; returns False if the client can't keep up"""
+        if self.closed:
+            return False
+
+        if len(self.queue) >= SEND_QUEUE_SIZE:
+            if (SLOW_CLIENT_POLICY == "coalesce" and message.type == MSG_TOKEN
+                    and self.queue and self.queue[-1].type == MSG_TOKEN):
+                # Merge into the last pending token frame (new object - queued ones may be shared)
+                self.queue[-1] = token_message(self.queue[-1].get("text", "") + message.get("text", ""))
+                self.coalesced += 1
+                return True
+            return False
+
+        self.queue.append(message)
+        self._ready.set()
+        return True
+
+    async def run_writer(self, on_error):
+        """Drain the queue to the socket; the only task that sends on this socket"""
+        try:
+            while not self.closed:
+                if not self.queue:
+                    self._ready.clear()
+                    try:
+                        await asyncio.wait_for(self._ready.wait(), KEEPALIVE_INTERVAL)
+                    except asyncio.TimeoutError:
+                        self.queue.append(PING)  # Keepalive
+                    continue
+
+                frame = self.queue.popleft().encode(self.structured)
+                if frame is None:
+                    continue  # No representation in this client's protocol
+                await self.websocket.send_text(frame)
+                self.sent += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Send error ({self.role}): {e}")
+            on_error(self)
+
+
+class Broadcaster:
+    """
+    Fan-out hub for all connected WebSocket clients
+
+    Usage:
+        broadcaster.register(websocket, role="overlay", structured=True,
+                             topics=parse_topics("emotion,speech-control"))
+        broadcaster.send(websocket, END)
+        broadcaster.broadcast(token_message(text))
+    """
+
+    def __init__(self):
+        self.clients: Dict[str, Set[ClientConnection]] = defaultdict(set)
+        self._connections: Dict[WebSocket, ClientConnection] = {}
+        self.dropped = 0
+        self.filtered = 0  # Frames not sent because nobody subscribed
+
+    def __len__(self):
+        return len(self._connections)
+
+    def register(self, websocket: WebSocket, role: str = "client", structured: bool = False,
+                 topics: frozenset = ALL_TOPICS, session: str = "default") -> ClientConnection:
+        """Track a newly accepted socket and start its writer task"""
+        conn = ClientConnection(websocket, role, structured, topics, session)
+        self.clients[role].add(conn)
+        self._connections[websocket] = conn
+        conn.writer = asyncio.create_task(conn.run_writer(self._on_send_error))
+        return conn
+
+    def unregister(self, websocket: WebSocket):
+        """Forget a socket and stop its writer"""
+        conn = self._connections.pop(websocket, None)
+        if conn is None:
+            return
+        conn.closed = True
+        self.clients[conn.role].discard(conn)
+        if not self.clients[conn.role]:
+            del self.clients[conn.role]
+        if conn.writer and not conn.writer.done():
+            conn.writer.cancel()
+
+    def is_connected(self, websocket: WebSocket) -> bool:
+        return websocket in self._connections
+
+    def get(self, websocket: WebSocket) -> Optional[ClientConnection]:
+        return self._connections.get(websocket)
+
+    def has_clients(self, session: str = None) -> bool:
+        """Any client connected (to the given session, if one is given)"""
+        if session is None:
+            return bool(self._connections)
+        return any(conn.session == session for conn in self._connections.values())
+
+    def send(self, websocket: WebSocket, message: Message) -> bool:
+        """Queue a frame for one client (direct replies ignore subscriptions)"""
+        conn = self._connections.get(websocket)
+        if conn is None:
+            return False
+        if not conn.enqueue(message):
+            self._drop(conn)
+            return False
+        return True
+
+    def broadcast(self, message: Message, exclude: WebSocket = None, session: str = None) -> int:
+        """
+        Queue the same frame for every subscribed client; returns recipients
+        Optionally excludes one socket and/or limits delivery to one session.
+        """
+        topic = MESSAGE_TOPICS.get(message.type)
+        count = 0
+        slow = []
+        for websocket, conn in self._connections.items():
+            if websocket is exclude:
+                continue
+            if session is not None and conn.session != session:
+                continue
+            if topic is not None and topic not in conn.topics:
+                self.filtered += 1
+                continue
+            if conn.enqueue(message):
+                count += 1
+            else:
+                slow.append(conn)
+
+        for conn in slow:
+            self._drop(conn)
+        return count
+
+    def _drop(self, conn: ClientConnection):
+        """Disconnect a client that can't keep up"""
+        if conn.closed:
+            return
+        print(f"🐢 Dropping slow client ({conn.role}, {len(conn.queue)} frames queued)")
+        self.dropped += 1
+        self.unregister(conn.websocket)
+        asyncio.create_task(self._close(conn.websocket, SLOW_CLIENT_CLOSE_CODE))
+
+    def _on_send_error(self, conn: ClientConnection):
+        self.unregister(conn.websocket)
+
+    async def _close(self, websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
+
+    def get_stats(self):
+        """Get per-role connection stats"""
+        sessions = defaultdict(int)
+        for conn in self._connections.values():
+            sessions[conn.session] += 1
+        return {
+            "clients": len(self._connections),
+            "roles": {role: len(conns) for role, conns in self.clients.items()},
+            "sessions": dict(sessions),
+            "queued": sum(len(c.queue) for c in self._connections.values()),
+            "coalesced": sum(c.coalesced for c in self._connections.values()),
+            "dropped": self.dropped,
+            "filtered": self.filtered,
+        }
+
+
+class TokenCoalescer:
+    """
+    Micro-batches streamed tokens between the LLM and the sockets
+
+    Tokens are buffered and flushed to the sink as a single frame when the
+    time window elapses or the byte budget is reached, so a response goes
+    out as a few frames instead of hundreds.
+
+    Usage:
+        with TokenCoalescer(sink) as out:
+            async for token in stream:
+                out.push(token)
+        # Remaining text is flushed on exit
+    """
+
+    def __init__(self, sink, window_ms: float = None, max_bytes: int = None):
+        self.sink = sink
+        self.window = (COALESCE_WINDOW_MS if window_ms is None else window_ms) / 1000
+        self.max_bytes = COALESCE_MAX_BYTES if max_bytes is None else max_bytes
+        self._parts = []
+        self._size = 0
+        self._timer = None
+
+        # Stats
+        self.tokens = 0
+        self.frames = 0
+
+    def push(self, token: str):
+        """Buffer a token; flushes when the byte budget is reached"""
+        if not token:
+            return
+        self._parts.append(token)
+        self._size += len(token.encode("utf-8"))
+        self.tokens += 1
+
+        if self.window <= 0 or self._size >= self.max_bytes:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+
+    def flush(self):
+        """Send everything buffered so far as one frame"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._parts:
+            return
+        text = "".join(self._parts)
+        self._parts = []
+        self._size = 0
+        self.frames += 1
+        self.sink(text)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
+
+
+# Global instance
+broadcaster = Broadcaster()
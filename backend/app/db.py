@@ -1,9 +1,54 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 DATABASE_URL = "sqlite:///alisa_memory.db"
 
+# SQLite storage profile (applied to every new connection)
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",        # Readers don't block the write-behind thread (and vice versa)
+    "synchronous": "NORMAL",      # Safe with WAL, no fsync on every commit
+    "cache_size": -16000,         # Page cache in KiB (negative = size, not pages) -> 16 MB
+    "mmap_size": 64 * 1024 * 1024,  # Memory-map the first 64 MB of the DB file
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
+# Indexes for databases created before they were declared on the models
+# (CREATE INDEX IF NOT EXISTS makes this safe to run on every startup)
+MIGRATIONS = [
+    "CREATE INDEX IF NOT EXISTS ix_conversation_history_session_ts "
+    "ON conversation_history (session_id, timestamp)",
+]
+
+
+def configure_sqlite(engine):
+    """Apply SQLITE_PRAGMAS to each connection the engine opens"""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+configure_sqlite(engine)
 SessionLocal = sessionmaker(bind=engine)
 
 Base = declarative_base()
+
+
+def init_db(bind=None):
+    """Create missing tables, then bring indexes on existing databases up to date"""
+    from . import models  # noqa: F401 - registers the tables on Base
+
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    with bind.begin() as conn:
+        for statement in MIGRATIONS:
+            conn.execute(text(statement))
+        if bind.dialect.name == "sqlite":
+            conn.execute(text("PRAGMA optimize"))  # Refresh query planner stats
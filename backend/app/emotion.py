@@ -8,7 +8,7 @@ def extract_emotion(text: str):
     valid_emotions = ["teasing", "calm", "serious", "happy", "sad", "neutral"]
     
     # Case 1: Proper format with tag
-    if text.startswith("<emotion="):
+    if text.startswith("<emotion=") and ">" in text:
         tag = text.split(">")[0]
         emotion = tag.replace("<emotion=", "")
         clean_text = text.split(">", 1)[1].strip()
@@ -37,3 +37,100 @@ def extract_emotion(text: str):
     
     # Case 4: No emotion detected, add neutral
     return "neutral", text.strip()
+
+
+# Emotions the bare-word fallback recognizes (same list as extract_emotion)
+VALID_EMOTIONS = ["teasing", "calm", "serious", "happy", "sad", "neutral"]
+
+EMOTION_TAG_PREFIX = "<emotion="
+
+# Give up looking for a tag after this many characters (no tag -> neutral)
+EMOTION_MAX_PREFIX = 40
+
+
+class EmotionStreamParser:
+    """
+    Streaming version of extract_emotion
+
+    Tokens are held back only until the emotion is known (normally the
+    first few tokens). The emotion is reported right away through
+    on_emotion and everything after the tag is passed through as clean
+    text, so clients never see the raw <emotion=...> tag.
+
+    Usage:
+        parser = EmotionStreamParser(on_emotion=send_emotion)
+        async for token in stream:
+            out.push(parser.feed(token))
+        out.push(parser.finish())
+        parser.emotion, parser.text  # Same result as extract_emotion(full_response)
+    """
+
+    def __init__(self, on_emotion=None, max_prefix: int = EMOTION_MAX_PREFIX):
+        self.on_emotion = on_emotion
+        self.max_prefix = max_prefix
+        self.emotion = None
+        self.text = ""  # Clean text emitted so far
+        self._pending = ""  # Raw text held back while the emotion is undecided
+        self._started = False  # Leading whitespace of the body is dropped
+
+    def _decide(self, emotion: str, rest: str) -> str:
+        self.emotion = emotion
+        self._pending = ""
+        if self.on_emotion:
+            self.on_emotion(emotion)
+        return self._emit(rest)
+
+    def _emit(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        self.text += text
+        return text
+
+    def _try_decide(self):
+        """Emotion and remaining text if the held-back prefix settles it, else None"""
+        head = self._pending.lstrip()
+        lowered = head.lower()
+        if not head:
+            return None
+
+        # Proper tag: <emotion=happy>
+        if lowered.startswith(EMOTION_TAG_PREFIX):
+            end = head.find(">")
+            if end != -1:
+                return head[len(EMOTION_TAG_PREFIX):end].strip(), head[end + 1:]
+            return None if len(head) <= self.max_prefix else ("neutral", head)
+        if EMOTION_TAG_PREFIX.startswith(lowered):
+            return None  # Tag still arriving
+
+        # Bare emotion word at the start ("happy Hello"), only once content follows
+        for emotion in VALID_EMOTIONS:
+            if emotion.startswith(lowered):
+                return None  # Could still become an emotion word
+            if lowered.startswith(emotion):
+                rest = head[len(emotion):]
+                if rest[0] not in " \n":
+                    continue  # "happyness" - not the emotion word
+                return (emotion, rest) if rest.strip() else None
+
+        return "neutral", head
+
+    def feed(self, token: str) -> str:
+        """Consume a token; returns the clean text to forward (may be empty)"""
+        if self.emotion is not None:
+            return self._emit(token)
+
+        self._pending += token
+        decided = self._try_decide()
+        if decided is None and len(self._pending.lstrip()) > self.max_prefix:
+            decided = "neutral", self._pending.lstrip()
+        if decided is None:
+            return ""
+        return self._decide(*decided)
+
+    def finish(self) -> str:
+        """End of stream: settle the emotion and return any text still held back"""
+        if self.emotion is not None:
+            return ""
+        emotion, clean_text = extract_emotion(self._pending.strip())
+        return self._decide(emotion, clean_text)
@@ -1,20 +1,124 @@
 import httpx
 import json
+import os
+from collections import OrderedDict
 
 LLM_URL = "http://127.0.0.1:8080/v1/chat/completions"
 
-async def stream_llm_response(messages):
-    async with httpx.AsyncClient(timeout=None) as client:
-        async with client.stream(
+# Connection settings for the local llama.cpp server
+LLM_CONNECT_TIMEOUT = 5.0     # seconds to establish the TCP connection
+LLM_READ_TIMEOUT = 120.0      # max gap between streamed chunks (covers prompt eval)
+LLM_WRITE_TIMEOUT = 10.0
+LLM_POOL_TIMEOUT = 10.0       # max wait for a free pooled connection
+LLM_MAX_CONNECTIONS = 4
+LLM_MAX_KEEPALIVE = 4
+LLM_KEEPALIVE_EXPIRY = 300.0  # keep idle connections warm between turns
+
+# Prompt caching on the llama.cpp server
+LLM_CACHE_PROMPT = True  # Reuse the KV cache for the common prompt prefix
+LLM_PARALLEL_SLOTS = int(os.getenv("ALISA_LLM_SLOTS", "1"))  # Match llama-server -np
+
+# HTTP/2 needs the optional "h2" package (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class LLMClient:
+    """
+    Process-wide HTTP client for the LLM server.
+    One pooled httpx.AsyncClient is reused for every generation so turns
+    skip the TCP connect and ride a kept-alive connection.
+    Started and closed by the FastAPI lifespan in main.py.
+    """
+
+    def __init__(self, url=LLM_URL, slots=LLM_PARALLEL_SLOTS):
+        self.url = url
+        self.slots = max(1, slots)
+        self._slot_map = OrderedDict()  # slot_key -> llama.cpp slot id (LRU)
+        self._client = None
+
+    def start(self):
+        """Create the pooled client (idempotent)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    connect=LLM_CONNECT_TIMEOUT,
+                    read=LLM_READ_TIMEOUT,
+                    write=LLM_WRITE_TIMEOUT,
+                    pool=LLM_POOL_TIMEOUT
+                ),
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                    keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+                ),
+                http2=HTTP2_AVAILABLE
+            )
+            print(f"🔗 LLM client ready ({'HTTP/2' if HTTP2_AVAILABLE else 'HTTP/1.1'} keep-alive pool)")
+        return self._client
+
+    async def close(self):
+        """Close pooled connections"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            print("🔌 LLM client closed")
+        self._client = None
+
+    def slot_for(self, slot_key: str) -> int:
+        """
+        Stable llama.cpp slot for a conversation so its cached prefix survives
+        between turns; the least recently used key gives up its slot when all are taken
+        """
+        if slot_key in self._slot_map:
+            self._slot_map.move_to_end(slot_key)
+            return self._slot_map[slot_key]
+
+        if len(self._slot_map) < self.slots:
+            slot = len(self._slot_map)
+        else:
+            _, slot = self._slot_map.popitem(last=False)
+        self._slot_map[slot_key] = slot
+        return slot
+
+    def build_payload(self, messages, slot_key: str = None):
+        """Request body for a streamed chat completion"""
+        payload = {
+            "model": "local",
+            "messages": messages,
+            "stream": True,
+            "temperature": 0.7,
+            "repeat_penalty": 1.1,
+            "cache_prompt": LLM_CACHE_PROMPT
+        }
+        if slot_key is not None:
+            payload["id_slot"] = self.slot_for(slot_key)
+        return payload
+
+    @property
+    def client(self):
+        # Lazily start when used outside the app lifespan (scripts, tests)
+        return self.start()
+
+    async def prefill(self, messages, slot_key: str = None):
+        """
+        Evaluate a prompt into the slot's KV cache without generating (n_predict=0)
+        The next request sharing this prefix only evaluates what changed
+        """
+        payload = self.build_payload(messages, slot_key)
+        payload["stream"] = False
+        payload["n_predict"] = 0
+        response = await self.client.post(self.url, json=payload)
+        response.raise_for_status()
+
+    async def stream(self, messages, slot_key: str = None):
+        """Stream content tokens for a chat completion"""
+        async with self.client.stream(
             "POST",
-            LLM_URL,
-            json={
-                "model": "local",
-                "messages": messages,
-                "stream": True,
-                "temperature": 0.7,
-                "repeat_penalty": 1.1
-            }
+            self.url,
+            json=self.build_payload(messages, slot_key)
         ) as response:
             async for line in response.aiter_lines():
                 if not line:
@@ -29,3 +133,16 @@ async def stream_llm_response(messages):
                             yield token
                     except Exception:
                         pass
+
+
+# Global instance
+llm_client = LLMClient()
+
+
+async def stream_llm_response(messages, slot_key: str = None):
+    async for token in llm_client.stream(messages, slot_key=slot_key):
+        yield token
+
+
+async def prefill_llm_prompt(messages, slot_key: str = None):
+    await llm_client.prefill(messages, slot_key=slot_key)
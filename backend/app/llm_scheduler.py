@@ -0,0 +1,299 @@
+"""
+LLM Request Scheduler
+Serializes access to the single llama.cpp slot by priority
+
+Priority classes (lower number = more important):
+- user chat > confirmation prompts > speculative prefill > vision reactions > idle thoughts
+
+A new higher-priority request preempts an in-flight background
+generation (vision/idle) immediately instead of waiting behind it.
+
+cancel(owner) aborts a session's generations on request (barge-in): the
+HTTP stream is closed so llama.cpp stops generating and the slot is free.
+preempt() interrupts a running prefill the same way (its request is closed).
+"""
+
+import asyncio
+import heapq
+import itertools
+from typing import Optional
+
+from .llm_client import stream_llm_response, prefill_llm_prompt
+
+# Priority classes
+PRIORITY_USER = 0
+PRIORITY_CONFIRMATION = 1
+PRIORITY_PREFILL = 2  # Prompt warm-up from partial transcripts (prefill.py)
+PRIORITY_VISION = 3
+PRIORITY_IDLE = 4
+
+PRIORITY_NAMES = {
+    PRIORITY_USER: "user",
+    PRIORITY_CONFIRMATION: "confirmation",
+    PRIORITY_PREFILL: "prefill",
+    PRIORITY_VISION: "vision",
+    PRIORITY_IDLE: "idle",
+}
+
+# Background generations that may be cancelled by more important requests
+PREEMPTIBLE_PRIORITIES = {PRIORITY_VISION, PRIORITY_IDLE}
+
+MAX_PENDING_REQUESTS = 8
+
+_END = object()
+
+
+class LLMPreempted(Exception):
+    """Raised in the consumer when its generation was cancelled by a higher-priority request"""
+
+
+class LLMCancelled(LLMPreempted):
+    """Raised in the consumer when its owner cancelled the generation (barge-in)"""
+
+
+class LLMQueueFull(Exception):
+    """Raised when the bounded request queue has no room for this request"""
+
+
+class LLMRequest:
+    """A single scheduled generation"""
+
+    def __init__(self, priority: int, seq: int, label: str = "", owner: str = None):
+        self.priority = priority
+        self.seq = seq
+        self.label = label or PRIORITY_NAMES.get(priority, str(priority))
+        self.granted: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.tokens: asyncio.Queue = asyncio.Queue()
+        self.producer: Optional[asyncio.Task] = None
+        self.preempted = False
+        self.owner = owner  # Session that may cancel this request
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class LLMScheduler:
+    """
+    Single-slot, priority-ordered access to the LLM
+
+    Usage:
+        async with aclosing(llm_scheduler.stream(messages, PRIORITY_USER)) as tokens:
+            async for token in tokens:
+                ...
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING_REQUESTS,
+                 stream_response=stream_llm_response, prefill_prompt=prefill_llm_prompt):
+        self.max_pending = max_pending
+        self.stream_response = stream_response  # async gen (messages, slot_key) -> tokens
+        self.prefill_prompt = prefill_prompt    # async fn (messages, slot_key)
+        self.active: Optional[LLMRequest] = None
+        self._pending = []  # heap of LLMRequest
+        self._seq = itertools.count()
+
+        # Stats
+        self.completed = 0
+        self.preempted = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.prefilled = 0
+        self.skipped = 0
+
+    async def stream(self, messages, priority: int = PRIORITY_USER, label: str = "",
+                     slot_key: str = None, owner: str = None):
+        """
+        Wait for the LLM slot according to priority, then stream tokens.
+        Raises LLMPreempted if a more important request cancels this one,
+        LLMCancelled if cancel(owner) aborts it,
+        LLMQueueFull if the queue is full of more important requests.
+        slot_key keeps related requests on the same llama.cpp slot (KV-cache reuse).
+        Iterate it inside contextlib.aclosing(): a consumer that breaks out early
+        only cancels the producer and frees the slot when the generator is closed,
+        which CPython otherwise defers to garbage collection.
+        """
+        request = LLMRequest(priority, next(self._seq), label, owner)
+        await self._acquire(request)
+
+        try:
+            request.producer = asyncio.create_task(self._produce(request, messages, slot_key))
+            while True:
+                item = await request.tokens.get()
+                if item is _END:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+
+            if request.cancelled:
+                raise LLMCancelled(f"{request.label} generation cancelled")
+            if request.preempted:
+                raise LLMPreempted(f"{request.label} generation preempted")
+            self.completed += 1
+        finally:
+            if request.producer and not request.producer.done():
+                request.producer.cancel()
+            self._release(request)
+
+    async def prefill(self, messages, slot_key: str = None, should_run=None) -> bool:
+        """
+        Warm the LLM's KV cache with a prompt prefix (no tokens generated)
+        Runs at PRIORITY_PREFILL: preempts background chatter, yields to user turns.
+        should_run() is checked once the slot is granted - a prefill that went
+        stale while queued is skipped. Returns True if the prompt was evaluated,
+        False if it was skipped or preempt() interrupted it.
+        """
+        request = LLMRequest(PRIORITY_PREFILL, next(self._seq))
+        await self._acquire(request)
+        try:
+            if should_run is not None and not should_run():
+                self.skipped += 1
+                return False
+            # Own task, so preempt() can cancel the request without cancelling the caller
+            request.producer = asyncio.create_task(self.prefill_prompt(messages, slot_key=slot_key))
+            await asyncio.wait({request.producer})
+            if request.producer.cancelled():
+                return False
+            request.producer.result()  # Re-raise request errors
+            self.prefilled += 1
+            return True
+        finally:
+            if request.producer and not request.producer.done():
+                request.producer.cancel()
+            self._release(request)
+
+    async def _produce(self, request: LLMRequest, messages, slot_key: str = None):
+        """Pull tokens from the LLM into the request's queue"""
+        try:
+            async for token in self.stream_response(messages, slot_key=slot_key):
+                request.tokens.put_nowait(token)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            request.tokens.put_nowait(e)
+        finally:
+            request.tokens.put_nowait(_END)
+
+    async def _acquire(self, request: LLMRequest):
+        """Grant the slot immediately, preempt a background job, or queue"""
+        if self.active is None and not self._pending:
+            self._grant(request)
+            return
+
+        if (self.active is not None
+                and self.active.priority in PREEMPTIBLE_PRIORITIES
+                and request.priority < self.active.priority):
+            self.preempt(f"for {request.label} request")
+
+        if len(self._pending) >= self.max_pending:
+            worst = max(self._pending)
+            if request < worst:
+                # Drop the least important waiter to make room
+                self._pending.remove(worst)
+                heapq.heapify(self._pending)
+                worst.granted.set_exception(LLMQueueFull(f"{worst.label} request dropped"))
+                self.rejected += 1
+            else:
+                self.rejected += 1
+                raise LLMQueueFull(f"LLM queue full ({self.max_pending} pending)")
+
+        heapq.heappush(self._pending, request)
+        if self.active is None:
+            self._dispatch()
+            if self.active is request:
+                return
+        print(f"⏳ LLM busy ({self.active.label if self.active else 'handoff'}), "
+              f"queued {request.label} request ({len(self._pending)} pending)")
+
+        try:
+            await request.granted
+        except asyncio.CancelledError:
+            if request in self._pending:
+                self._pending.remove(request)
+                heapq.heapify(self._pending)
+            elif self.active is request:
+                self._release(request)
+            raise
+
+    def _grant(self, request: LLMRequest):
+        self.active = request
+        if not request.granted.done():
+            request.granted.set_result(True)
+
+    def _release(self, request: LLMRequest):
+        """Free the slot and hand it to the most important waiter"""
+        if self.active is not request:
+            return
+        self.active = None
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand the free slot to the most important live waiter"""
+        while self._pending:
+            nxt = heapq.heappop(self._pending)
+            if not nxt.granted.done():
+                self._grant(nxt)
+                break
+
+    def preempt(self, reason: str = "") -> bool:
+        """Cancel the in-flight generation; its consumer receives LLMPreempted"""
+        request = self.active
+        if request is None or request.preempted:
+            return False
+        request.preempted = True
+        self.preempted += 1
+        print(f"✋ Preempting {request.label} generation {reason}".rstrip())
+        self._stop(request)
+        return True
+
+    def cancel(self, owner: str, reason: str = "") -> int:
+        """
+        Abort every generation owned by owner, in flight or queued
+        Consumers receive LLMCancelled. Returns how many were cancelled.
+        """
+        if owner is None:
+            return 0
+        count = 0
+        waiters = [r for r in self._pending if r.owner == owner and not r.granted.done()]
+        for request in waiters:
+            self._pending.remove(request)
+            request.granted.set_exception(LLMCancelled(f"{request.label} request cancelled"))
+            count += 1
+        if waiters:
+            heapq.heapify(self._pending)
+
+        request = self.active
+        if (request is not None and request.owner == owner
+                and not request.cancelled and not request.preempted):
+            request.cancelled = True
+            self._stop(request)
+            count += 1
+
+        if count:
+            self.cancelled += count
+            print(f"🛑 Cancelled {count} generation(s) for {owner} {reason}".rstrip())
+        return count
+
+    def _stop(self, request: LLMRequest):
+        """End a request's token stream (closing the HTTP stream stops llama.cpp too)"""
+        if request.producer and not request.producer.done():
+            request.producer.cancel()
+        else:
+            request.tokens.put_nowait(_END)
+
+    def get_stats(self):
+        """Get scheduler state for logging"""
+        return {
+            "active": self.active.label if self.active else None,
+            "pending": len(self._pending),
+            "completed": self.completed,
+            "preempted": self.preempted,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+            "prefilled": self.prefilled,
+            "skipped_prefills": self.skipped,
+        }
+
+
+# Global instance
+llm_scheduler = LLMScheduler()
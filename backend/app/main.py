@@ -1,17 +1,28 @@
 from fastapi import FastAPI, WebSocket
 from .ws import websocket_chat, idle_thought_loop
-from .db import engine, Base
+from .sessions import sessions, normalize_session_id, DEFAULT_SESSION
+from .db import init_db, SessionLocal
+from .llm_client import llm_client
+from .persistence import write_behind
+from .summarizer import summarizer
+from .memory_index import memory_index
+from .memory_long import recent_memories, fetch_recent_memories
+from .prefill import speculative_prefill
 from pydantic import BaseModel
 import asyncio
 from contextlib import asynccontextmanager
 
-# Create database tables on startup
-Base.metadata.create_all(bind=engine)
+# Create database tables / indexes on startup
+init_db()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifespan events"""
     # Startup
+    llm_client.start()
+    write_behind.start()
+    await asyncio.to_thread(memory_index.load, SessionLocal)  # Long-term memory search index
+    await asyncio.to_thread(fetch_recent_memories)  # Warm the recent memories cache
     idle_task = asyncio.create_task(idle_thought_loop())
     print("🚀 Idle thought engine initialized")
     
@@ -20,6 +31,8 @@ async def lifespan(app: FastAPI):
     # Shutdown
     idle_task.cancel()
     print("🛑 Idle thought engine stopped")
+    await llm_client.close()
+    await asyncio.to_thread(write_behind.stop)  # Commit anything still queued
 
 app = FastAPI(title="Alisa Core Backend", lifespan=lifespan)
 
@@ -36,16 +49,31 @@ def root():
     return {"status": "Alisa online"}
 
 @app.get("/history/summary")
-def get_history_summary():
-    """Get conversation history summary"""
-    from .memory import memory
-    return memory.get_summary()
+async def get_history_summary(session: str = DEFAULT_SESSION):
+    """
+    Get conversation history summary for a session (async: the registry lives on the event loop)
+    Only resident sessions report buffer stats - looking one up never loads or caches a buffer
+    """
+    session = normalize_session_id(session)
+    memory = sessions.peek(session)
+    return {
+        **(memory.get_summary() if memory is not None else {}),
+        "session_id": session,
+        "resident": memory is not None,
+        "sessions": sessions.get_stats(),
+        "persistence": write_behind.get_stats(),
+        "summarizer": summarizer.get_stats(),
+        "memory_index": memory_index.get_stats(),
+        "recent_memories": recent_memories.get_stats(),
+        "prefill": speculative_prefill.get_stats()
+    }
 
 @app.post("/history/clear")
-def clear_history():
-    """Clear conversation history (in-memory only)"""
-    from .memory import memory
-    memory.clear()
+async def clear_history(session: str = DEFAULT_SESSION):
+    """Clear a session's conversation history (in-memory only - nothing to do if it isn't resident)"""
+    memory = sessions.peek(normalize_session_id(session))
+    if memory is not None:
+        memory.clear()
     return {"status": "History cleared"}
 
 @app.post("/normalize_hinglish/")
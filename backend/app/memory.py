@@ -1,28 +1,67 @@
 from .db import SessionLocal
-from .models import ConversationHistory
+from .models import ConversationHistory, ConversationSummary
+from .persistence import write_behind
+from .tokenizer import token_counter
+from collections import deque
+from itertools import islice
 from datetime import datetime
 
+# Trimmed user/assistant messages kept for the summarizer (oldest dropped beyond this)
+MAX_PENDING_SUMMARY = 200
+
 class MemoryBuffer:
     """
     Conversation history manager with persistent storage and token limits.
     Keeps recent messages in memory and persists to database.
+    Token counts are computed once per message and kept as a running total,
+    so adding and trimming are O(1) per message.
     """
-    def __init__(self, max_turns=10, max_tokens=3000, session_id="default"):
+    def __init__(self, max_turns=10, max_tokens=3000, session_id="default", counter=None):
         """
         Args:
             max_turns: Maximum number of conversation turns to keep in memory
-            max_tokens: Approximate token limit (roughly 4 chars = 1 token)
+            max_tokens: Token limit (model tokenizer if configured, else ~4 chars = 1 token)
             session_id: Session identifier for multi-user support
+            counter: TokenCounter to use (defaults to the global token_counter)
         """
         self.max_turns = max_turns
         self.max_tokens = max_tokens
         self.session_id = session_id
-        self.messages = []
+        self.counter = counter or token_counter
+        self.messages = deque()
+        self._token_counts = deque()  # Cached count per message, parallel to self.messages
+        self.total_tokens = 0
+        self.summary = ""  # Rolling summary of trimmed turns (see summarizer.py)
+        self.messages_summarized = 0
+        self.evicted = deque(maxlen=MAX_PENDING_SUMMARY)  # Trimmed, not yet summarized
         self._load_from_db()
 
     def _estimate_tokens(self, text):
-        """Rough token estimation: ~4 characters per token"""
-        return len(text) // 4
+        """Token count for a piece of text"""
+        return self.counter.count(text)
+
+    def _append(self, message):
+        tokens = self._estimate_tokens(message["content"])
+        self.messages.append(message)
+        self._token_counts.append(tokens)
+        self.total_tokens += tokens
+
+    def _pop_oldest(self):
+        message = self.messages.popleft()
+        self.total_tokens -= self._token_counts.popleft()
+        # Keep real conversation turns for the summarizer (desktop/screen context is transient)
+        if message["role"] in ("user", "assistant"):
+            self.evicted.append(message)
+
+    def take_evicted(self):
+        """Hand trimmed messages to the summarizer"""
+        batch = list(self.evicted)
+        self.evicted.clear()
+        return batch
+
+    def restore_evicted(self, batch):
+        """Put messages back if summarizing them failed or was preempted"""
+        self.evicted.extendleft(reversed(batch))
 
     def _load_from_db(self):
         """Load recent conversation history from database"""
@@ -37,67 +76,77 @@ class MemoryBuffer:
                 .all()
             )
             # Reverse to get chronological order
-            self.messages = [
-                {"role": row.role, "content": row.content}
-                for row in reversed(rows)
-            ]
+            for row in reversed(rows):
+                self._append({"role": row.role, "content": row.content})
+
+            # Rolling summary of everything older
+            summary = db.get(ConversationSummary, self.session_id)
+            if summary:
+                self.summary = summary.summary
+                self.messages_summarized = summary.messages_summarized or 0
             db.close()
             print(f"📚 Loaded {len(self.messages)} messages from history")
         except Exception as e:
             print(f"⚠️ Could not load history from DB: {e}")
-            self.messages = []
+            self.clear(quiet=True)
 
     def add(self, role, content):
-        """Add a message to history and persist to database"""
-        message = {"role": role, "content": content}
-        self.messages.append(message)
+        """Add a message to history and queue it for the database"""
+        self._append({"role": role, "content": content})
         
-        # Persist to database
-        try:
-            db = SessionLocal()
-            db.add(ConversationHistory(
-                role=role,
-                content=content,
-                session_id=self.session_id,
-                timestamp=datetime.utcnow()
-            ))
-            db.commit()
-            db.close()
-        except Exception as e:
-            print(f"⚠️ Could not save to DB: {e}")
+        # Persist to database (batched off the event loop)
+        write_behind.submit(
+            ConversationHistory,
+            role=role,
+            content=content,
+            session_id=self.session_id,
+            timestamp=datetime.utcnow()
+        )
         
         # Trim by token count
         self._trim_by_tokens()
         
         # Also trim by turn count as backup
-        if len(self.messages) > self.max_turns * 2:
-            self.messages = self.messages[-self.max_turns * 2:]
+        while len(self.messages) > self.max_turns * 2:
+            self._pop_oldest()
 
     def _trim_by_tokens(self):
         """Keep messages within token limit by removing oldest"""
-        while len(self.messages) > 2:  # Keep at least 1 turn
-            total_tokens = sum(self._estimate_tokens(m["content"]) for m in self.messages)
-            if total_tokens <= self.max_tokens:
-                break
-            # Remove oldest message
-            self.messages.pop(0)
+        while len(self.messages) > 2 and self.total_tokens > self.max_tokens:  # Keep at least 1 turn
+            self._pop_oldest()
+
+    def preview_add(self, role, content):
+        """History as add(role, content) would leave it - nothing is stored or persisted"""
+        total = self.total_tokens + self._estimate_tokens(content)
+        count = len(self.messages) + 1
+        drop = 0
+        while count - drop > 2 and total > self.max_tokens:  # Same rules as add()
+            total -= self._token_counts[drop]
+            drop += 1
+        drop = max(drop, count - self.max_turns * 2)
+        return [*islice(self.messages, drop, None), {"role": role, "content": content}]
 
     def get(self):
         """Get current conversation history"""
         return self.messages
 
-    def clear(self):
+    def clear(self, quiet=False):
         """Clear conversation history (in-memory only, keeps DB)"""
-        self.messages = []
-        print("🗑️ Conversation history cleared")
+        self.messages.clear()
+        self._token_counts.clear()
+        self.total_tokens = 0
+        if not quiet:
+            print("🗑️ Conversation history cleared")
     
     def get_summary(self):
         """Get a summary of current conversation state"""
         total_messages = len(self.messages)
-        total_tokens = sum(self._estimate_tokens(m["content"]) for m in self.messages)
         return {
             "messages": total_messages,
             "turns": total_messages // 2,
-            "estimated_tokens": total_tokens,
-            "max_tokens": self.max_tokens
+            "estimated_tokens": self.total_tokens,
+            "max_tokens": self.max_tokens,
+            "tokenizer": self.counter.name,
+            "summary_chars": len(self.summary),
+            "pending_summary": len(self.evicted)
         }
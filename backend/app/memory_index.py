@@ -0,0 +1,251 @@
+"""
+Long-Term Memory Index
+Relevance-ranked retrieval over saved memories (replaces "last 3 rows")
+
+Every memory is embedded once and kept in a NumPy matrix of unit vectors,
+so a lookup is one matrix-vector product plus a top-k partition, with no
+DB query on the chat path. The matrix is stored column-major: a hashed
+query only has a few dozen non-zero dims, so only those columns are read
+(~1 ms at 100k memories instead of ~15 ms for the full product).
+Callers run search() and add() in a worker thread (fetch_relevant_memories,
+save_memory), since embedding can be model inference.
+
+Embedders:
+- Local sentence-transformers model when ALISA_EMBEDDING_MODEL is set
+  (needs: pip install sentence-transformers)
+- Otherwise hashed word + character n-grams (no model, no downloads)
+
+Key Features:
+- Built from the DB once at startup, then updated incrementally on save
+- Top-k cosine search with argpartition (no full sort)
+- Sparse queries only touch their non-zero columns
+- Matrix grows by doubling, so appends are amortized O(1)
+- Empty queries (idle thoughts) fall back to the most recent memories
+"""
+
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+# Sentence-transformers model name/path (empty = hashed n-grams)
+EMBEDDING_MODEL = os.getenv("ALISA_EMBEDDING_MODEL", "")
+
+# Hashed embedding size (float32 -> 2 KB per memory, ~200 MB at 100k)
+HASH_DIM = 512
+
+# Words shorter than this carry little meaning ("is", "my", "to") - skip them
+HASH_MIN_WORD = 3
+
+# Character n-gram size for the hashed embedder (catches typos / word forms)
+HASH_NGRAM = 3
+
+# Memories scoring below this are considered unrelated
+MEMORY_MIN_SCORE = 0.15
+
+# Initial matrix capacity (rows)
+INDEX_INITIAL_CAPACITY = 1024
+
+# Rows embedded per batch when building from the DB
+INDEX_BUILD_BATCH = 512
+
+# Score only the query's non-zero dims when at most this fraction of them is set
+# (column gathers beat the full product up to ~1/4 of the dims)
+SPARSE_QUERY_FRACTION = 0.25
+
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    """
+    Model-free embedder: signed feature hashing of words and char n-grams
+
+    Similar wording -> similar vectors. Not semantic, but fast and
+    deterministic across restarts (crc32, not Python's salted hash()).
+    """
+
+    def __init__(self, dim: int = HASH_DIM, ngram: int = HASH_NGRAM, min_word: int = HASH_MIN_WORD):
+        self.dim = dim
+        self.ngram = ngram
+        self.min_word = min_word
+        self.name = f"hashed-{ngram}gram-{dim}"
+
+    def _features(self, text: str):
+        words = [w for w in _WORD_PATTERN.findall(text.lower()) if len(w) >= self.min_word]
+        features = list(words)
+        for word in words:
+            padded = f" {word} "
+            features.extend(padded[i:i + self.ngram] for i in range(len(padded) - self.ngram + 1))
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_many(self, texts) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self.embed(t) for t in texts])
+
+
+class SentenceEmbedder:
+    """Local sentence-transformers model (CPU), normalized output"""
+
+    def __init__(self, model_name: str):
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = model_name
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return self.model.encode(
+            list(texts), batch_size=64, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+
+def create_embedder(model_name: str = EMBEDDING_MODEL):
+    """Best available embedder"""
+    if model_name:
+        if not SENTENCE_TRANSFORMERS_AVAILABLE:
+            print("⚠️ ALISA_EMBEDDING_MODEL set but 'sentence-transformers' isn't installed - using hashed n-grams")
+        else:
+            try:
+                embedder = SentenceEmbedder(model_name)
+                print(f"🧬 Memory embeddings: {model_name} ({embedder.dim} dims)")
+                return embedder
+            except Exception as e:
+                print(f"⚠️ Could not load embedding model {model_name}: {e} - using hashed n-grams")
+    return HashingEmbedder()
+
+
+class MemoryIndex:
+    """
+    In-memory vector index of long-term memories
+
+    Usage:
+        memory_index.load(SessionLocal)        # Once, at startup
+        memory_index.add("[HAPPY] You like tea")
+        memory_index.search("what do I drink?", k=3)  # -> ["[HAPPY] You like tea", ...]
+    """
+
+    def __init__(self, embedder=None, capacity: int = INDEX_INITIAL_CAPACITY):
+        self.embedder = embedder or HashingEmbedder()
+        # Column-major: each dim's scores over all memories are contiguous (sparse queries)
+        self._vectors = np.zeros((capacity, self.embedder.dim), dtype=np.float32, order="F")
+        self._contents = []
+        self._lock = threading.Lock()
+        self.loaded = False
+
+        # Stats
+        self.searches = 0
+        self.last_search_ms = 0.0
+
+    def __len__(self):
+        return len(self._contents)
+
+    def _reserve(self, extra: int):
+        """Grow the matrix (doubling) so `extra` more rows fit"""
+        needed = len(self._contents) + extra
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        grown = np.zeros((capacity, self.embedder.dim), dtype=np.float32, order="F")
+        grown[:len(self._contents)] = self._vectors[:len(self._contents)]
+        self._vectors = grown
+
+    def add_many(self, texts):
+        """Index several memories at once (embedding happens outside the lock)"""
+        texts = [t for t in texts if t]
+        if not texts:
+            return
+        vectors = self.embedder.embed_many(texts)
+        with self._lock:
+            self._reserve(len(texts))
+            start = len(self._contents)
+            self._vectors[start:start + len(texts)] = vectors
+            self._contents.extend(texts)
+
+    def add(self, text: str):
+        """Index one new memory"""
+        self.add_many([text])
+
+    def load(self, session_factory):
+        """Embed every stored memory (call once, off the event loop)"""
+        from .models import Memory
+
+        start = time.perf_counter()
+        db = session_factory()
+        try:
+            rows = db.query(Memory.content).order_by(Memory.id).all()
+        finally:
+            db.close()
+
+        contents = [row.content for row in rows]
+        for i in range(0, len(contents), INDEX_BUILD_BATCH):
+            self.add_many(contents[i:i + INDEX_BUILD_BATCH])
+        self.loaded = True
+        print(f"🧬 Indexed {len(self)} memories with {self.embedder.name} "
+              f"in {time.perf_counter() - start:.1f}s")
+
+    def recent(self, k: int = 3):
+        """Most recent memories, newest first"""
+        with self._lock:
+            return self._contents[-k:][::-1] if k > 0 else []
+
+    def search(self, query: str, k: int = 3, min_score: float = MEMORY_MIN_SCORE):
+        """Top-k memories by cosine similarity, best first"""
+        if not query or not query.strip():
+            return self.recent(k)
+
+        start = time.perf_counter()
+        query_vector = self.embedder.embed(query)
+        dims = np.flatnonzero(query_vector)
+        with self._lock:
+            count = len(self._contents)
+            if count == 0 or k <= 0:
+                return []
+            if len(dims) <= SPARSE_QUERY_FRACTION * len(query_vector):
+                scores = self._vectors[:count, dims] @ query_vector[dims]
+            else:
+                scores = self._vectors[:count] @ query_vector
+            k = min(k, count)
+            top = np.argpartition(scores, count - k)[count - k:]
+            top = top[np.argsort(scores[top])[::-1]]
+            results = [self._contents[i] for i in top if scores[i] >= min_score]
+
+        self.searches += 1
+        self.last_search_ms = (time.perf_counter() - start) * 1000
+        return results
+
+    def get_stats(self):
+        return {
+            "memories": len(self),
+            "embedder": self.embedder.name,
+            "dim": self.embedder.dim,
+            "loaded": self.loaded,
+            "searches": self.searches,
+            "last_search_ms": round(self.last_search_ms, 2),
+        }
+
+
+# Global instance
+memory_index = MemoryIndex(create_embedder())
@@ -1,14 +1,129 @@
+import asyncio
+from collections import deque
+
 from .db import SessionLocal
 from .models import Memory
+from .memory_index import memory_index
+from .persistence import write_behind
+
+# Recent memories kept in process (write-through from save_memory)
+RECENT_CACHE_SIZE = 32
+
+class RecentMemoryCache:
+    """
+    Newest memories, loaded from the DB once and then kept current by save_memory,
+    so prompt building never needs a query for them
+    """
+    def __init__(self, size=RECENT_CACHE_SIZE):
+        self.size = size
+        self._items = None  # deque, oldest -> newest (None until first use)
+        self._complete = False  # Every stored memory is cached (small DB) - any limit is a hit
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+
+    def _read(self, limit):
+        """
+        Newest `limit` memories from the DB, oldest first
+        Rows still queued in write_behind are merged in instead of flushing
+        (a flush would block the event loop until the writer thread drains)
+        """
+        pending = [fields["content"] for fields in write_behind.pending(Memory)]
+        db = SessionLocal()
+        try:
+            rows = db.query(Memory.content).order_by(Memory.id.desc()).limit(limit).all()
+        finally:
+            db.close()
+        stored = [row.content for row in reversed(rows)]
+
+        # Rows committed between the pending snapshot and the query show up in both
+        overlap = min(len(stored), len(pending))
+        while overlap and stored[-overlap:] != pending[:overlap]:
+            overlap -= 1
+        return stored + pending[overlap:], len(rows) < limit
+
+    def _load(self):
+        items, complete = self._read(self.size)
+        self._complete = complete and len(items) <= self.size
+        self._items = deque(items, maxlen=self.size)
+
+    def get(self, limit):
+        """Newest `limit` memories, newest first"""
+        if limit <= 0:
+            return []
+        if self._items is None:
+            self.misses += 1
+            self._load()
+        elif limit > self.size and not self._complete:
+            self.misses += 1  # More than the cache holds - read past it without replacing it
+            return self._read(limit)[0][-limit:][::-1]
+        else:
+            self.hits += 1
+        return list(self._items)[-limit:][::-1]
+
+    def add(self, content):
+        """Write-through: called with every saved memory"""
+        if self._items is not None:  # Not loaded yet - the first get() reads it from the DB
+            if len(self._items) == self.size:
+                self._complete = False  # The oldest memory drops out of the cache
+            self._items.append(content)
+
+    def invalidate(self):
+        self._items = None
+        self._complete = False
+
+    def get_stats(self):
+        return {
+            "cached": len(self._items) if self._items is not None else 0,
+            "complete": self._complete,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+# Global instance
+recent_memories = RecentMemoryCache()
+
+# Index updates running in worker threads (kept referenced until done)
+_index_tasks = set()
 
 def save_memory(emotion, content):
-    db = SessionLocal()
-    db.add(Memory(emotion=emotion, content=content))
-    db.commit()
-    db.close()
+    """
+    Store a memory (batched DB write) and index it for retrieval
+    Embedding can be model inference, so on the event loop it runs in a worker thread
+    """
+    write_behind.submit(Memory, emotion=emotion, content=content)
+    recent_memories.add(content)
+    if not memory_index.loaded:  # load() picks it up from the DB
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        memory_index.add(content)  # No event loop (scripts) - nothing to block
+        return
+    task = asyncio.create_task(_index(content))
+    _index_tasks.add(task)
+    task.add_done_callback(_index_tasks.discard)
+
+async def _index(content):
+    try:
+        await asyncio.to_thread(memory_index.add, content)
+    except Exception as e:
+        print(f"⚠️ Could not index memory: {e}")
+
+async def fetch_relevant_memories(query="", limit=3):
+    """
+    Memories most related to `query` (most recent ones when query is empty)
+    The search runs in a worker thread - query embedding can be model inference
+    """
+    if not memory_index.loaded or not query.strip():
+        return fetch_recent_memories(limit)
+    results = await asyncio.to_thread(memory_index.search, query, limit)
+    if len(results) < limit:
+        # Nothing related enough - fill up with recent context
+        results += [m for m in fetch_recent_memories(limit) if m not in results][:limit - len(results)]
+    return results
 
 def fetch_recent_memories(limit=3):
-    db = SessionLocal()
-    rows = db.query(Memory).order_by(Memory.id.desc()).limit(limit).all()
-    db.close()
-    return [m.content for m in rows]
+    """Newest memories, newest first (served from the in-process cache)"""
+    return recent_memories.get(limit)
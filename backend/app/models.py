@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
 from datetime import datetime
 from .db import Base
 
 class Memory(Base):
     __tablename__ = "memory"
+    # Only read in id order (recent rows, index build) - id is the rowid, so no extra index needed
 
     id = Column(Integer, primary_key=True)
     emotion = Column(String)
@@ -18,3 +19,17 @@ class ConversationHistory(Base):
     content = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
     session_id = Column(String, default="default")  # For multi-user support later
+
+    # MemoryBuffer._load_from_db filters by session and sorts by time
+    __table_args__ = (
+        Index("ix_conversation_history_session_ts", "session_id", "timestamp"),
+    )
+
+class ConversationSummary(Base):
+    """Rolling summary of turns trimmed out of a session's MemoryBuffer"""
+    __tablename__ = "conversation_summary"
+
+    session_id = Column(String, primary_key=True)
+    summary = Column(Text, nullable=False, default="")
+    messages_summarized = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
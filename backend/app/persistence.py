@@ -0,0 +1,187 @@
+"""
+Write-Behind Persistence
+Batches database inserts on a background thread so SQLite commits never
+block the event loop (and with it, token streaming for every client)
+
+Key Features:
+- submit() only appends to a queue - no DB work on the caller's thread
+- Rows are written in one transaction per batch
+- A batch is flushed when it's full or the flush interval elapses
+- flush() / stop() drain everything (used on shutdown)
+- pending() shows rows not committed yet, so readers can merge them
+  instead of blocking on flush()
+- Queue depth and write stats for /history/summary
+"""
+
+import atexit
+import queue
+import threading
+import time
+from collections import deque
+
+from .db import SessionLocal
+
+# Flush when this many rows are pending...
+PERSIST_BATCH_SIZE = 32
+
+# ...or this many seconds after the first pending row
+PERSIST_FLUSH_INTERVAL = 0.5
+
+# Sentinels understood by the writer thread
+_FLUSH = object()
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """
+    Background writer for append-only rows
+
+    Usage:
+        write_behind.submit(ConversationHistory, role="user", content="hi")
+        write_behind.pending(ConversationHistory)   # Queued rows' fields, oldest first
+        write_behind.flush()   # Block until everything is committed
+    """
+
+    def __init__(self, session_factory=SessionLocal, batch_size: int = None, flush_interval: float = None):
+        self.session_factory = session_factory
+        self.batch_size = batch_size or PERSIST_BATCH_SIZE
+        self.flush_interval = PERSIST_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._queue = queue.Queue()
+        self._unwritten = deque()  # (model, fields) submitted but not committed, oldest first
+        self._unwritten_lock = threading.Lock()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+
+        # Stats
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_batch_ms = 0.0
+
+    def start(self):
+        """Start the writer thread (idempotent; submit() starts it lazily too)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)  # Scripts that never call stop() still get their rows written
+                self._atexit_registered = True
+
+    def submit(self, model, **fields):
+        """Queue a row for insertion; returns immediately"""
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        with self._unwritten_lock:
+            self._unwritten.append((model, fields))
+        self._queue.put((model, fields))
+
+    def pending(self, model):
+        """Fields of `model` rows not committed yet, oldest first (never waits for the writer)"""
+        with self._unwritten_lock:
+            return [fields for row_model, fields in self._unwritten if row_model is model]
+
+    def flush(self):
+        """Block until every queued row has been written"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def stop(self):
+        """Write everything still queued and stop the writer thread"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join()
+        print(f"💾 Write-behind stopped ({self.written} rows in {self.batches} batches)")
+
+    @property
+    def depth(self) -> int:
+        """Rows waiting to be written"""
+        return self._queue.qsize()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+            if item is _FLUSH:
+                self._queue.task_done()
+                continue
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+
+            # Gather more rows until the batch is full or the window closes
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _FLUSH or item is _STOP:
+                    self._queue.task_done()
+                    stopping = item is _STOP
+                    break
+                batch.append(item)
+
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+        # Anything submitted after stop() was requested
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _FLUSH and item is not _STOP:
+                leftover.append(item)
+            self._queue.task_done()
+        if leftover:
+            self._write(leftover)
+
+    def _write(self, batch):
+        """Insert a batch in a single transaction"""
+        start = time.perf_counter()
+        db = self.session_factory()
+        try:
+            db.add_all([model(**fields) for model, fields in batch])
+            db.commit()
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            db.rollback()
+            self.errors += 1
+            print(f"⚠️ Could not save {len(batch)} row(s) to DB: {e}")
+        finally:
+            db.close()
+            with self._unwritten_lock:  # Batches are written in submit order
+                for _ in batch:
+                    self._unwritten.popleft()
+        self.last_batch_ms = (time.perf_counter() - start) * 1000
+
+    def get_stats(self):
+        """Get queue depth and write stats"""
+        return {
+            "queue_depth": self.depth,
+            "written": self.written,
+            "batches": self.batches,
+            "errors": self.errors,
+            "last_batch_ms": round(self.last_batch_ms, 2),
+        }
+
+
+# Global instance
+write_behind = WriteBehindQueue()
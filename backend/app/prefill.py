@@ -0,0 +1,135 @@
+"""
+Speculative Prompt Prefill
+Warms the LLM's KV cache from partial transcripts while Whisper is still decoding
+
+Voice clients stream interim STT text (partial_transcript messages). Each
+partial builds the turn's stable prompt prefix:
+    [static system prompt, *history, user: "<partial text>"]
+and evaluates it into the session's llama.cpp slot with n_predict=0. When
+the final transcript arrives as a normal chat message, the real request
+only evaluates what changed since the last partial, so STT and prompt
+evaluation overlap instead of running back to back.
+
+Partials come from the STT worker's segments, which are decoded once the
+user has stopped talking - the overlap covers the decode window, not
+the time spent speaking.
+
+Rules:
+- One prefill in flight per session; newer partials replace queued ones
+- User turns outrank prefills (PRIORITY_PREFILL), prefills outrank background chatter
+- commit() (final transcript) drops queued prefills and cancels a running
+  one, so the user turn never waits behind a prefill
+"""
+
+import asyncio
+
+from .llm_scheduler import llm_scheduler, LLMQueueFull
+
+# Partials shorter than this aren't worth a request
+PREFILL_MIN_CHARS = 8
+
+
+class _SessionPrefill:
+    """Prefill state for one session's current utterance"""
+
+    __slots__ = ("pending", "last_text", "task", "committed")
+
+    def __init__(self):
+        self.pending = None  # (text, build) waiting to run
+        self.last_text = ""
+        self.task = None
+        self.committed = False
+
+
+class SpeculativePrefill:
+    """
+    Per-session prefill from partial transcripts
+
+    Usage:
+        speculative_prefill.submit(session, partial_text, build)  # build(text) -> messages
+        speculative_prefill.commit(session)                       # final transcript arrived
+    """
+
+    def __init__(self, min_chars: int = PREFILL_MIN_CHARS, scheduler=llm_scheduler):
+        self.min_chars = min_chars
+        self.scheduler = scheduler
+        self._sessions = {}
+
+        # Stats
+        self.submitted = 0
+        self.prefilled = 0
+        self.superseded = 0
+        self.dropped = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def submit(self, session: str, text: str, build):
+        """Queue a prefill for the latest partial transcript (never blocks)"""
+        text = text.strip()
+        if len(text) < self.min_chars:
+            return
+        state = self._sessions.setdefault(session, _SessionPrefill())
+        if text == state.last_text:
+            return
+        self.submitted += 1
+        if state.pending is not None:
+            self.superseded += 1
+        state.pending = (text, build)
+        state.last_text = text
+        if state.task is None or state.task.done():
+            state.task = asyncio.create_task(self._run(session, state))
+
+    async def _run(self, session: str, state: _SessionPrefill):
+        while state.pending is not None and not state.committed:
+            text, build = state.pending
+            state.pending = None
+            messages = build(text)
+            if messages is None:
+                return
+            try:
+                ran = await self.scheduler.prefill(
+                    messages,
+                    slot_key=session,
+                    # Still useful once the slot is ours? (no final transcript, nothing newer)
+                    should_run=lambda: not state.committed and state.pending is None
+                )
+            except LLMQueueFull:
+                return
+            except Exception as e:
+                self.failed += 1
+                print(f"⚠️ Prompt prefill failed: {e}")
+                return
+            if ran:
+                self.prefilled += 1
+
+    def commit(self, session: str):
+        """
+        The final transcript arrived: queued prefills are dropped and an
+        in-flight one is cancelled - prefills can't be preempted, so the
+        user turn would otherwise queue behind it
+        """
+        state = self._sessions.pop(session, None)
+        if state is None:
+            return
+        state.committed = True
+        if state.pending is not None:
+            state.pending = None
+            self.dropped += 1
+        if state.task is not None and not state.task.done():
+            state.task.cancel()  # Frees the LLM slot (or leaves the queue) right away
+            self.cancelled += 1
+
+    def get_stats(self):
+        return {
+            "active_sessions": len(self._sessions),
+            "submitted": self.submitted,
+            "prefilled": self.prefilled,
+            "superseded": self.superseded,
+            "dropped": self.dropped,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+        }
+
+
+# Global instance
+speculative_prefill = SpeculativePrefill()
@@ -1,3 +1,12 @@
+from functools import lru_cache
+
+# Send volatile context (memories, vision, habits) as a trailing system message
+# after the conversation instead of inside the first one. The first message and
+# the history then form a byte-stable prefix that llama.cpp can reuse from its
+# KV cache (cache_prompt) instead of re-evaluating it every turn.
+# Set to False for chat templates that reject a system message after user turns.
+TRAILING_CONTEXT = True
+
 SYSTEM_PROMPT = """
 Your name is Alisa.
 
@@ -160,16 +169,39 @@ ABSOLUTE CONSTRAINTS
 - Always follow emotion tag format
 """
 
-def build_prompt(
-    mode_prompt,
+@lru_cache(maxsize=8)
+def build_static_prompt(mode_prompt):
+    """
+    Byte-stable system prompt prefix (identity, rules, mode)
+    Memoized per mode - the same string object is reused every turn
+    """
+    return f"""
+{SYSTEM_PROMPT}
+
+Current interaction mode (internal, do not announce):
+{mode_prompt}
+""".strip()
+
+
+def build_context(
     memories,
     vision_context="",
-    task_insights=None
+    task_insights=None,
+    summary=""
 ):
     """
-    Build system prompt with all contextual layers for Alisa v2.3 (Hinglish-primary)
+    Volatile per-turn context: conversation summary, recent memories,
+    passive vision, learned habits
     """
 
+    # Rolling summary of turns that no longer fit in the history
+    summary_text = ""
+    if summary:
+        summary_text = (
+            "Earlier in this conversation (summary, for continuity only):\n"
+            f"{summary}\n\n"
+        )
+
     # Limit memory (human-scale context only)
     recent_memories = memories[-5:] if memories else []
     memory_text = "\n".join(recent_memories)
@@ -205,11 +237,59 @@ def build_prompt(
             )
 
     return f"""
-{SYSTEM_PROMPT}
-
-Current interaction mode (internal, do not announce):
-{mode_prompt}
-
-Recent shared context (do not quote or summarize directly):
+{summary_text}Recent shared context (do not quote or summarize directly):
 {memory_text}{vision_text}{habit_text}
 """.strip()
+
+
+def build_prompt(
+    mode_prompt,
+    memories,
+    vision_context="",
+    task_insights=None,
+    summary=""
+):
+    """
+    Build system prompt with all contextual layers for Alisa v2.3 (Hinglish-primary)
+    Static prefix first, volatile context last
+    """
+    return build_static_prompt(mode_prompt) + "\n\n" + build_context(memories, vision_context, task_insights, summary)
+
+
+def build_messages(
+    mode_prompt,
+    memories,
+    history=(),
+    vision_context="",
+    task_insights=None,
+    summary=""
+):
+    """
+    Chat messages ordered for KV-cache reuse:
+    [static system prompt, *history, volatile context]
+    """
+    if not TRAILING_CONTEXT:
+        return [
+            {"role": "system", "content": build_prompt(mode_prompt, memories, vision_context, task_insights, summary)},
+            *history
+        ]
+
+    return [
+        {"role": "system", "content": build_static_prompt(mode_prompt)},
+        *history,
+        {"role": "system", "content": build_context(memories, vision_context, task_insights, summary)}
+    ]
+
+
+def build_prefix_messages(mode_prompt, history):
+    """
+    The cacheable part of build_messages: [static system prompt, *history]
+    Used to warm the KV cache before the turn's volatile context is known.
+    None when TRAILING_CONTEXT is off (the prefix then depends on that context).
+    """
+    if not TRAILING_CONTEXT:
+        return None
+    return [
+        {"role": "system", "content": build_static_prompt(mode_prompt)},
+        *history
+    ]
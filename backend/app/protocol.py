@@ -0,0 +1,219 @@
+"""
+WebSocket Message Protocol
+Versioned, typed message envelope shared by all clients
+
+Structured clients (connect with ?protocol=1, or send a hello first)
+exchange one JSON object per frame:
+    {"type": "token", "text": "Hmph"}
+    {"type": "emotion", "emotion": "teasing"}
+    {"type": "vision_face", "state": "present"}
+    {"type": "lipsync", "fps": 25, "levels": [0, 4, 9, 7, 2]}
+
+Clients can also subscribe to topics (?subscribe=emotion,speech-control
+or "subscribe" in the hello) so broadcasts they'd ignore are never sent.
+
+Legacy clients keep the original string prefixes ([EMOTION], [END],
+[VISION_FACE], ...). Both are parsed into the same Message so ws.py
+dispatches on message.type only, and each outbound Message is encoded
+at most once per format no matter how many clients receive it.
+"""
+
+import json
+from typing import Optional
+
+PROTOCOL_VERSION = 1
+
+# Server -> client
+MSG_HELLO = "hello"
+MSG_TOKEN = "token"
+MSG_EMOTION = "emotion"
+MSG_END = "end"
+MSG_ERROR = "error"
+MSG_MODE_CHANGED = "mode_changed"
+MSG_PING = "ping"
+
+MSG_VISION_STATE = "vision_state"
+
+# Both directions (relayed from voice clients to the overlay)
+MSG_SPEECH_START = "speech_start"
+MSG_SPEECH_END = "speech_end"
+MSG_LIPSYNC = "lipsync"  # Mouth envelope (0-9 per frame) for the segment now playing
+
+# Client -> server
+MSG_CHAT = "chat"
+MSG_MODE = "mode"
+MSG_VISION_FACE = "vision_face"
+MSG_VISION_DESKTOP = "vision_desktop"
+MSG_VISION_SCREEN = "vision_screen"
+MSG_PARTIAL_TRANSCRIPT = "partial_transcript"  # Interim STT text (voice clients)
+MSG_CANCEL = "cancel"  # Barge-in: stop the session's in-flight reply
+
+# Broadcast topics a client can subscribe to
+TOPIC_TOKENS = "tokens"
+TOPIC_EMOTION = "emotion"
+TOPIC_SPEECH = "speech-control"
+TOPIC_VISION = "vision-state"
+ALL_TOPICS = frozenset({TOPIC_TOKENS, TOPIC_EMOTION, TOPIC_SPEECH, TOPIC_VISION})
+
+# Topic of each broadcast message type (types not listed go to every client)
+MESSAGE_TOPICS = {
+    MSG_TOKEN: TOPIC_TOKENS,
+    MSG_END: TOPIC_TOKENS,
+    MSG_EMOTION: TOPIC_EMOTION,
+    MSG_SPEECH_START: TOPIC_SPEECH,
+    MSG_SPEECH_END: TOPIC_SPEECH,
+    MSG_LIPSYNC: TOPIC_SPEECH,
+    MSG_VISION_STATE: TOPIC_VISION,
+}
+
+# Longest lipsync envelope relayed in one message (60 s at 25 fps)
+LIPSYNC_MAX_FRAMES = 1500
+
+# Legacy string forms of payload-less messages
+_LEGACY_MARKERS = {
+    MSG_END: "[END]",
+    MSG_ERROR: "[ERROR]",
+    MSG_MODE_CHANGED: "[MODE CHANGED]",
+    MSG_SPEECH_START: "[SPEECH_START]",
+    MSG_SPEECH_END: "[SPEECH_END]",
+    MSG_PING: "",
+    MSG_CANCEL: "[CANCEL]",
+}
+_LEGACY_INBOUND = {marker: msg_type for msg_type, marker in _LEGACY_MARKERS.items()}
+
+
+class Message:
+    """A typed protocol message with cached wire encodings"""
+
+    __slots__ = ("type", "data", "_json", "_legacy")
+
+    def __init__(self, type: str, **data):
+        self.type = type
+        self.data = data
+        self._json = None
+        self._legacy = None
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def encode(self, structured: bool) -> Optional[str]:
+        """Wire form for a client; None if the message has no legacy form"""
+        if structured:
+            if self._json is None:
+                self._json = json.dumps({"type": self.type, **self.data},
+                                        ensure_ascii=False, separators=(",", ":"))
+            return self._json
+
+        if self._legacy is None:
+            self._legacy = _encode_legacy(self)
+        return self._legacy
+
+    def __repr__(self):
+        return f"Message({self.type!r}, {self.data!r})"
+
+
+def _encode_legacy(message: Message) -> Optional[str]:
+    if message.type == MSG_TOKEN:
+        return message.data.get("text", "")
+    if message.type == MSG_EMOTION:
+        return f"[EMOTION]{message.data.get('emotion', 'neutral')}"
+    return _LEGACY_MARKERS.get(message.type)
+
+
+# Shared instances for payload-less messages (encoded once, reused forever)
+END = Message(MSG_END)
+ERROR = Message(MSG_ERROR)
+MODE_CHANGED = Message(MSG_MODE_CHANGED)
+SPEECH_START = Message(MSG_SPEECH_START)
+SPEECH_END = Message(MSG_SPEECH_END)
+PING = Message(MSG_PING)
+
+
+def token_message(text: str) -> Message:
+    return Message(MSG_TOKEN, text=text)
+
+
+def emotion_message(emotion: str) -> Message:
+    return Message(MSG_EMOTION, emotion=emotion)
+
+
+def lipsync_message(fps: int, levels: list) -> Message:
+    """Structured clients only (no legacy form)"""
+    return Message(MSG_LIPSYNC, fps=fps, levels=levels)
+
+
+def hello_message(version: int) -> Message:
+    return Message(MSG_HELLO, v=version)
+
+
+def parse_topics(requested) -> frozenset:
+    """
+    Topics a client subscribed to (comma-separated string or list)
+    None means the client didn't say - it gets everything, like before
+    """
+    if requested is None:
+        return ALL_TOPICS
+    if isinstance(requested, str):
+        requested = requested.split(",")
+    return frozenset(t.strip() for t in requested if t.strip() in ALL_TOPICS)
+
+
+def negotiate_version(requested) -> int:
+    """Pick the protocol version for a client (0 = legacy strings)"""
+    try:
+        requested = int(requested)
+    except (TypeError, ValueError):
+        return 0
+    return max(0, min(requested, PROTOCOL_VERSION))
+
+
+def parse_message(raw: str, structured: bool) -> Message:
+    """Decode an inbound frame from either protocol"""
+    if raw.startswith("{"):
+        try:
+            payload = json.loads(raw)
+            msg_type = payload.pop("type")
+            return Message(msg_type, **payload)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            if structured:
+                return Message(MSG_ERROR, raw=raw)
+            # Legacy client typed something that looks like JSON - treat as chat
+    return parse_legacy(raw)
+
+
+def parse_legacy(raw: str) -> Message:
+    """Map the original string-prefix protocol onto typed messages"""
+    if raw in _LEGACY_INBOUND:
+        return Message(_LEGACY_INBOUND[raw])
+
+    if raw.startswith("[VISION_FACE]"):
+        return Message(MSG_VISION_FACE, state=raw[len("[VISION_FACE]"):])
+
+    if raw.startswith("[VISION_DESKTOP]"):
+        # Format: task|app|file_type|has_error|offer|window|text
+        parts = raw[len("[VISION_DESKTOP]"):].split("|", 6)
+        if len(parts) < 7:
+            return Message(MSG_VISION_DESKTOP)
+        return Message(
+            MSG_VISION_DESKTOP,
+            task=parts[0].strip(),
+            app=parts[1].strip(),
+            file_type=parts[2].strip(),
+            has_error=parts[3].strip() == "True",
+            offer=parts[4].strip(),
+            window=parts[5].strip(),
+            text=parts[6].strip()
+        )
+
+    if raw.startswith("[VISION_SCREEN]"):
+        parts = raw[len("[VISION_SCREEN]"):].split(" | ", 1)
+        return Message(
+            MSG_VISION_SCREEN,
+            window=parts[0].strip() if len(parts) > 0 else "",
+            text=parts[1].strip() if len(parts) > 1 else ""
+        )
+
+    if raw.startswith("/mode"):
+        return Message(MSG_MODE, mode=raw.split()[-1])
+
+    return Message(MSG_CHAT, text=raw)
@@ -0,0 +1,176 @@
+"""
+Session Registry
+Per-session conversation buffers so several users/devices can share one backend
+
+Clients pick a session in the handshake (ws://.../ws/chat?session=laptop).
+Every client of a session (text/voice chat, overlay, vision) shares one
+MemoryBuffer; other sessions never see its context or its broadcasts.
+
+Key Features:
+- Buffers are created lazily and load their history from the DB
+  (in a worker thread when loaded from the event loop)
+- LRU cap on resident buffers, idle ones are evicted
+- Sessions with connected clients are never evicted
+- Eviction is free: history is already persisted by the write-behind queue
+"""
+
+import re
+import time
+import asyncio
+from collections import OrderedDict
+
+from .memory import MemoryBuffer
+
+DEFAULT_SESSION = "default"
+
+# Max resident session buffers (least recently used idle ones go first)
+SESSION_CACHE_SIZE = 8
+
+# Evict buffers with no connected clients after this many idle seconds
+SESSION_IDLE_TIMEOUT = 30 * 60
+
+# Session IDs end up in the DB and in logs - keep them short and plain
+_SESSION_ID_PATTERN = re.compile(r"[^A-Za-z0-9_.-]")
+MAX_SESSION_ID_LENGTH = 64
+
+
+def normalize_session_id(session_id) -> str:
+    """Clean a client-supplied session ID (empty/invalid -> default session)"""
+    if not session_id:
+        return DEFAULT_SESSION
+    cleaned = _SESSION_ID_PATTERN.sub("", str(session_id))[:MAX_SESSION_ID_LENGTH]
+    return cleaned or DEFAULT_SESSION
+
+
+class SessionRegistry:
+    """
+    LRU of MemoryBuffer instances keyed by session ID
+
+    Usage:
+        memory = await sessions.load("laptop")      # Loads from DB on first use (worker thread)
+        memory = sessions.peek("laptop")            # Resident buffer or None (read-only callers)
+        await sessions.attach("laptop") / detach()  # Pin while clients are connected
+        sessions.evict_idle()                       # Called periodically
+    """
+
+    def __init__(self, max_sessions: int = None, idle_timeout: float = None, buffer_factory=MemoryBuffer):
+        self.max_sessions = max_sessions or SESSION_CACHE_SIZE
+        self.idle_timeout = SESSION_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self.buffer_factory = buffer_factory
+        self._buffers: "OrderedDict[str, MemoryBuffer]" = OrderedDict()
+        self._last_used = {}
+        self._connections = {}
+        self._loading = {}  # session_id -> load running in a worker thread
+        self.last_active = DEFAULT_SESSION  # Most recent session with user activity
+
+        # Stats
+        self.loads = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._buffers)
+
+    def __contains__(self, session_id):
+        return session_id in self._buffers
+
+    def get(self, session_id: str = DEFAULT_SESSION) -> MemoryBuffer:
+        """Buffer for a session, loading it from the DB if it isn't resident (blocking)"""
+        buffer = self._buffers.get(session_id)
+        if buffer is None:
+            buffer = self._add(session_id, self.buffer_factory(session_id=session_id))
+        else:
+            self._buffers.move_to_end(session_id)
+        self._last_used[session_id] = time.time()
+        return buffer
+
+    async def load(self, session_id: str = DEFAULT_SESSION) -> MemoryBuffer:
+        """Like get(), but a non-resident buffer reads its history in a worker thread"""
+        if session_id not in self._buffers:
+            task = self._loading.get(session_id)
+            if task is None:  # Concurrent callers share one load
+                task = asyncio.ensure_future(asyncio.to_thread(self.buffer_factory, session_id=session_id))
+                self._loading[session_id] = task
+                task.add_done_callback(lambda done: self._loaded(session_id, done))
+            await asyncio.shield(task)
+        return self.get(session_id)
+
+    def _loaded(self, session_id: str, task):
+        self._loading.pop(session_id, None)
+        if not task.cancelled() and task.exception() is None and session_id not in self._buffers:
+            self._add(session_id, task.result())
+
+    def _add(self, session_id: str, buffer: MemoryBuffer) -> MemoryBuffer:
+        self._buffers[session_id] = buffer
+        self._last_used[session_id] = time.time()
+        self.loads += 1
+        self._evict_over_capacity(keep=session_id)
+        return buffer
+
+    def peek(self, session_id: str):
+        """Resident buffer or None - never loads, never changes the LRU order"""
+        return self._buffers.get(session_id)
+
+    def resident(self):
+        """(session_id, buffer) pairs currently in memory, without refreshing their LRU position"""
+        return list(self._buffers.items())
+
+    def touch(self, session_id: str):
+        """Mark user activity in a session (idle thoughts go to the last active one)"""
+        self.last_active = session_id
+        self._last_used[session_id] = time.time()
+
+    async def attach(self, session_id: str):
+        """A client connected to this session - pin its buffer"""
+        self._connections[session_id] = self._connections.get(session_id, 0) + 1
+        await self.load(session_id)
+
+    def detach(self, session_id: str):
+        """A client disconnected from this session"""
+        count = self._connections.get(session_id, 0) - 1
+        if count > 0:
+            self._connections[session_id] = count
+        else:
+            self._connections.pop(session_id, None)
+        self._last_used[session_id] = time.time()
+
+    def is_connected(self, session_id: str) -> bool:
+        return session_id in self._connections
+
+    def evict_idle(self, now: float = None) -> int:
+        """Drop buffers with no clients that haven't been used for idle_timeout"""
+        now = now or time.time()
+        idle = [
+            sid for sid in self._buffers
+            if not self.is_connected(sid) and now - self._last_used.get(sid, 0) > self.idle_timeout
+        ]
+        for sid in idle:
+            self._evict(sid)
+        return len(idle)
+
+    def _evict_over_capacity(self, keep: str):
+        """Enforce the LRU cap, skipping sessions that still have clients"""
+        for sid in list(self._buffers):
+            if len(self._buffers) <= self.max_sessions:
+                break
+            if sid != keep and not self.is_connected(sid):
+                self._evict(sid)
+
+    def _evict(self, session_id: str):
+        self._buffers.pop(session_id, None)
+        self._last_used.pop(session_id, None)
+        self.evictions += 1
+        print(f"🗃️ Session '{session_id}' evicted from memory (history stays in DB)")
+
+    def get_stats(self):
+        """Get registry stats"""
+        return {
+            "resident": list(self._buffers),
+            "connected": dict(self._connections),
+            "last_active": self.last_active,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
+
+
+# Global instance
+sessions = SessionRegistry()
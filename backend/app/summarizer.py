@@ -0,0 +1,156 @@
+"""
+Rolling Conversation Summarizer
+Compresses turns trimmed out of MemoryBuffer into a running summary
+
+Key Features:
+- Runs only while the user is quiet (driven by idle_thought_loop)
+- Uses the local LLM at idle priority - any user message preempts it
+- One summary row per session in the DB, loaded with the session's buffer
+- Summary is injected into the prompt context (prompt.build_context)
+- Preempted/failed runs put the trimmed messages back for next time
+"""
+
+import asyncio
+from datetime import datetime
+from contextlib import aclosing
+
+from .db import SessionLocal
+from .models import ConversationSummary
+from .llm_scheduler import llm_scheduler, LLMPreempted, LLMQueueFull, PRIORITY_IDLE
+
+# Wait for this many trimmed messages before spending an LLM call
+SUMMARY_MIN_MESSAGES = 6
+
+# Only summarize after the user has been quiet this long (seconds)
+SUMMARY_IDLE_SECONDS = 45
+
+# Keep the summary short - it's sent with every prompt
+SUMMARY_MAX_CHARS = 1200
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a user and Alisa, "
+    "their companion. Merge the new messages into the existing summary. "
+    "Keep facts about the user, ongoing topics, plans, promises and the emotional tone. "
+    "Drop small talk. Write plain third-person notes, at most 6 short sentences, "
+    "no emotion tags, no preamble."
+)
+
+
+def save_summary(session_id: str, summary: str, messages_summarized: int):
+    """Upsert a session's summary row (runs in a worker thread)"""
+    db = SessionLocal()
+    try:
+        db.merge(ConversationSummary(
+            session_id=session_id,
+            summary=summary,
+            messages_summarized=messages_summarized,
+            updated_at=datetime.utcnow()
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+class ConversationSummarizer:
+    """
+    Folds trimmed messages into MemoryBuffer.summary
+
+    Usage:
+        if summarizer.needs_summary(memory):
+            await summarizer.summarize(memory)
+    """
+
+    def __init__(self, min_messages: int = None, scheduler=llm_scheduler):
+        self.min_messages = min_messages or SUMMARY_MIN_MESSAGES
+        self.scheduler = scheduler
+
+        # Stats
+        self.runs = 0
+        self.preempted = 0
+        self.failures = 0
+
+    def needs_summary(self, memory) -> bool:
+        return len(memory.evicted) >= self.min_messages
+
+    def build_messages(self, summary: str, batch):
+        """Summarization request for the LLM"""
+        transcript = "\n".join(
+            f"{'User' if m['role'] == 'user' else 'Alisa'}: {m['content']}" for m in batch
+        )
+        return [
+            {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+            {"role": "user", "content": (
+                f"Existing summary:\n{summary or '(none yet)'}\n\n"
+                f"New messages:\n{transcript}\n\n"
+                f"Updated summary:"
+            )}
+        ]
+
+    async def summarize(self, memory) -> bool:
+        """Fold the buffer's trimmed messages into its summary; returns True on success"""
+        batch = memory.take_evicted()
+        if not batch:
+            return False
+
+        print(f"📝 Summarizing {len(batch)} trimmed messages ({memory.session_id})...")
+        text = ""
+        try:
+            async with aclosing(self.scheduler.stream(
+                self.build_messages(memory.summary, batch),
+                PRIORITY_IDLE,
+                label="summary",
+                slot_key=f"{memory.session_id}/background"
+            )) as tokens:
+                async for token in tokens:
+                    text += token
+        except (LLMPreempted, LLMQueueFull):
+            memory.restore_evicted(batch)
+            self.preempted += 1
+            print("✋ Summary postponed (user is active)")
+            return False
+        except Exception as e:
+            memory.restore_evicted(batch)
+            self.failures += 1
+            print(f"⚠️ Summary failed: {e}")
+            return False
+
+        text = " ".join(text.split())[:SUMMARY_MAX_CHARS]
+        if not text:
+            memory.restore_evicted(batch)
+            self.failures += 1
+            return False
+
+        memory.summary = text
+        memory.messages_summarized += len(batch)
+        self.runs += 1
+
+        try:
+            await asyncio.to_thread(save_summary, memory.session_id, text, memory.messages_summarized)
+        except Exception as e:
+            print(f"⚠️ Could not save summary to DB: {e}")
+
+        print(f"✅ Summary updated ({len(text)} chars, {memory.messages_summarized} messages total)")
+        return True
+
+    async def run_pending(self, registry) -> int:
+        """Summarize every resident session with enough trimmed messages"""
+        done = 0
+        for session_id, memory in registry.resident():
+            if not self.needs_summary(memory):
+                continue
+            if self.scheduler.active is not None:
+                break  # Something else needs the LLM - try again next idle tick
+            if await self.summarize(memory):
+                done += 1
+        return done
+
+    def get_stats(self):
+        return {
+            "runs": self.runs,
+            "preempted": self.preempted,
+            "failures": self.failures,
+        }
+
+
+# Global instance
+summarizer = ConversationSummarizer()
@@ -0,0 +1,69 @@
+"""
+Token Counting
+Pluggable tokenizer used for context budgeting (MemoryBuffer, prompt sizes)
+
+Uses the served model's own tokenizer when one is configured:
+    ALISA_TOKENIZER_PATH=path/to/tokenizer.json  (needs: pip install tokenizers)
+Otherwise falls back to the original ~4 characters per token estimate.
+"""
+
+import os
+from functools import lru_cache
+
+# tokenizer.json of the model llama.cpp is serving (HF format, BPE/SentencePiece)
+TOKENIZER_PATH = os.getenv("ALISA_TOKENIZER_PATH", "")
+
+# Fallback heuristic
+CHARS_PER_TOKEN = 4
+
+# Recently counted strings (desktop context / canned replies repeat a lot)
+TOKEN_CACHE_SIZE = 2048
+
+# Real tokenizers need the optional "tokenizers" package
+try:
+    from tokenizers import Tokenizer as HFTokenizer
+    TOKENIZERS_AVAILABLE = True
+except ImportError:
+    TOKENIZERS_AVAILABLE = False
+
+
+class TokenCounter:
+    """
+    Counts tokens with the best tokenizer available
+
+    Usage:
+        token_counter.count("Hello Alisa")  # -> int
+        token_counter.name                 # "tokenizer.json" or "chars/4"
+    """
+
+    def __init__(self, path: str = TOKENIZER_PATH):
+        self.name = f"chars/{CHARS_PER_TOKEN}"
+        self._tokenizer = None
+
+        if path:
+            if not TOKENIZERS_AVAILABLE:
+                print(f"⚠️ ALISA_TOKENIZER_PATH set but 'tokenizers' isn't installed - using {self.name}")
+            else:
+                try:
+                    self._tokenizer = HFTokenizer.from_file(path)
+                    self.name = os.path.basename(path)
+                    print(f"🔢 Token counting with {path}")
+                except Exception as e:
+                    print(f"⚠️ Could not load tokenizer {path}: {e} - using {self.name}")
+
+        # Per-instance cache so swapping tokenizers never serves stale counts
+        self.count = lru_cache(maxsize=TOKEN_CACHE_SIZE)(self._count)
+
+    def _count(self, text: str) -> int:
+        if self._tokenizer is not None:
+            return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+        return len(text) // CHARS_PER_TOKEN
+
+    @property
+    def exact(self) -> bool:
+        """True when counts come from the model's tokenizer, not the estimate"""
+        return self._tokenizer is not None
+
+
+# Global instance
+token_counter = TokenCounter()
@@ -1,22 +1,30 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from .llm_client import stream_llm_response
-from .memory import MemoryBuffer
-from .memory_long import save_memory, fetch_recent_memories
+from .llm_scheduler import (
+    llm_scheduler, LLMPreempted, LLMCancelled,
+    PRIORITY_USER, PRIORITY_CONFIRMATION, PRIORITY_VISION, PRIORITY_IDLE
+)
+from .sessions import sessions, normalize_session_id, DEFAULT_SESSION
+from .summarizer import summarizer, SUMMARY_IDLE_SECONDS
+from .memory_long import save_memory, fetch_recent_memories, fetch_relevant_memories
 from .modes import set_mode, get_mode_prompt, current_mode
-from .emotion import extract_emotion
-from .prompt import build_prompt
+from .emotion import extract_emotion, EmotionStreamParser
+from .prompt import build_messages, build_prefix_messages
+from .prefill import speculative_prefill
 from .idle_companion import companion_system  # Phase 9B: Companion mode
 from .desktop_actions import DesktopActionsSystem  # Phase 10B: Desktop actions
 from .task_memory import task_memory  # Phase 10C: Task memory & habits
-from typing import List
+from .broadcaster import broadcaster, TokenCoalescer
+from .protocol import (
+    Message, MSG_HELLO, MSG_CHAT, MSG_MODE, MSG_PING, MSG_SPEECH_START, MSG_SPEECH_END,
+    MSG_VISION_FACE, MSG_VISION_DESKTOP, MSG_VISION_SCREEN, MSG_VISION_STATE, MSG_PARTIAL_TRANSCRIPT,
+    MSG_CANCEL, MSG_LIPSYNC, LIPSYNC_MAX_FRAMES, END, ERROR, MODE_CHANGED, SPEECH_START, SPEECH_END,
+    token_message, emotion_message, hello_message, lipsync_message, negotiate_version, parse_message, parse_topics
+)
 import asyncio
 import time
+from contextlib import aclosing
 import random
-import json
 import re
-from datetime import datetime
-
-memory = MemoryBuffer()
 
 # Phase 10B: Desktop actions system
 actions_system = DesktopActionsSystem()
@@ -24,9 +32,6 @@ actions_system = DesktopActionsSystem()
 # Phase 10C: Task memory system (learns habits)
 # Initialized globally, observes automatically
 
-# Store all connected WebSocket clients
-connected_clients: List[WebSocket] = []
-
 # Track last user activity for idle thought engine
 last_user_activity = time.time()
 idle_thought_active = False  # Prevent multiple idle thoughts at once
@@ -42,31 +47,37 @@ vision_state = {
     "last_reaction": 0,  # Last time Alisa reacted to vision (to avoid spam)
 }
 
-async def broadcast_message(message: str, exclude: WebSocket = None):
-    """Send a message to all connected clients, optionally excluding one"""
-    disconnected = []
-    broadcast_count = 0
-    for client in connected_clients:
-        if client != exclude:
-            try:
-                await client.send_text(message)
-                broadcast_count += 1
-            except Exception as e:
-                print(f"⚠️ Broadcast error: {e}")
-                disconnected.append(client)
+def broadcast_message(message: Message, exclude: WebSocket = None, session: str = None):
+    """
+    Queue a message for all connected clients of a session, optionally excluding one.
+    Never awaits a socket - each client's writer task drains its own queue
+    and encodes the message for its own protocol version.
+    """
+    broadcast_count = broadcaster.broadcast(message, exclude=exclude, session=session)
     
-    if message in ["[SPEECH_START]", "[SPEECH_END]"]:
+    if message.type in (MSG_SPEECH_START, MSG_SPEECH_END):
         print(f"   → Broadcasted to {broadcast_count} client(s)")
-    
-    # Remove disconnected clients
-    for client in disconnected:
-        if client in connected_clients:
-            connected_clients.remove(client)
 
-async def trigger_idle_response():
+def token_broadcaster(session: str = None) -> TokenCoalescer:
+    """Coalescing stage between the LLM stream and the sockets"""
+    return TokenCoalescer(lambda text: broadcast_message(token_message(text), session=session))
+
+def emotion_parser(session: str = None) -> EmotionStreamParser:
+    """Strips the emotion tag from streamed tokens and sends the emotion as soon as it's known"""
+    return EmotionStreamParser(
+        on_emotion=lambda emotion: broadcast_message(emotion_message(emotion), session=session)
+    )
+
+def session_of(websocket: WebSocket) -> str:
+    """Session a connected client belongs to"""
+    conn = broadcaster.get(websocket)
+    return conn.session if conn else DEFAULT_SESSION
+
+async def trigger_idle_response(session: str = DEFAULT_SESSION):
     """
     Generate and broadcast an idle thought from Alisa with Phase 9B companion mode
     Enhanced with natural, spontaneous companion behavior
+    Goes to one session only (the one the user was last active in)
     """
     global idle_thought_active, last_emotion_expressed
     
@@ -74,11 +85,16 @@ async def trigger_idle_response():
         print("⏸️ Idle thought already in progress, skipping")
         return
     
-    if len(connected_clients) == 0:
-        print("⏸️ No clients connected, skipping idle thought")
+    if not broadcaster.has_clients(session):
+        print(f"⏸️ No clients connected to session '{session}', skipping idle thought")
+        return
+    
+    if llm_scheduler.active is not None:
+        print(f"⏸️ LLM busy ({llm_scheduler.active.label}), skipping idle thought")
         return
     
     idle_thought_active = True
+    memory = await sessions.load(session)
     
     try:
         # Phase 9B: Use companion system for context-aware prompting
@@ -97,25 +113,25 @@ async def trigger_idle_response():
         
         memories = fetch_recent_memories()
         
-        # Build system message with companion context
-        system_prompt = build_prompt(
+        # Build messages with companion context (static prefix first for KV-cache reuse)
+        messages = build_messages(
             get_mode_prompt(), 
             memories, 
-            vision_context=companion_prompt
+            vision_context=companion_prompt,
+            summary=memory.summary
         )
         
-        messages = [
-            {"role": "system", "content": system_prompt}
-        ]
+        parser = emotion_parser(session)
         
-        full_response = ""
+        with token_broadcaster(session) as out:
+            async with aclosing(llm_scheduler.stream(messages, PRIORITY_IDLE, slot_key=f"{session}/background",
+                                                     owner=session)) as tokens:
+                async for token in tokens:
+                    # Broadcast to ALL clients
+                    out.push(parser.feed(token))
+            out.push(parser.finish())
         
-        async for token in stream_llm_response(messages):
-            full_response += token
-            # Broadcast to ALL clients
-            await broadcast_message(token, exclude=None)
-        
-        emotion, clean_text = extract_emotion(full_response)
+        emotion, clean_text = parser.emotion, parser.text.strip()
         
         # GUARD: Detect broken LLM responses in idle thoughts
         valid_emotions = ["teasing", "calm", "serious", "happy", "sad", "neutral", "shy"]
@@ -132,12 +148,15 @@ async def trigger_idle_response():
         memory.add("assistant", clean_text)
         save_memory(emotion, clean_text)
         
-        # Send emotion and end markers
-        await broadcast_message(f"[EMOTION]{emotion}", exclude=None)
-        await broadcast_message("[END]", exclude=None)
+        # Send end marker (the emotion went out as soon as the parser saw it)
+        broadcast_message(END, session=session)
         
         print(f"✅ Companion speech ({emotion}): {clean_text[:60]}...")
         
+    except LLMPreempted:
+        # User spoke - drop the half-finished thought, close the stream for clients
+        print("✋ Companion speech preempted by user")
+        broadcast_message(END, session=session)
     except Exception as e:
         print(f"❌ Error generating idle thought: {e}")
         import traceback
@@ -150,8 +169,6 @@ async def idle_thought_loop():
     Background task that triggers idle thoughts using Phase 9B companion system
     Natural, rare, spontaneous behavior - companion mode
     """
-    global last_user_activity
-    
     print("🧠 Phase 9B - Companion System initialized")
     print("🎯 Phase 10C - Task Memory & Habits initialized")
     print("   Alisa will speak spontaneously when it feels natural")
@@ -161,6 +178,13 @@ async def idle_thought_loop():
     while True:
         await asyncio.sleep(30)  # Check every 30 seconds
         
+        # Free buffers of sessions nobody has used for a while
+        sessions.evict_idle()
+        
+        # Fold trimmed turns into each session's rolling summary while the user is quiet
+        if time.time() - last_user_activity >= SUMMARY_IDLE_SECONDS and llm_scheduler.active is None:
+            await summarizer.run_pending(sessions)
+        
         # Phase 10C: Observe silence period
         silence_duration = (time.time() - last_user_activity) / 60  # minutes
         task_memory.observe_silence(silence_duration)
@@ -184,12 +208,12 @@ async def idle_thought_loop():
             # Get companion stats for logging
             stats = companion_system.get_stats()
             print(f"🎯 Phase 9B trigger: {reason}")
-            print(f"✅ Phase 10C permits interrupt")
+            print("✅ Phase 10C permits interrupt")
             print(f"   Stats: silence={stats['silence_duration']:.0f}s, "
                   f"companion_mode={stats['companion_mode_active']}, "
                   f"conversations={stats['conversation_count']}")
             
-            await trigger_idle_response()
+            await trigger_idle_response(sessions.last_active)
         else:
             # Debug: log why we're not speaking (only occasionally to avoid spam)
             if random.random() < 0.1:  # 10% of checks
@@ -198,636 +222,718 @@ async def idle_thought_loop():
                       f"(silence={stats['silence_duration']:.0f}s, "
                       f"category={stats['silence_category']})")
 
-async def keepalive_ping(websocket: WebSocket, interval: int = 20):
-    """Send periodic pings to keep connection alive during long LLM generations"""
+async def handle_hello(websocket: WebSocket, message: Message):
+    """Protocol negotiation sent as the first frame (alternative to ?protocol= / ?subscribe=)"""
+    conn = broadcaster.get(websocket)
+    if conn is None:
+        return
+    version = negotiate_version(message.get("v"))
+    conn.structured = version > 0
+    if "subscribe" in message.data:
+        conn.topics = parse_topics(message.get("subscribe"))
+    if "session" in message.data:
+        session = normalize_session_id(message.get("session"))
+        if session != conn.session:
+            sessions.detach(conn.session)
+            await sessions.attach(session)
+            conn.session = session
+    if conn.structured:
+        broadcaster.send(websocket, hello_message(version))
+    print(f"🤝 Client ({conn.role}@{conn.session}) negotiated protocol v{version}, topics: {', '.join(sorted(conn.topics)) or 'none'}")
+
+async def handle_speech_start(websocket: WebSocket, message: Message):
+    """Speech control from the voice clients - relay to overlay"""
+    session = session_of(websocket)
+    print(f"📨 Received: {message.type}")
+    # Broadcast to overlay only (not back to sender)
+    print("📢 Broadcasting [SPEECH_START] to overlay")
+    broadcast_message(SPEECH_START, exclude=websocket, session=session)
+
+async def handle_speech_end(websocket: WebSocket, message: Message):
+    session = session_of(websocket)
+    print(f"📨 Received: {message.type}")
+    # Broadcast to overlay only (not back to sender)
+    print("📢 Broadcasting [SPEECH_END] to overlay")
+    broadcast_message(SPEECH_END, exclude=websocket, session=session)
+
+async def handle_lipsync(websocket: WebSocket, message: Message):
+    """Mouth envelope for the segment a voice client just started playing - relay to overlay"""
+    levels = message.get("levels")
+    fps = message.get("fps")
+    if not isinstance(levels, list) or not isinstance(fps, (int, float)) or fps <= 0:
+        return
+    # Arrives every sentence - relayed without logging
+    broadcast_message(lipsync_message(fps, levels[:LIPSYNC_MAX_FRAMES]),
+                      exclude=websocket, session=session_of(websocket))
+
+async def handle_vision_face(websocket: WebSocket, message: Message):
+    """Vision system input - user presence/emotion detection"""
+    global last_emotion_expressed
+
+    session = session_of(websocket)
+    memory = await sessions.load(session)
+
+    state = message.get("state", "")
+    current_time = time.time()
+
+    # Update vision state
+    old_presence = vision_state["presence"]
+    old_attention = vision_state["attention"]
+    old_emotion = vision_state["emotion"]
+
+    if state == "present":
+        vision_state["presence"] = "present"
+        print(f"👁️ Vision: User present (was: {old_presence})")
+    elif state == "absent":
+        vision_state["presence"] = "absent"
+        print(f"👁️ Vision: User absent (was: {old_presence})")
+    elif state == "focused":
+        vision_state["attention"] = "focused"
+        print(f"👁️ Vision: User focused (was: {old_attention})")
+    elif state == "distracted":
+        vision_state["attention"] = "distracted"
+        print(f"👁️ Vision: User distracted (was: {old_attention})")
+    else:
+        vision_state["emotion"] = state
+        print(f"👁️ Vision: User emotion - {state}")
+
+    vision_state["last_update"] = current_time
+
+    # Let vision-state subscribers (e.g. overlay) follow presence/attention changes
+    if (vision_state["presence"], vision_state["attention"], vision_state["emotion"]) != (old_presence, old_attention, old_emotion):
+        broadcast_message(Message(
+            MSG_VISION_STATE,
+            presence=vision_state["presence"],
+            attention=vision_state["attention"],
+            emotion=vision_state["emotion"]
+        ), session=session)
+
+    # Intelligent reaction logic: Only react when meaningful
+    # Don't spam reactions - wait at least 30 seconds between reactions
+    time_since_last_reaction = current_time - vision_state["last_reaction"]
+    should_react = False
+    reaction_prompt = ""
+
+    print(f"🔍 Debug - Time since last reaction: {time_since_last_reaction:.1f}s")
+
+    # User returned after being away
+    if (old_presence == "absent" or old_presence == "unknown") and vision_state["presence"] == "present":
+        print(f"✅ Detected: User returned (old: {old_presence} → new: present)")
+        if time_since_last_reaction > 30:
+            should_react = True
+            reaction_prompt = "The user just came back to their computer. Welcome them back warmly but casually."
+            vision_state["last_reaction"] = current_time
+            print("💭 Will react: User returned")
+        else:
+            print(f"⏸️ Not reacting yet (need {30 - time_since_last_reaction:.1f}s more)")
+
+    # User went away (might comment if they were in middle of conversation)
+    elif old_presence == "present" and vision_state["presence"] == "absent":
+        print(f"❌ Detected: User left (memory items: {len(memory.get())})")
+        # Only comment if conversation was recent (within last 2 minutes)
+        if len(memory.get()) > 0 and time_since_last_reaction > 60:
+            should_react = True
+            reaction_prompt = "The user just left. Make a brief, tsundere-style comment about them leaving."
+            vision_state["last_reaction"] = current_time
+            print("💭 Will react: User left during conversation")
+        else:
+            print(f"⏸️ Not reacting (memory: {len(memory.get())}, time: {time_since_last_reaction:.1f}s)")
+
+    # User got distracted (looking away for a while)
+    elif old_attention == "focused" and vision_state["attention"] == "distracted":
+        print(f"😴 Detected: User distracted (memory items: {len(memory.get())})")
+        # Only comment if they were actively chatting
+        if len(memory.get()) > 2 and time_since_last_reaction > 60:
+            should_react = True
+            reaction_prompt = "The user is looking away while you're talking. Tease them gently or ask if they're listening."
+            vision_state["last_reaction"] = current_time
+            print("💭 Will react: User got distracted")
+        else:
+            print(f"⏸️ Not reacting (memory: {len(memory.get())}, time: {time_since_last_reaction:.1f}s)")
+
+    if not should_react:
+        return
+
+    # Generate reaction
+    print("💭 Alisa reacting to vision event...")
+    print(f"📝 Reaction prompt: {reaction_prompt}")
+
+    memories = await fetch_relevant_memories(reaction_prompt)
+    messages = build_messages(
+        get_mode_prompt(),
+        memories,
+        vision_context=reaction_prompt,
+        summary=memory.summary
+    )
+    messages.append({"role": "system", "content": reaction_prompt})  # Direct instruction
+
+    parser = emotion_parser(session)
     try:
-        while True:
-            await asyncio.sleep(interval)
-            try:
-                await websocket.send_text("")  # Send empty string as keepalive
-            except:
-                break
+        with token_broadcaster(session) as out:
+            async with aclosing(llm_scheduler.stream(messages, PRIORITY_VISION, slot_key=f"{session}/background",
+                                                     owner=session)) as tokens:
+                async for token in tokens:
+                    # Broadcast to ALL clients (text_chat, overlay, etc) - NOT just vision client
+                    out.push(parser.feed(token))
+            out.push(parser.finish())
+
+        emotion, clean_text = parser.emotion, parser.text.strip()
+
+        # GUARD: Detect broken LLM responses
+        valid_emotions = ["teasing", "calm", "serious", "happy", "sad", "neutral", "shy"]
+        if clean_text.strip().lower() in valid_emotions or len(clean_text.strip()) < 3:
+            print(f"⚠️ Vision reaction broken: '{clean_text}' - using fallback")
+            fallbacks = {
+                "teasing": "Hmph.",
+                "shy": "...",
+                "calm": "Mhm.",
+                "serious": "...",
+                "happy": "Heh.",
+                "sad": "...",
+                "neutral": "..."
+            }
+            clean_text = fallbacks.get(emotion, "...")
+
+        last_emotion_expressed = emotion  # Track for idle continuity
+        memory.add("assistant", clean_text)
+        save_memory(emotion, clean_text)
+
+        # Send end marker to all clients
+        broadcast_message(END, session=session)
+
+        print(f"✅ Vision reaction sent to all clients: {clean_text[:50]}...")
+
+    except LLMPreempted:
+        print("✋ Vision reaction preempted by user")
+        broadcast_message(END, session=session)
+    except Exception as e:
+        print(f"❌ Error generating vision reaction: {e}")
+        import traceback
+        traceback.print_exc()
+
+async def handle_vision_desktop(websocket: WebSocket, message: Message):
+    """Phase 10A: Desktop understanding messages"""
+    global last_emotion_expressed
+
+    session = session_of(websocket)
+    memory = await sessions.load(session)
+
+    if "task" not in message.data:
+        return  # Malformed legacy frame
+
+    task = message.get("task", "")
+    app_type = message.get("app", "unknown")
+    file_type = message.get("file_type", "unknown")
+    has_error = bool(message.get("has_error", False))
+    offer_message = message.get("offer", "")
+    window = message.get("window", "")
+
+    # Phase 10C: Observe activity and learn patterns
+    task_memory.observe_activity(task, {
+        "app": app_type,
+        "file_type": file_type,
+        "has_error": has_error,
+        "window": window
+    })
+
+    # Store desktop context
+    desktop_context = f"Desktop: {task}"
+    if app_type != "unknown":
+        desktop_context += f" in {app_type}"
+    if file_type != "unknown":
+        desktop_context += f" ({file_type} file)"
+
+    memory.add("system", desktop_context)
+
+    # Log
+    print(f"🖥️  Desktop understanding: {task}")
+
+    # If error detected and should offer help
+    if not (has_error and offer_message):
+        return
+
+    print(f"💡 Alisa can offer: {offer_message}")
+
+    # Generate helpful offer (only if not offered recently)
+    # This is automatic but rare (desktop_understanding handles timing)
+    memories = await fetch_relevant_memories(desktop_context)
+
+    offer_prompt = (
+        f"Context: {desktop_context}. "
+        f"An error was detected on the user's screen. "
+        f"Offer: {offer_message} "
+        f"Be natural and brief. Don't be pushy. "
+        f"This is an offer, not a forced conversation."
+    )
+
+    messages = build_messages(
+        get_mode_prompt(),
+        memories,
+        vision_context=offer_prompt,
+        summary=memory.summary
+    )
+    messages.append({"role": "system", "content": offer_prompt})
+
+    parser = emotion_parser(session)
+    try:
+        with token_broadcaster(session) as out:
+            async with aclosing(llm_scheduler.stream(messages, PRIORITY_VISION, label="desktop offer",
+                                                     slot_key=f"{session}/background", owner=session)) as tokens:
+                async for token in tokens:
+                    out.push(parser.feed(token))
+            out.push(parser.finish())
+
+        emotion, clean_text = parser.emotion, parser.text.strip()
+
+        last_emotion_expressed = emotion
+        memory.add("assistant", clean_text)
+        save_memory(emotion, clean_text)
+
+        broadcast_message(END, session=session)
+
+        print(f"✅ Phase 10A offer sent: {clean_text[:50]}...")
+
+    except LLMPreempted:
+        print("✋ Phase 10A offer preempted by user")
+        broadcast_message(END, session=session)
+    except Exception as e:
+        print(f"❌ Error generating Phase 10A offer: {e}")
+
+async def handle_vision_screen(websocket: WebSocket, message: Message):
+    """Vision system screen context (legacy, kept for compatibility)"""
+    memory = await sessions.load(session_of(websocket))
+    window = message.get("window", "")
+    text = message.get("text", "")
+
+    # Store screen context in memory (system message)
+    screen_context = f"Screen context: {window}"
+    if text:
+        screen_context += f" - Content visible: {text[:200]}"
+
+    memory.add("system", screen_context)
+    print(f"📺 Screen context stored: {window[:50]}...")
+
+    # Don't send response, just acknowledge and store
+
+async def handle_mode(websocket: WebSocket, message: Message):
+    """Conversation mode changes"""
+    print(f"📨 Received: /mode {message.get('mode', '')}")
+    set_mode(message.get("mode", ""))
+    broadcaster.send(websocket, MODE_CHANGED)
+    broadcaster.send(websocket, END)
+
+def send_action_reply(response: str, session: str):
+    """Send a canned action result to all clients of the session"""
+    emotion, clean = extract_emotion(response)
+    broadcast_message(token_message(clean), session=session)
+    broadcast_message(emotion_message(emotion), session=session)
+    broadcast_message(END, session=session)
+
+# Phase 10B: Action command patterns (compiled once)
+OPEN_APP_PATTERN = re.compile(r'\b(open|launch|start)\s+(\w+)')
+CLOSE_APP_PATTERN = re.compile(r'\b(close|quit|exit)\s+(\w+)')
+NAVIGATE_PATTERN = re.compile(r'(?:go to|navigate to)\s+([a-z0-9.-]+\.[a-z]{2,})')
+SCROLL_PATTERN = re.compile(r'scroll\s+(up|down)')
+READ_FILE_PATTERN = re.compile(r'(?:read file|show me)\s+(.+)')
+NOTE_PATTERN = re.compile(r'(?:take note|write note|save note):?\s+(.+)', re.IGNORECASE)
+
+CONFIRM_WORDS = {"yes", "yeah", "yep", "sure", "okay", "ok", "do it"}
+DECLINE_WORDS = {"no", "nope", "nah", "cancel", "don't"}
+
+def detect_action(user_input: str):
+    """
+    Phase 10B: Detect action commands in user input
+    Returns (action_type, action_params) or (None, {})
+    """
+    user_lower = user_input.lower()
+
+    # Pattern matching for various action types
+    # Open app patterns
+    match = OPEN_APP_PATTERN.search(user_lower)
+    if match:
+        app_name = match.group(2)
+        print(f"🎯 Phase 10B: Detected open app command - {app_name}")
+        return "open_app", {"app_name": app_name}
+
+    # Close app patterns
+    match = CLOSE_APP_PATTERN.search(user_lower)
+    if match:
+        app_name = match.group(2)
+        print(f"🎯 Phase 10B: Detected close app command - {app_name}")
+        return "close_app", {"app_name": app_name}
+
+    # Browser navigation
+    if "go to" in user_lower or "navigate to" in user_lower:
+        # Extract URL
+        match = NAVIGATE_PATTERN.search(user_lower)
+        if match:
+            url = match.group(1)
+            if not url.startswith("http"):
+                url = "https://" + url
+            print(f"🎯 Phase 10B: Detected browser navigation - {url}")
+            return "browser_navigate", {"url": url}
+        return None, {}
+
+    # New tab
+    if "new tab" in user_lower or "open tab" in user_lower:
+        print("🎯 Phase 10B: Detected new tab command")
+        return "browser_new_tab", {}
+
+    # Close tab
+    if "close tab" in user_lower:
+        print("🎯 Phase 10B: Detected close tab command")
+        return "browser_close_tab", {}
+
+    # Scroll
+    match = SCROLL_PATTERN.search(user_lower)
+    if match:
+        direction = match.group(1)
+        print(f"🎯 Phase 10B: Detected scroll command - {direction}")
+        return "scroll", {"amount": 3, "direction": direction}
+
+    # Type text
+    if user_lower.startswith("type "):
+        text = user_input[5:].strip()
+        print(f"🎯 Phase 10B: Detected type command - {text[:30]}")
+        return "type_text", {"text": text}
+
+    # Read file
+    if "read file" in user_lower or "show me" in user_lower and "file" in user_lower:
+        # Try to extract filename/path
+        match = READ_FILE_PATTERN.search(user_input)
+        if match:
+            filepath = match.group(1).strip('"\'')
+            print(f"🎯 Phase 10B: Detected read file command - {filepath}")
+            return "read_file", {"filepath": filepath}
+        return None, {}
+
+    # Take note / write note
+    if "take note" in user_lower or "write note" in user_lower or "save note" in user_lower:
+        # Extract note content (everything after the command)
+        match = NOTE_PATTERN.search(user_input)
+        if match:
+            content = match.group(1).strip()
+            print(f"🎯 Phase 10B: Detected write note command - {content[:30]}")
+            return "write_note", {"content": content}
+
+    return None, {}
+
+def execute_action(action_type: str, action_params: dict):
+    """Run a detected desktop action directly"""
+    actions = {
+        "open_app": actions_system.open_app,
+        "close_app": actions_system.close_app,
+        "browser_navigate": actions_system.browser_navigate,
+        "browser_new_tab": actions_system.browser_new_tab,
+        "browser_close_tab": actions_system.browser_close_tab,
+        "scroll": actions_system.scroll,
+        "type_text": actions_system.type_text,
+        "read_file": actions_system.read_file,
+        "write_note": actions_system.write_note,
+    }
+    action = actions.get(action_type)
+    if action is None:
+        return False, ""
+    return action(**action_params)
+
+async def ask_action_confirmation(user_input: str, action_type: str, action_params: dict, session: str):
+    """Phase 10B: Ask for confirmation via LLM"""
+    memory = await sessions.load(session)
+    print("❓ Phase 10B: Asking for confirmation via LLM")
+
+    # Store pending action
+    actions_system.set_pending_action(action_type, action_params)
+
+    # Build confirmation prompt
+    memories = await fetch_relevant_memories(user_input)
+
+    action_description = {
+        "open_app": f"open {action_params.get('app_name')}",
+        "close_app": f"close {action_params.get('app_name')}",
+        "browser_navigate": f"navigate to {action_params.get('url')}",
+        "browser_new_tab": "open a new browser tab",
+        "browser_close_tab": "close the current tab",
+        "scroll": f"scroll {action_params.get('direction')}",
+        "type_text": f"type: {action_params.get('text', '')[:30]}",
+        "read_file": f"read file: {action_params.get('filepath')}",
+        "write_note": "save a note"
+    }.get(action_type, "do that")
+
+    confirmation_prompt = (
+        f"The user wants you to {action_description}. "
+        f"Ask for their confirmation in a natural, casual way. "
+        f"Keep it brief and conversational. Don't be formal."
+    )
+
+    messages = build_messages(
+        get_mode_prompt(),
+        memories,
+        history=[{"role": "user", "content": user_input}],
+        vision_context=confirmation_prompt,
+        summary=memory.summary
+    )
+
+    parser = emotion_parser(session)
+    try:
+        with token_broadcaster(session) as out:
+            async with aclosing(llm_scheduler.stream(messages, PRIORITY_CONFIRMATION, slot_key=session,
+                                                     owner=session)) as tokens:
+                async for token in tokens:
+                    out.push(parser.feed(token))
+            out.push(parser.finish())
+
+        emotion, clean_text = parser.emotion, parser.text.strip()
+
+        memory.add("user", user_input)
+        memory.add("assistant", clean_text)
+        save_memory(emotion, clean_text)
+
+        broadcast_message(END, session=session)
+
+        print("✅ Phase 10B: Confirmation question sent")
+
+    except LLMCancelled:
+        # User talked over the question - forget the action
+        actions_system.clear_pending_action()
+        broadcast_message(END, session=session)
+    except Exception as e:
+        print(f"❌ Error generating confirmation: {e}")
+
+async def handle_partial_transcript(websocket: WebSocket, message: Message):
+    """Interim STT text: warm the LLM's cache with this turn's prompt prefix"""
+    global last_user_activity
+
+    session = session_of(websocket)
+    last_user_activity = time.time()  # User is talking - hold idle thoughts
+    memory = await sessions.load(session)
+
+    def build(text):
+        # Must match what handle_chat sends once the final transcript is added
+        history = memory.preview_add("user", text)
+        return build_prefix_messages(get_mode_prompt(), history)
+
+    speculative_prefill.submit(session, message.get("text", ""), build)
+
+async def handle_cancel(websocket: WebSocket, message: Message):
+    """Barge-in: the user started talking over Alisa - abort this session's replies"""
+    session = session_of(websocket)
+    if not llm_scheduler.cancel(session, reason="(barge-in)"):
+        print("🛑 Barge-in: nothing generating")
+
+async def handle_chat(websocket: WebSocket, message: Message):
+    """User chat: action confirmations, action commands, then regular replies"""
+    global last_user_activity, last_emotion_expressed
+
+    user_input = message.get("text", "")
+    session = session_of(websocket)
+    memory = await sessions.load(session)
+
+    # Update last activity timestamp for REAL user messages only
+    last_user_activity = time.time()
+    sessions.touch(session)
+
+    # Final transcript: stop speculative prefills for this turn
+    speculative_prefill.commit(session)
+
+    # Phase 10B: Handle explicit action confirmations
+    if user_input.strip().lower() in CONFIRM_WORDS and actions_system.pending_action:
+        print("✅ Phase 10B: User confirmed action")
+        success, result = actions_system.execute_pending_action()
+
+        # Send result back to user
+        send_action_reply(f"[TEASING] {result}" if success else f"[SERIOUS] {result}", session)
+        return
+
+    # Phase 10B: Handle action rejections
+    if user_input.strip().lower() in DECLINE_WORDS and actions_system.pending_action:
+        print("❌ Phase 10B: User declined action")
+        actions_system.clear_pending_action()
+        send_action_reply("[CALM] Alright, no problem.", session)
+        return
+
+    # Phase 10B: Detect action commands in user input
+    action_type, action_params = detect_action(user_input)
+
+    # If action detected, ask for confirmation (unless it's a direct command)
+    if action_type:
+        # Check if it's a direct command (explicit verb at start)
+        is_direct_command = user_input.lower().startswith(("open ", "close ", "launch ", "start ",
+                                                           "type ", "scroll ", "new tab", "close tab"))
+
+        if is_direct_command:
+            # Execute directly for explicit commands
+            print("⚡ Phase 10B: Direct command, executing immediately")
+            success, result = execute_action(action_type, action_params)
+
+            # Send result
+            send_action_reply(f"[TEASING] {result}" if success else f"[SERIOUS] {result}", session)
+        else:
+            await ask_action_confirmation(user_input, action_type, action_params, session)
+        return
+
+    # Regular chat message
+    memory.add("user", user_input)
+
+    # Phase 9B: Update companion system on user activity
+    companion_system.update_user_activity()
+
+    # Phase 10C: Observe user interaction
+    task_memory.observe_interaction("chat")
+
+    # Phase 10C: Get adaptive suggestions based on learned patterns
+    adaptive_suggestions = task_memory.get_adaptive_suggestions()
+
+    # Show conversation history stats
+    summary = memory.get_summary()
+    print(f"💬 Conversation: {summary['turns']} turns, ~{summary['estimated_tokens']} tokens")
+
+    memories = await fetch_relevant_memories(user_input)
+    # Static prompt + history form a stable prefix the LLM server keeps cached per slot
+    messages = build_messages(
+        get_mode_prompt(),
+        memories,
+        history=memory.get(),
+        task_insights=adaptive_suggestions,
+        summary=memory.summary
+    )
+
+    parser = emotion_parser(session)
+
+    try:
+        with token_broadcaster(session) as out:
+            async with aclosing(llm_scheduler.stream(messages, PRIORITY_USER, slot_key=session,
+                                                     owner=session)) as tokens:
+                async for token in tokens:
+                    # Stop generating if the requesting client went away
+                    if not broadcaster.is_connected(websocket):
+                        print("⚠️ Requesting client disconnected, stopping generation")
+                        break
+                    # Fan out to the requester and other clients (like overlay)
+                    out.push(parser.feed(token))
+            out.push(parser.finish())
+
+        emotion, clean_text = parser.emotion, parser.text.strip()
+
+        # GUARD: Detect broken LLM responses (just emotion word, no content)
+        # Valid emotions that might be the entire response
+        valid_emotions = ["teasing", "calm", "serious", "happy", "sad", "neutral", "shy"]
+        if clean_text.strip().lower() in valid_emotions or len(clean_text.strip()) < 3:
+            # LLM output was broken (just emotion word or too short)
+            print(f"⚠️ Detected broken response: '{clean_text}' - using fallback")
+            # Use a contextual fallback based on emotion
+            fallbacks = {
+                "teasing": "...",
+                "shy": "Um...",
+                "calm": "Mhm.",
+                "serious": "I see.",
+                "happy": "Heh.",
+                "sad": "...",
+                "neutral": "..."
+            }
+            clean_text = fallbacks.get(emotion, "...")
+
+        last_emotion_expressed = emotion  # Track for idle continuity
+
+        memory.add("assistant", clean_text)
+        save_memory(emotion, clean_text)
+
+        # Send end marker to all clients
+        broadcast_message(END, session=session)
+
+    except LLMCancelled:
+        # Barge-in: keep what was said so far so the history stays in turn order
+        partial_text = parser.text.strip()
+        print(f"🛑 Reply cut off by user after {len(partial_text)} chars")
+        memory.add("assistant", partial_text + "..." if partial_text else "...")
+        broadcast_message(END, session=session)
+    except Exception as e:
+        print(f"❌ Error during LLM streaming: {e}")
+        broadcaster.send(websocket, ERROR)
+        broadcaster.send(websocket, END)
+
+# Inbound message dispatch table
+MESSAGE_HANDLERS = {
+    MSG_HELLO: handle_hello,
+    MSG_SPEECH_START: handle_speech_start,
+    MSG_SPEECH_END: handle_speech_end,
+    MSG_LIPSYNC: handle_lipsync,
+    MSG_VISION_FACE: handle_vision_face,
+    MSG_VISION_DESKTOP: handle_vision_desktop,
+    MSG_VISION_SCREEN: handle_vision_screen,
+    MSG_MODE: handle_mode,
+    MSG_CHAT: handle_chat,
+    MSG_PARTIAL_TRANSCRIPT: handle_partial_transcript,
+    MSG_CANCEL: handle_cancel,
+}
+
+# Handlers that run beside the receive loop so a cancel can reach them mid-reply
+TURN_MESSAGES = {MSG_CHAT}
+
+async def run_turn(previous, handler, websocket: WebSocket, message: Message):
+    """
+    Run a chat turn once the client's previous turn is done (turns stay in order)
+    Cancelling the latest turn cancels the whole chain (client disconnected)
+    """
+    try:
+        if previous is not None:
+            await asyncio.wait([previous])
+        await handler(websocket, message)
     except asyncio.CancelledError:
-        pass
+        if previous is not None:
+            previous.cancel()
+        raise
+    except Exception as e:
+        print(f"❌ Chat turn failed: {e}")
 
 async def websocket_chat(websocket: WebSocket):
-    global last_user_activity, last_emotion_expressed
-    
     await websocket.accept()
-    connected_clients.append(websocket)
-    print(f"✅ Client connected. Total clients: {len(connected_clients)}")
-
-    # Start keepalive task
-    keepalive_task = asyncio.create_task(keepalive_ping(websocket))
+    # Each client gets its own send queue + writer (which also sends keepalives)
+    role = websocket.query_params.get("role", "client")
+    version = negotiate_version(websocket.query_params.get("protocol"))
+    topics = parse_topics(websocket.query_params.get("subscribe"))
+    session = normalize_session_id(websocket.query_params.get("session"))
+    conn = broadcaster.register(websocket, role=role, structured=version > 0, topics=topics, session=session)
+    await sessions.attach(session)
+    if conn.structured:
+        broadcaster.send(websocket, hello_message(version))
+    print(f"✅ Client connected ({role}@{session}, protocol v{version}, topics: {', '.join(sorted(topics)) or 'none'}). "
+          f"Total clients: {len(broadcaster)}")
+    turn = None  # Latest chat turn task for this client
 
     try:
         while True:
-            user_input = await websocket.receive_text()
-            
-            # Update last activity timestamp for REAL user messages only
-            # (not control messages or vision updates)
-            if not user_input.startswith("[") and not user_input.startswith("/"):
-                last_user_activity = time.time()
-            
-            # Log control messages
-            if user_input in ["[SPEECH_START]", "[SPEECH_END]"] or user_input.startswith("/mode"):
-                print(f"📨 Received: {user_input}")
-
-            # Handle speech control messages from text_chat
-            if user_input == "[SPEECH_START]":
-                # Broadcast to overlay only (not back to sender)
-                print("📢 Broadcasting [SPEECH_START] to overlay")
-                await broadcast_message("[SPEECH_START]", exclude=websocket)
-                continue
-            
-            if user_input == "[SPEECH_END]":
-                # Broadcast to overlay only (not back to sender)
-                print("📢 Broadcasting [SPEECH_END] to overlay")
-                await broadcast_message("[SPEECH_END]", exclude=websocket)
-                continue
+            raw = await websocket.receive_text()
+            message = parse_message(raw, conn.structured)
 
-            # Handle vision system input - user presence/emotion detection
-            if user_input.startswith("[VISION_FACE]"):
-                state = user_input.replace("[VISION_FACE]", "")
-                current_time = time.time()
-                
-                # Update vision state
-                old_presence = vision_state["presence"]
-                old_attention = vision_state["attention"]
-                
-                if state == "present":
-                    vision_state["presence"] = "present"
-                    print(f"👁️ Vision: User present (was: {old_presence})")
-                elif state == "absent":
-                    vision_state["presence"] = "absent"
-                    print(f"👁️ Vision: User absent (was: {old_presence})")
-                elif state == "focused":
-                    vision_state["attention"] = "focused"
-                    print(f"👁️ Vision: User focused (was: {old_attention})")
-                elif state == "distracted":
-                    vision_state["attention"] = "distracted"
-                    print(f"👁️ Vision: User distracted (was: {old_attention})")
-                else:
-                    vision_state["emotion"] = state
-                    print(f"👁️ Vision: User emotion - {state}")
-                
-                vision_state["last_update"] = current_time
-                
-                # Intelligent reaction logic: Only react when meaningful
-                # Don't spam reactions - wait at least 30 seconds between reactions
-                time_since_last_reaction = current_time - vision_state["last_reaction"]
-                should_react = False
-                reaction_prompt = ""
-                
-                print(f"🔍 Debug - Time since last reaction: {time_since_last_reaction:.1f}s")
-                
-                # User returned after being away
-                if (old_presence == "absent" or old_presence == "unknown") and vision_state["presence"] == "present":
-                    print(f"✅ Detected: User returned (old: {old_presence} → new: present)")
-                    if time_since_last_reaction > 30:
-                        should_react = True
-                        reaction_prompt = "The user just came back to their computer. Welcome them back warmly but casually."
-                        vision_state["last_reaction"] = current_time
-                        print("💭 Will react: User returned")
-                    else:
-                        print(f"⏸️ Not reacting yet (need {30 - time_since_last_reaction:.1f}s more)")
-                
-                # User went away (might comment if they were in middle of conversation)
-                elif old_presence == "present" and vision_state["presence"] == "absent":
-                    print(f"❌ Detected: User left (memory items: {len(memory.get())})")
-                    # Only comment if conversation was recent (within last 2 minutes)
-                    if len(memory.get()) > 0 and time_since_last_reaction > 60:
-                        should_react = True
-                        reaction_prompt = "The user just left. Make a brief, tsundere-style comment about them leaving."
-                        vision_state["last_reaction"] = current_time
-                        print("💭 Will react: User left during conversation")
-                    else:
-                        print(f"⏸️ Not reacting (memory: {len(memory.get())}, time: {time_since_last_reaction:.1f}s)")
-                
-                # User got distracted (looking away for a while)
-                elif old_attention == "focused" and vision_state["attention"] == "distracted":
-                    print(f"😴 Detected: User distracted (memory items: {len(memory.get())})")
-                    # Only comment if they were actively chatting
-                    if len(memory.get()) > 2 and time_since_last_reaction > 60:
-                        should_react = True
-                        reaction_prompt = "The user is looking away while you're talking. Tease them gently or ask if they're listening."
-                        vision_state["last_reaction"] = current_time
-                        print("💭 Will react: User got distracted")
-                    else:
-                        print(f"⏸️ Not reacting (memory: {len(memory.get())}, time: {time_since_last_reaction:.1f}s)")
-                
-                # Generate reaction if needed
-                if should_react:
-                    print(f"💭 Alisa reacting to vision event...")
-                    print(f"📝 Reaction prompt: {reaction_prompt}")
-                    
-                    memories = fetch_recent_memories()
-                    system_prompt = build_prompt(
-                        get_mode_prompt(), 
-                        memories, 
-                        vision_context=reaction_prompt
-                    )
-                    
-                    messages = [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "system", "content": reaction_prompt}  # Direct instruction
-                    ]
-                    
-                    full_response = ""
-                    try:
-                        async for token in stream_llm_response(messages):
-                            full_response += token
-                            # Broadcast to ALL clients (text_chat, overlay, etc) - NOT just vision client
-                            await broadcast_message(token, exclude=None)
-                        
-                        emotion, clean_text = extract_emotion(full_response)
-                        
-                        # GUARD: Detect broken LLM responses
-                        valid_emotions = ["teasing", "calm", "serious", "happy", "sad", "neutral", "shy"]
-                        if clean_text.strip().lower() in valid_emotions or len(clean_text.strip()) < 3:
-                            print(f"⚠️ Vision reaction broken: '{clean_text}' - using fallback")
-                            fallbacks = {
-                                "teasing": "Hmph.",
-                                "shy": "...",
-                                "calm": "Mhm.",
-                                "serious": "...",
-                                "happy": "Heh.",
-                                "sad": "...",
-                                "neutral": "..."
-                            }
-                            clean_text = fallbacks.get(emotion, "...")
-                        
-                        last_emotion_expressed = emotion  # Track for idle continuity
-                        memory.add("assistant", clean_text)
-                        save_memory(emotion, clean_text)
-                        
-                        # Send emotion and end markers to all clients
-                        await broadcast_message(f"[EMOTION]{emotion}", exclude=None)
-                        await broadcast_message("[END]", exclude=None)
-                        
-                        print(f"✅ Vision reaction sent to all clients: {clean_text[:50]}...")
-                        
-                    except Exception as e:
-                        print(f"❌ Error generating vision reaction: {e}")
-                        import traceback
-                        traceback.print_exc()
-                
+            handler = MESSAGE_HANDLERS.get(message.type)
+            if handler is None:
+                if message.type != MSG_PING:
+                    print(f"⚠️ Unknown message type from {role}: {message.type}")
                 continue
 
-            # Phase 10A: Handle desktop understanding messages
-            if user_input.startswith("[VISION_DESKTOP]"):
-                content = user_input.replace("[VISION_DESKTOP]", "")
-                
-                # Parse: task|app|file_type|has_error|offer|window|text
-                parts = content.split("|", 6)
-                
-                if len(parts) >= 7:
-                    task = parts[0].strip()
-                    app_type = parts[1].strip()
-                    file_type = parts[2].strip()
-                    has_error = parts[3].strip() == "True"
-                    offer_message = parts[4].strip()
-                    window = parts[5].strip()
-                    text = parts[6].strip() if len(parts) > 6 else ""
-                    
-                    # Phase 10C: Observe activity and learn patterns
-                    task_memory.observe_activity(task, {
-                        "app": app_type,
-                        "file_type": file_type,
-                        "has_error": has_error,
-                        "window": window
-                    })
-                    
-                    # Store desktop context
-                    desktop_context = f"Desktop: {task}"
-                    if app_type != "unknown":
-                        desktop_context += f" in {app_type}"
-                    if file_type != "unknown":
-                        desktop_context += f" ({file_type} file)"
-                    
-                    memory.add("system", desktop_context)
-                    
-                    # Log
-                    print(f"🖥️  Desktop understanding: {task}")
-                    
-                    # If error detected and should offer help
-                    if has_error and offer_message:
-                        print(f"💡 Alisa can offer: {offer_message}")
-                        
-                        # Generate helpful offer (only if not offered recently)
-                        # This is automatic but rare (desktop_understanding handles timing)
-                        memories = fetch_recent_memories()
-                        
-                        offer_prompt = (
-                            f"Context: {desktop_context}. "
-                            f"An error was detected on the user's screen. "
-                            f"Offer: {offer_message} "
-                            f"Be natural and brief. Don't be pushy. "
-                            f"This is an offer, not a forced conversation."
-                        )
-                        
-                        system_prompt = build_prompt(
-                            get_mode_prompt(),
-                            memories,
-                            vision_context=offer_prompt
-                        )
-                        
-                        messages = [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "system", "content": offer_prompt}
-                        ]
-                        
-                        full_response = ""
-                        try:
-                            async for token in stream_llm_response(messages):
-                                full_response += token
-                                await broadcast_message(token, exclude=None)
-                            
-                            emotion, clean_text = extract_emotion(full_response)
-                            
-                            last_emotion_expressed = emotion
-                            memory.add("assistant", clean_text)
-                            save_memory(emotion, clean_text)
-                            
-                            await broadcast_message(f"[EMOTION]{emotion}", exclude=None)
-                            await broadcast_message("[END]", exclude=None)
-                            
-                            print(f"✅ Phase 10A offer sent: {clean_text[:50]}...")
-                            
-                        except Exception as e:
-                            print(f"❌ Error generating Phase 10A offer: {e}")
-                
+            if message.type in TURN_MESSAGES:
+                turn = asyncio.create_task(run_turn(turn, handler, websocket, message))
                 continue
 
-            # Handle vision system screen context (legacy, kept for compatibility)
-            if user_input.startswith("[VISION_SCREEN]"):
-                content = user_input.replace("[VISION_SCREEN]", "")
-                
-                # Parse window and text
-                parts = content.split(" | ", 1)
-                window = parts[0].strip() if len(parts) > 0 else ""
-                text = parts[1].strip() if len(parts) > 1 else ""
-                
-                # Store screen context in memory (system message)
-                screen_context = f"Screen context: {window}"
-                if text:
-                    screen_context += f" - Content visible: {text[:200]}"
-                
-                memory.add("system", screen_context)
-                print(f"📺 Screen context stored: {window[:50]}...")
-                
-                # Don't send response, just acknowledge and store
-                continue
-
-            # Handle mode changes
-            if user_input.startswith("/mode"):
-                set_mode(user_input.split()[-1])
-                await websocket.send_text("[MODE CHANGED]")
-                await websocket.send_text("[END]")
-                continue
-            
-            # Phase 10B: Handle explicit action confirmations
-            if user_input.strip().lower() in ["yes", "yeah", "yep", "sure", "okay", "ok", "do it"]:
-                if actions_system.pending_action:
-                    print(f"✅ Phase 10B: User confirmed action")
-                    success, message = actions_system.execute_pending_action()
-                    
-                    # Send result back to user
-                    response = f"[TEASING] {message}" if success else f"[SERIOUS] {message}"
-                    emotion, clean = extract_emotion(response)
-                    
-                    await websocket.send_text(clean)
-                    await websocket.send_text(f"[EMOTION]{emotion}")
-                    await websocket.send_text("[END]")
-                    
-                    await broadcast_message(clean, exclude=websocket)
-                    await broadcast_message(f"[EMOTION]{emotion}", exclude=websocket)
-                    await broadcast_message("[END]", exclude=websocket)
-                    
-                    continue
-            
-            # Phase 10B: Handle action rejections
-            if user_input.strip().lower() in ["no", "nope", "nah", "cancel", "don't"]:
-                if actions_system.pending_action:
-                    print(f"❌ Phase 10B: User declined action")
-                    actions_system.clear_pending_action()
-                    
-                    response = "[CALM] Alright, no problem."
-                    emotion, clean = extract_emotion(response)
-                    
-                    await websocket.send_text(clean)
-                    await websocket.send_text(f"[EMOTION]{emotion}")
-                    await websocket.send_text("[END]")
-                    
-                    await broadcast_message(clean, exclude=websocket)
-                    await broadcast_message(f"[EMOTION]{emotion}", exclude=websocket)
-                    await broadcast_message("[END]", exclude=websocket)
-                    
-                    continue
-            
-            # Phase 10B: Detect action commands in user input
-            action_detected = False
-            action_type = None
-            action_params = {}
-            
-            user_lower = user_input.lower()
-            
-            # Pattern matching for various action types
-            # Open app patterns
-            if re.search(r'\b(open|launch|start)\s+(\w+)', user_lower):
-                match = re.search(r'\b(open|launch|start)\s+(\w+)', user_lower)
-                app_name = match.group(2)
-                action_detected = True
-                action_type = "open_app"
-                action_params = {"app_name": app_name}
-                print(f"🎯 Phase 10B: Detected open app command - {app_name}")
-            
-            # Close app patterns
-            elif re.search(r'\b(close|quit|exit)\s+(\w+)', user_lower):
-                match = re.search(r'\b(close|quit|exit)\s+(\w+)', user_lower)
-                app_name = match.group(2)
-                action_detected = True
-                action_type = "close_app"
-                action_params = {"app_name": app_name}
-                print(f"🎯 Phase 10B: Detected close app command - {app_name}")
-            
-            # Browser navigation
-            elif "go to" in user_lower or "navigate to" in user_lower:
-                # Extract URL
-                match = re.search(r'(?:go to|navigate to)\s+([a-z0-9.-]+\.[a-z]{2,})', user_lower)
-                if match:
-                    url = match.group(1)
-                    if not url.startswith("http"):
-                        url = "https://" + url
-                    action_detected = True
-                    action_type = "browser_navigate"
-                    action_params = {"url": url}
-                    print(f"🎯 Phase 10B: Detected browser navigation - {url}")
-            
-            # New tab
-            elif "new tab" in user_lower or "open tab" in user_lower:
-                action_detected = True
-                action_type = "browser_new_tab"
-                action_params = {}
-                print(f"🎯 Phase 10B: Detected new tab command")
-            
-            # Close tab
-            elif "close tab" in user_lower:
-                action_detected = True
-                action_type = "browser_close_tab"
-                action_params = {}
-                print(f"🎯 Phase 10B: Detected close tab command")
-            
-            # Scroll
-            elif re.search(r'scroll\s+(up|down)', user_lower):
-                match = re.search(r'scroll\s+(up|down)', user_lower)
-                direction = match.group(1)
-                action_detected = True
-                action_type = "scroll"
-                action_params = {"amount": 3, "direction": direction}
-                print(f"🎯 Phase 10B: Detected scroll command - {direction}")
-            
-            # Type text
-            elif user_lower.startswith("type "):
-                text = user_input[5:].strip()
-                action_detected = True
-                action_type = "type_text"
-                action_params = {"text": text}
-                print(f"🎯 Phase 10B: Detected type command - {text[:30]}")
-            
-            # Read file
-            elif "read file" in user_lower or "show me" in user_lower and "file" in user_lower:
-                # Try to extract filename/path
-                match = re.search(r'(?:read file|show me)\s+(.+)', user_input)
-                if match:
-                    filepath = match.group(1).strip('"\'')
-                    action_detected = True
-                    action_type = "read_file"
-                    action_params = {"filepath": filepath}
-                    print(f"🎯 Phase 10B: Detected read file command - {filepath}")
-            
-            # Take note / write note
-            elif "take note" in user_lower or "write note" in user_lower or "save note" in user_lower:
-                # Extract note content (everything after the command)
-                match = re.search(r'(?:take note|write note|save note):?\s+(.+)', user_input, re.IGNORECASE)
-                if match:
-                    content = match.group(1).strip()
-                    action_detected = True
-                    action_type = "write_note"
-                    action_params = {"content": content}
-                    print(f"🎯 Phase 10B: Detected write note command - {content[:30]}")
-            
-            # If action detected, ask for confirmation (unless it's a direct command)
-            if action_detected:
-                # Check if it's a direct command (explicit verb at start)
-                is_direct_command = user_lower.startswith(("open ", "close ", "launch ", "start ", 
-                                                           "type ", "scroll ", "new tab", "close tab"))
-                
-                if is_direct_command:
-                    # Execute directly for explicit commands
-                    print(f"⚡ Phase 10B: Direct command, executing immediately")
-                    
-                    # Execute action
-                    success = False
-                    message = ""
-                    
-                    if action_type == "open_app":
-                        success, message = actions_system.open_app(**action_params)
-                    elif action_type == "close_app":
-                        success, message = actions_system.close_app(**action_params)
-                    elif action_type == "browser_navigate":
-                        success, message = actions_system.browser_navigate(**action_params)
-                    elif action_type == "browser_new_tab":
-                        success, message = actions_system.browser_new_tab()
-                    elif action_type == "browser_close_tab":
-                        success, message = actions_system.browser_close_tab()
-                    elif action_type == "scroll":
-                        success, message = actions_system.scroll(**action_params)
-                    elif action_type == "type_text":
-                        success, message = actions_system.type_text(**action_params)
-                    elif action_type == "read_file":
-                        success, message = actions_system.read_file(**action_params)
-                    elif action_type == "write_note":
-                        success, message = actions_system.write_note(**action_params)
-                    
-                    # Send result
-                    if success:
-                        response = f"[TEASING] {message}"
-                    else:
-                        response = f"[SERIOUS] {message}"
-                    
-                    emotion, clean = extract_emotion(response)
-                    
-                    await websocket.send_text(clean)
-                    await websocket.send_text(f"[EMOTION]{emotion}")
-                    await websocket.send_text("[END]")
-                    
-                    await broadcast_message(clean, exclude=websocket)
-                    await broadcast_message(f"[EMOTION]{emotion}", exclude=websocket)
-                    await broadcast_message("[END]", exclude=websocket)
-                    
-                    continue
-                else:
-                    # Ask for confirmation via LLM
-                    print(f"❓ Phase 10B: Asking for confirmation via LLM")
-                    
-                    # Store pending action
-                    actions_system.set_pending_action(action_type, action_params)
-                    
-                    # Build confirmation prompt
-                    memories = fetch_recent_memories()
-                    
-                    action_description = {
-                        "open_app": f"open {action_params.get('app_name')}",
-                        "close_app": f"close {action_params.get('app_name')}",
-                        "browser_navigate": f"navigate to {action_params.get('url')}",
-                        "browser_new_tab": "open a new browser tab",
-                        "browser_close_tab": "close the current tab",
-                        "scroll": f"scroll {action_params.get('direction')}",
-                        "type_text": f"type: {action_params.get('text', '')[:30]}",
-                        "read_file": f"read file: {action_params.get('filepath')}",
-                        "write_note": f"save a note"
-                    }.get(action_type, "do that")
-                    
-                    confirmation_prompt = (
-                        f"The user wants you to {action_description}. "
-                        f"Ask for their confirmation in a natural, casual way. "
-                        f"Keep it brief and conversational. Don't be formal."
-                    )
-                    
-                    system_prompt = build_prompt(
-                        get_mode_prompt(),
-                        memories,
-                        vision_context=confirmation_prompt
-                    )
-                    
-                    messages = [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_input}
-                    ]
-                    
-                    full_response = ""
-                    try:
-                        async for token in stream_llm_response(messages):
-                            full_response += token
-                            await websocket.send_text(token)
-                            await broadcast_message(token, exclude=websocket)
-                        
-                        emotion, clean_text = extract_emotion(full_response)
-                        
-                        memory.add("user", user_input)
-                        memory.add("assistant", clean_text)
-                        save_memory(emotion, clean_text)
-                        
-                        await websocket.send_text(f"[EMOTION]{emotion}")
-                        await websocket.send_text("[END]")
-                        
-                        await broadcast_message(f"[EMOTION]{emotion}", exclude=websocket)
-                        await broadcast_message("[END]", exclude=websocket)
-                        
-                        print(f"✅ Phase 10B: Confirmation question sent")
-                        
-                    except Exception as e:
-                        print(f"❌ Error generating confirmation: {e}")
-                    
-                    continue
-
-            # Regular chat message
-            memory.add("user", user_input)
-            
-            # Update activity timestamp for regular chat
-            last_user_activity = time.time()
-            
-            # Phase 9B: Update companion system on user activity
-            companion_system.update_user_activity()
-            
-            # Phase 10C: Observe user interaction
-            task_memory.observe_interaction("chat")
-            
-            # Phase 10C: Get adaptive suggestions based on learned patterns
-            adaptive_suggestions = task_memory.get_adaptive_suggestions()
-            
-            # Show conversation history stats
-            summary = memory.get_summary()
-            print(f"💬 Conversation: {summary['turns']} turns, ~{summary['estimated_tokens']} tokens")
-
-            memories = fetch_recent_memories()
-            system_prompt = build_prompt(get_mode_prompt(), memories, task_insights=adaptive_suggestions)
-
-            messages = [
-                {"role": "system", "content": system_prompt},
-                *memory.get()
-            ]
-
-            full_response = ""
-
-            try:
-                async for token in stream_llm_response(messages):
-                    full_response += token
-                    # Send to the requesting client
-                    try:
-                        await websocket.send_text(token)
-                    except Exception as e:
-                        print(f"⚠️ Error sending to requesting client: {e}")
-                        break
-                    # Broadcast to other clients (like overlay)
-                    await broadcast_message(token, exclude=websocket)
-
-                emotion, clean_text = extract_emotion(full_response)
-                
-                # GUARD: Detect broken LLM responses (just emotion word, no content)
-                # Valid emotions that might be the entire response
-                valid_emotions = ["teasing", "calm", "serious", "happy", "sad", "neutral", "shy"]
-                if clean_text.strip().lower() in valid_emotions or len(clean_text.strip()) < 3:
-                    # LLM output was broken (just emotion word or too short)
-                    print(f"⚠️ Detected broken response: '{clean_text}' - using fallback")
-                    # Use a contextual fallback based on emotion
-                    fallbacks = {
-                        "teasing": "...",
-                        "shy": "Um...",
-                        "calm": "Mhm.",
-                        "serious": "I see.",
-                        "happy": "Heh.",
-                        "sad": "...",
-                        "neutral": "..."
-                    }
-                    clean_text = fallbacks.get(emotion, "...")
-                
-                last_emotion_expressed = emotion  # Track for idle continuity
-
-                memory.add("assistant", clean_text)
-                save_memory(emotion, clean_text)
-
-                # Send emotion and end marker to all clients
-                await websocket.send_text(f"[EMOTION]{emotion}")
-                await broadcast_message(f"[EMOTION]{emotion}", exclude=websocket)
-                
-                await websocket.send_text("[END]")
-                await broadcast_message("[END]", exclude=websocket)
-                
-            except Exception as e:
-                print(f"❌ Error during LLM streaming: {e}")
-                try:
-                    await websocket.send_text("[ERROR]")
-                    await websocket.send_text("[END]")
-                except:
-                    pass
+            await handler(websocket, message)
 
     except WebSocketDisconnect:
-        print(f"🔌 Client disconnected gracefully")
+        print("🔌 Client disconnected gracefully")
     except Exception as e:
         print(f"❌ WebSocket error: {e}")
     finally:
-        # Cancel keepalive task
-        keepalive_task.cancel()
-        
         # Phase 10C: Save learned patterns on disconnect
         print("💾 Phase 10C: Saving learned patterns...")
         task_memory.end_session()
         insights = task_memory.get_habit_insights()
         print(f"   📊 Session stats: {insights['session_interactions']} interactions")
         print(f"   🎯 Total tasks observed: {insights['total_tasks_observed']}")
-        
-        if websocket in connected_clients:
-            connected_clients.remove(websocket)
-        print(f"❌ Client disconnected. Total clients: {len(connected_clients)}")
+
+        # Nobody is left to hear queued or running replies - stop them and free the LLM slot
+        if turn is not None and not turn.done():
+            turn.cancel()
+            await asyncio.gather(turn, return_exceptions=True)
+
+        sessions.detach(conn.session)
+        broadcaster.unregister(websocket)
+        print(f"❌ Client disconnected. Total clients: {len(broadcaster)}")
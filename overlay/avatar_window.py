@@ -2,12 +2,18 @@ import tkinter as tk
 from tkinter import Canvas
 from PIL import Image, ImageTk
 from pathlib import Path
+import time
 
 # Window configuration
 WINDOW_SIZE = 400
 # Get the directory where this script is located, then find assets
 ASSETS = Path(__file__).parent / "assets"
 
+# Lip-sync: envelope level (0-9) at which the mouth image opens
+MOUTH_OPEN_LEVEL = 3
+# Wait this long after speech_start for a lipsync envelope before falling back to the timer
+LIPSYNC_GRACE_MS = 300
+
 # Global variables (will be initialized after Tk window is created)
 faces = {}
 eyes_closed_img = None
@@ -20,6 +26,12 @@ overlay_layer = None  # Overlay layer for eyes/mouth
 is_talking = False
 is_blinking = False
 talking_timeout_id = None  # Safety timeout to stop talking
+mouth_levels = []  # Envelope of the segment playing now (lipsync message)
+mouth_fps = 25
+mouth_started_at = 0.0  # When that envelope started (frames are picked by elapsed time)
+mouth_driven = False  # Envelope received for this utterance - timer animation off
+mouth_is_open = False
+mouth_tick_id = None
 
 # Load image helper
 def load(name):
@@ -116,37 +128,80 @@ def end_blink():
     root.after(3000, animate_blink)
 
 def animate_mouth():
+    """Fallback mouth animation (fixed timer) for voice clients that send no lipsync"""
+    global mouth_is_open
+    if mouth_driven:
+        return  # Envelope arrived - drive_mouth() has taken over
     if not is_talking:
         print("👄 Mouth animation stopped (is_talking=False)")
         # Return to neutral face when talking stops
+        mouth_is_open = False
         canvas.itemconfig(base_layer, image=faces["neutral"])
         canvas.update_idletasks()
         return
     print(f"👄 Mouth open (is_talking={is_talking})")
-    # Show mouth open image directly
-    canvas.itemconfig(base_layer, image=mouth_open_img)
+    # Show mouth open image (through set_mouth_open, so an envelope taking over knows the state)
+    set_mouth_open(True)
     canvas.update_idletasks()  # Force update
     
     # Return to current emotion face
     def close_mouth():
-        if not is_talking:
+        if not is_talking or mouth_driven:
             print("👄 Skip closing - already stopped talking")
             return
         print(f"👄 Mouth closed (is_talking={is_talking})")
         # During talking, return to current emotion
-        canvas.itemconfig(base_layer, image=faces[current_face])
+        set_mouth_open(False)
         canvas.update_idletasks()  # Force update
     
     root.after(200, close_mouth)  # Mouth stays open for 200ms
     root.after(500, animate_mouth)  # Total cycle is 500ms
 
+def set_mouth_open(open_: bool):
+    """Swap the face image only when the mouth state actually changes"""
+    global mouth_is_open
+    if open_ == mouth_is_open:
+        return
+    mouth_is_open = open_
+    canvas.itemconfig(base_layer, image=mouth_open_img if open_ else faces[current_face])
+
+def play_mouth_levels(levels, fps):
+    """Drive the mouth from one segment's envelope, replacing the previous segment's"""
+    global mouth_levels, mouth_fps, mouth_started_at, mouth_driven
+    if not levels or not fps or fps <= 0:
+        return
+    mouth_levels = levels
+    mouth_fps = fps
+    mouth_started_at = time.perf_counter()
+    mouth_driven = True
+    if mouth_tick_id is None:
+        drive_mouth()
+
+def drive_mouth():
+    """One tick per envelope frame; the frame comes from the clock, so late ticks don't drift"""
+    global mouth_tick_id
+    mouth_tick_id = None
+    frame = int((time.perf_counter() - mouth_started_at) * mouth_fps)
+    if frame >= len(mouth_levels):
+        set_mouth_open(False)  # Segment over - wait for the next envelope
+        return
+    set_mouth_open(mouth_levels[frame] >= MOUTH_OPEN_LEVEL)
+    mouth_tick_id = root.after(max(1, int(1000 / mouth_fps)), drive_mouth)
+
+def start_fallback_mouth():
+    """No envelope arrived in time - animate on the fixed timer instead"""
+    if is_talking and not mouth_driven:
+        print("👄 No lip-sync data - using timer animation")
+        animate_mouth()
+
 # Emotion setter
 def set_emotion(emotion: str):
-    global current_face
+    global current_face, mouth_is_open
     if emotion not in faces:
         emotion = "neutral"
     current_face = emotion
     print(f"😊 Emotion changed to: {emotion}")
+    mouth_is_open = False  # The emotion face has a closed mouth
     canvas.itemconfig(base_layer, image=faces[current_face])
     canvas.update_idletasks()  # Force update
 
@@ -162,7 +217,8 @@ def start_talking():
     
     if not is_talking:  # Only start if not already talking
         is_talking = True
-        animate_mouth()
+        # lipsync envelopes follow within a few ms when the voice client sends them
+        root.after(LIPSYNC_GRACE_MS, start_fallback_mouth)
     else:
         print("⚠️ Already talking, ignoring duplicate start")
     
@@ -173,7 +229,7 @@ def start_talking():
     ])
 
 def stop_talking():
-    global is_talking, talking_timeout_id
+    global is_talking, talking_timeout_id, mouth_levels, mouth_driven, mouth_is_open, mouth_tick_id
     print(f"🤐 STOP TALKING called (is_talking was {is_talking})")
     
     # Cancel safety timeout
@@ -182,6 +238,12 @@ def stop_talking():
         talking_timeout_id = None
     
     is_talking = False
+    if mouth_tick_id:
+        root.after_cancel(mouth_tick_id)
+        mouth_tick_id = None
+    mouth_levels = []
+    mouth_driven = False
+    mouth_is_open = False
     # Return to neutral face after speaking
     canvas.itemconfig(base_layer, image=faces["neutral"])
     canvas.update_idletasks()  # Force update
@@ -5,11 +5,17 @@ Also allows voice modules to directly control the avatar
 """
 import threading
 import asyncio
+import os
 import avatar_window
 import avatar_controller
 import websockets
+import json
 
-WS_URL = "ws://127.0.0.1:8000/ws/chat"
+# protocol=1: typed JSON frames instead of string prefixes
+# Only subscribe to what drives the avatar - LLM tokens are never sent here
+# Conversation session shared with the chat/voice clients on this device
+SESSION_ID = os.getenv("ALISA_SESSION", "default")
+WS_URL = f"ws://127.0.0.1:8000/ws/chat?role=overlay&protocol=1&subscribe=emotion,speech-control&session={SESSION_ID}"
 
 class AvatarApp:
     def __init__(self):
@@ -26,6 +32,10 @@ class AvatarApp:
         print("📞 safe_stop_talking() called from WebSocket thread")
         avatar_window.root.after(0, avatar_window.stop_talking)
     
+    def safe_play_mouth_levels(self, levels, fps):
+        """Thread-safe way to drive the mouth from a lipsync envelope"""
+        avatar_window.root.after(0, lambda: avatar_window.play_mouth_levels(levels, fps))
+    
     def safe_on_emotion(self, emotion: str):
         """Thread-safe way to handle emotion"""
         avatar_window.root.after(0, lambda: avatar_controller.on_emotion(emotion))
@@ -39,39 +49,50 @@ class AvatarApp:
                 async with websockets.connect(WS_URL) as ws:
                     print(f"✅ Connected to backend at {WS_URL}")
                     while True:
-                        msg = await ws.recv()
+                        raw = await ws.recv()
+                        try:
+                            msg = json.loads(raw)
+                        except ValueError:
+                            # Legacy string frame or garbage - skip it, keep listening
+                            print(f"⚠️ [OVERLAY] Ignoring non-JSON frame: {str(raw)[:80]!r}")
+                            continue
+                        if not isinstance(msg, dict):
+                            continue
+                        msg_type = msg.get("type")
                         
                         # Only log important control messages
-                        if msg in ["[SPEECH_START]", "[SPEECH_END]", "[END]"] or msg.startswith("[EMOTION]"):
+                        if msg_type in ("speech_start", "speech_end", "end", "emotion"):
                             print(f"🔵 [WS RECEIVED] {msg}")
                         
                         # Handle speech control signals from text_chat
-                        if msg == "[SPEECH_START]":
+                        if msg_type == "speech_start":
                             # Text chat is starting to speak - start mouth animation
                             print("🎤 [OVERLAY] Speech started - animating mouth")
                             self.safe_start_talking()
                         
-                        elif msg == "[SPEECH_END]":
+                        elif msg_type == "speech_end":
                             # Text chat finished speaking - stop mouth animation
                             print("🤐 [OVERLAY] Speech ended - stopping mouth")
                             self.safe_stop_talking()
                         
+                        elif msg_type == "lipsync":
+                            # Mouth envelope for the sentence that just started playing
+                            # (one message per sentence, not per frame - not logged)
+                            self.safe_play_mouth_levels(msg.get("levels", []), msg.get("fps", 25))
+                        
                         # Handle emotion changes
-                        elif msg.startswith("[EMOTION]"):
-                            emotion = msg.replace("[EMOTION]", "").strip()
+                        elif msg_type == "emotion":
+                            emotion = msg.get("emotion", "neutral")
                             print(f"😊 [OVERLAY] Emotion: {emotion}")
                             self.safe_on_emotion(emotion)
                         
-                        # Ignore other messages (LLM tokens, [END], etc.)
+                        # Ignore other messages (LLM tokens, end, etc.)
                         # We only care about speech control, not text generation
-                        elif msg == "[END]":
+                        elif msg_type == "end":
                             # End of LLM generation - do nothing (speech might not have started yet)
-                            print("🏁 [OVERLAY] Received [END] - ignoring")
-                        elif msg == "":
-                            # Keepalive ping - ignore
-                            pass
+                            print("🏁 [OVERLAY] Received end - ignoring")
                         else:
-                            # LLM streaming token - ignore (don't animate during text generation)
+                            # hello, keepalive ping, LLM streaming token - ignore
                             pass
                             
             except (websockets.exceptions.ConnectionClosedError, websockets.exceptions.ConnectionClosedOK) as e:
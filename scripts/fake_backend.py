@@ -0,0 +1,84 @@
+"""
+Shared fakes for the backend test suites
+
+A temporary SQLite database and a writer that captures rows instead of
+writing them. Patches are applied per test and undone afterwards, so the
+suites give the same results run one at a time or together under pytest.
+
+Usage:
+    @uses_fake_database
+    def test_something():
+        buffer = MemoryBuffer(session_id="test")   # Temp DB, captured writes
+"""
+
+import sys
+import tempfile
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import memory as memory_module
+from app import summarizer as summarizer_module
+from app.db import init_db
+
+
+class FakeWriter:
+    """Captures rows instead of writing them"""
+
+    def __init__(self):
+        self.rows = []
+
+    def submit(self, model, **fields):
+        self.rows.append(fields)
+
+    def flush(self):
+        pass
+
+    def pending(self, model):
+        return []  # Captured rows never reach the DB
+
+
+def temp_database(name: str = "test"):
+    """Fresh SQLite file with the app's tables -> session factory"""
+    engine = create_engine(f"sqlite:///{Path(tempfile.mkdtemp()) / f'{name}.db'}",
+                           connect_args={"check_same_thread": False})
+    init_db(engine)
+    return sessionmaker(bind=engine)
+
+
+@contextmanager
+def patched(module, **attrs):
+    """Replace module attributes for the duration of the block"""
+    saved = {name: getattr(module, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+@contextmanager
+def fake_database(name: str = "test", writer=None):
+    """Conversation memory and summaries go to a temp DB; writes are captured"""
+    Session = temp_database(name)
+    writer = writer or FakeWriter()
+    with patched(memory_module, SessionLocal=Session, write_behind=writer), \
+            patched(summarizer_module, SessionLocal=Session):
+        yield Session, writer
+
+
+def uses_fake_database(test):
+    """Run a test inside fake_database()"""
+    @wraps(test)
+    def run():
+        with fake_database(test.__name__):
+            return test()
+    return run
@@ -0,0 +1,144 @@
+"""
+In-Memory Audio Path - Test Suite
+
+Verifies that TTS output is collected in memory, converted to float32
+PCM exactly once, passed through the RVC stage as an array, and that
+the speech pipeline never touches the filesystem. Audio libraries and
+the TTS service are replaced with fakes.
+"""
+
+import sys
+import asyncio
+import tempfile
+from pathlib import Path
+
+# Add voice to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "voice"))
+
+import numpy as np
+
+import audio_buffer
+from audio_buffer import stream_tts_bytes, pcm_from_samples, to_int16
+from rvc.inferencer import convert_array
+from speech_pipeline import SpeechPipeline
+
+
+class FakeCommunicate:
+    """Stand-in for edge_tts.Communicate: audio chunks mixed with metadata"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def stream(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+
+def test_stream_to_memory():
+    """Test 1: Audio chunks are collected into one buffer"""
+    print("\n🧪 Test 1: TTS Stream To Memory")
+
+    communicate = FakeCommunicate([
+        {"type": "audio", "data": b"ID3"},
+        {"type": "WordBoundary", "offset": 0, "text": "Hello"},
+        {"type": "audio", "data": b"\xff\xfb"},
+    ])
+    data = asyncio.run(stream_tts_bytes(communicate))
+    assert data == b"ID3\xff\xfb", f"Unexpected bytes: {data!r}"
+    print("   ✅ PASS")
+
+
+def test_pcm_conversion():
+    """Test 2: Integer samples become float32 (samples, channels) and back"""
+    print("\n🧪 Test 2: PCM Conversion")
+
+    stereo = pcm_from_samples([0, 16384, -32768, 32767], sample_width=2, channels=2)
+    assert stereo.dtype == np.float32 and stereo.shape == (2, 2)
+    assert stereo[0, 1] == 0.5 and stereo[1, 0] == -1.0
+
+    mono = pcm_from_samples(np.arange(-4, 4, dtype=np.int16) * 4096, sample_width=2, channels=1)
+    roundtrip = to_int16(mono)[:, 0]
+    assert np.abs(roundtrip.astype(int) - np.arange(-4, 4) * 4096).max() <= 4, "Lossy round-trip"
+    assert to_int16(np.array([[2.0], [-2.0]], dtype=np.float32)).ravel().tolist() == [32767, -32767], "No clipping"
+    print("   ✅ PASS")
+
+
+def test_rvc_passthrough_is_zero_copy():
+    """Test 3: Passthrough RVC hands the same array back"""
+    print("\n🧪 Test 3: RVC Array Passthrough")
+
+    pcm = np.zeros((24000, 1), dtype=np.float32)
+    converted, sample_rate = convert_array(pcm, 24000)
+    assert converted is pcm and sample_rate == 24000
+    print("   ✅ PASS")
+
+
+def test_pipeline_stays_in_memory():
+    """Test 4: Synthesis -> playback with PCM tuples and no temp files"""
+    print("\n🧪 Test 4: No Filesystem Round-Trips")
+
+    played = []
+    tmp = Path(tempfile.gettempdir())
+    before = set(tmp.glob("alisa_*"))
+
+    async def synthesize(text):
+        mp3 = await stream_tts_bytes(FakeCommunicate([{"type": "audio", "data": text.encode()}]))
+        pcm = pcm_from_samples(np.frombuffer(mp3, dtype=np.uint8).astype(np.int16) * 100, 2, 1)
+        return convert_array(pcm, 24000)
+
+    class FakeEngine:
+        async def play(self, audio):
+            pcm, sample_rate = audio
+            played.append((pcm.shape, sample_rate))
+
+    audio_buffer.audio_engine = FakeEngine()  # play_pcm_async looks it up at call time
+
+    async def run():
+        pipeline = SpeechPipeline(synthesize, audio_buffer.play_pcm_async)
+        pipeline.feed("Nothing gets written to disk anymore. Not even once.")
+        await pipeline.finish()
+
+    asyncio.run(run())
+    assert played == [((37, 1), 24000), ((14, 1), 24000)], f"Unexpected playback: {played}"
+    assert set(tmp.glob("alisa_*")) == before, "Temp files were created"
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all in-memory audio tests"""
+    print("=" * 60)
+    print("🔊 IN-MEMORY AUDIO PATH - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_stream_to_memory,
+        test_pcm_conversion,
+        test_rvc_passthrough_is_zero_copy,
+        test_pipeline_stays_in_memory,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,214 @@
+"""
+Audio Output Engine - Test Suite
+
+Verifies the callback-driven output stream on a null audio device:
+queued segments play back to back with no gap, start/end events arrive
+in order for async and blocking callers, per-block RMS levels are
+reported (then silence), stop() and cancelled play() calls drop audio,
+and other sample rates / stereo input are converted.
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# Add voice to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "voice"))
+
+import numpy as np
+
+from audio_engine import AudioEngine, NullOutput
+
+RATE = 24000
+BLOCK = 480  # 20 ms
+SPEED = 10   # Null device clock runs 10x real time
+
+
+class RecordingOutput(NullOutput):
+    """Null device that keeps every block it was given"""
+
+    def __init__(self, speed: float = SPEED):
+        super().__init__(speed)
+        self.blocks = []
+
+    def start(self, sample_rate, blocksize, fill):
+        def record(out):
+            fill(out)
+            self.blocks.append(out.copy())
+
+        super().start(sample_rate, blocksize, record)
+
+
+def make_engine():
+    output = RecordingOutput()
+    return AudioEngine(output=output, sample_rate=RATE, blocksize=BLOCK), output
+
+
+def tone(seconds, value):
+    return np.full(int(seconds * RATE), value, dtype=np.float32), RATE
+
+
+def test_gapless_queue():
+    """Test 1: Queued segments play back to back with no silence between them"""
+    print("\n🧪 Test 1: Gapless Queue")
+
+    async def run():
+        engine, output = make_engine()
+        try:
+            first = asyncio.ensure_future(engine.play(tone(0.31, 0.25)))
+            second = asyncio.ensure_future(engine.play(tone(0.27, 0.5)))
+            await asyncio.gather(first, second)
+        finally:
+            engine.close()
+        return output
+
+    output = asyncio.run(run())
+    stream = np.concatenate(output.blocks)
+    nonzero = np.flatnonzero(stream)
+    played = stream[nonzero[0]:nonzero[-1] + 1]
+    expected = np.concatenate([tone(0.31, 0.25)[0], tone(0.27, 0.5)[0]])
+    assert len(played) == len(expected), f"Gap or loss: {len(played)} vs {len(expected)} samples"
+    assert np.array_equal(played, expected), "Segments not played back to back"
+    print("   ✅ PASS")
+
+
+def test_events_in_order():
+    """Test 2: Start/end events are ordered; blocking callers work too"""
+    print("\n🧪 Test 2: Start/End Events")
+
+    log = []
+
+    async def run():
+        engine, _ = make_engine()
+        try:
+            loop = asyncio.get_running_loop()
+            first = engine.enqueue(tone(0.2, 0.3), loop)
+            second = engine.enqueue(tone(0.2, 0.3), loop)
+            first.started.add_done_callback(lambda _: log.append("start 1"))
+            first.finished.add_done_callback(lambda _: log.append("end 1"))
+            second.started.add_done_callback(lambda _: log.append("start 2"))
+            second.finished.add_done_callback(lambda _: log.append("end 2"))
+            await second.finished
+
+            start = time.perf_counter()
+            await asyncio.to_thread(engine.play_blocking, tone(0.5, 0.3))
+            blocking_seconds = time.perf_counter() - start
+        finally:
+            engine.close()
+        return blocking_seconds
+
+    blocking_seconds = asyncio.run(run())
+    assert log == ["start 1", "end 1", "start 2", "end 2"], f"Unexpected order: {log}"
+    assert blocking_seconds >= 0.5 / SPEED * 0.8, f"play_blocking returned early ({blocking_seconds:.3f}s)"
+    print("   ✅ PASS")
+
+
+def test_levels():
+    """Test 3: Per-block RMS follows the audio and drops to zero afterwards"""
+    print("\n🧪 Test 3: RMS Levels")
+
+    async def run():
+        engine, _ = make_engine()
+        levels = []
+        engine.add_level_listener(levels.append)
+        try:
+            t = np.arange(int(0.5 * RATE)) / RATE
+            sine = (0.5 * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+            await engine.play((sine, RATE))
+            await asyncio.sleep(5 * BLOCK / RATE / SPEED)
+        finally:
+            engine.close()
+        return levels
+
+    levels = asyncio.run(run())
+    speech = [v for v in levels if v > 0]
+    assert len(speech) >= int(0.5 * RATE / BLOCK), f"Too few level updates: {len(speech)}"
+    assert abs(np.median(speech) - 0.5 / np.sqrt(2)) < 0.02, f"Wrong RMS: {np.median(speech):.3f}"
+    assert levels[-1] == 0.0, "No silence level after playback"
+    print(f"   {len(levels)} level updates, median RMS {np.median(speech):.3f}")
+    print("   ✅ PASS")
+
+
+def test_stop_and_cancel():
+    """Test 4: stop() ends playback at once; a cancelled play() is dropped"""
+    print("\n🧪 Test 4: Stop And Cancel")
+
+    async def run():
+        engine, _ = make_engine()
+        try:
+            long_play = asyncio.ensure_future(engine.play(tone(10.0, 0.3)))
+            await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            engine.stop()
+            await asyncio.wait_for(long_play, timeout=1)
+            stop_seconds = time.perf_counter() - start
+
+            cancelled = asyncio.ensure_future(engine.play(tone(10.0, 0.3)))
+            await asyncio.sleep(0.05)
+            cancelled.cancel()
+            await asyncio.sleep(0.05)
+            queued_after_cancel = len(engine._queue)
+        finally:
+            engine.close()
+        return engine, stop_seconds, queued_after_cancel
+
+    engine, stop_seconds, queued_after_cancel = asyncio.run(run())
+    assert stop_seconds < 0.2, f"stop() took {stop_seconds:.2f}s"
+    assert queued_after_cancel == 0, "Cancelled segment still queued"
+    assert engine.stops == 1
+    print("   ✅ PASS")
+
+
+def test_format_conversion():
+    """Test 5: Stereo and other sample rates become mono at the engine rate"""
+    print("\n🧪 Test 5: Format Conversion")
+
+    engine = AudioEngine(output=NullOutput(), sample_rate=RATE, blocksize=BLOCK)
+    stereo = np.stack([np.full(48000, 0.2), np.full(48000, 0.4)], axis=1).astype(np.float32)
+    pcm = engine.prepare((stereo, 48000))
+    assert pcm.ndim == 1 and pcm.dtype == np.float32
+    assert len(pcm) == RATE, f"Wrong length after resampling: {len(pcm)}"
+    assert np.allclose(pcm, 0.3), "Channels not mixed down"
+    assert len(engine.prepare((np.zeros((100, 1), np.float32), RATE))) == 100
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all audio engine tests"""
+    print("=" * 60)
+    print("🔈 AUDIO OUTPUT ENGINE - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_gapless_queue,
+        test_events_in_order,
+        test_levels,
+        test_stop_and_cancel,
+        test_format_conversion,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,267 @@
+"""
+Barge-In - Test Suite
+
+Verifies that talking over Alisa cuts playback off mid-segment, tells
+the backend to stop generating and hands the user's utterance on as
+the next turn, that a reply played to the end leaves nothing behind,
+that ENTER gets the microphone only after the monitor's stream closed,
+and that the barge-in VAD needs more speech to trigger than a normal
+turn. The microphone and speakers are simulated.
+"""
+
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+# Add voice to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "voice"))
+
+import numpy as np
+
+from speech_pipeline import SpeechPipeline
+from barge_in import BargeIn
+from vad import SAMPLE_RATE, FRAME_SAMPLES, BARGE_IN_START_MS, EnergyVAD, Endpointer
+
+SEGMENT_SECONDS = 1.0
+
+
+class FakeSpeaker:
+    """Blocking playback (like sd.play + sd.wait) that stop() can cut short"""
+
+    def __init__(self, seconds: float = SEGMENT_SECONDS):
+        self.seconds = seconds
+        self._stopped = threading.Event()
+        self.played = []
+        self.stops = 0
+
+    def _play(self, audio):
+        self._stopped.clear()
+        self._stopped.wait(self.seconds)
+        self.played.append(audio)
+
+    async def play(self, audio):
+        await asyncio.to_thread(self._play, audio)
+
+    def stop(self):
+        self.stops += 1
+        self._stopped.set()
+
+
+async def synthesize(text):
+    return text
+
+
+def make_pipeline(speaker, barge_in=None, events=None):
+    events = events if events is not None else []
+
+    def on_start():
+        events.append("start")
+        if barge_in:
+            barge_in.start_listening()
+
+    def on_end():
+        events.append("end")
+        if barge_in:
+            barge_in.stop_listening()
+
+    pipeline = SpeechPipeline(synthesize, speaker.play, on_start=on_start, on_end=on_end,
+                              stop=speaker.stop)
+    if barge_in:
+        barge_in.track(pipeline)
+    return pipeline
+
+
+def test_cancel_stops_playback():
+    """Test 1: Cancelling the pipeline stops the segment that is playing"""
+    print("\n🧪 Test 1: Cancel Stops Playback")
+
+    async def run():
+        speaker = FakeSpeaker()
+        events = []
+        pipeline = make_pipeline(speaker, events=events)
+        pipeline.feed("First sentence is long enough. Second sentence is long enough too. ")
+        await asyncio.sleep(0.1)
+        start = time.perf_counter()
+        await pipeline.cancel()
+        return speaker, events, time.perf_counter() - start
+
+    speaker, events, elapsed = asyncio.run(run())
+    assert speaker.stops == 1, "Playback was not stopped"
+    assert elapsed < SEGMENT_SECONDS / 2, f"Cancel waited for the segment ({elapsed:.2f}s)"
+    assert len(speaker.played) == 1, f"Queued segment still played: {speaker.played}"
+    assert events == ["start", "end"], f"Unexpected events: {events}"
+    print(f"   Cancelled in {elapsed * 1000:.0f}ms")
+    print("   ✅ PASS")
+
+
+def test_barge_in_interrupts():
+    """Test 2: Speech during playback interrupts, cancels and yields the utterance"""
+    print("\n🧪 Test 2: Barge-In Interrupts")
+
+    def listen(stop, on_speech_start):
+        time.sleep(0.1)
+        on_speech_start()  # User starts talking over Alisa
+        time.sleep(0.2)
+        return "utterance"
+
+    async def run():
+        speaker = FakeSpeaker()
+        cancels = []
+
+        async def send_cancel():
+            cancels.append(time.perf_counter())
+
+        barge_in = BargeIn(listen, send_cancel, enabled=True)
+        pipeline = make_pipeline(speaker, barge_in)
+        pipeline.feed("This reply would take a long time to say. ")
+        await pipeline.finish()  # Returns early once interrupted
+        audio = await asyncio.wait_for(barge_in.utterances.get(), timeout=2)
+        return speaker, barge_in, cancels, audio
+
+    speaker, barge_in, cancels, audio = asyncio.run(run())
+    assert speaker.stops == 1, "Playback was not stopped"
+    assert len(cancels) == 1, f"Expected one cancel message, got {len(cancels)}"
+    assert audio == "utterance", f"Utterance not handed on: {audio}"
+    assert barge_in.interruptions == 1 and not barge_in.speaking
+    print("   ✅ PASS")
+
+
+def test_reply_without_barge_in():
+    """Test 3: A reply played to the end stops the listener and sends nothing"""
+    print("\n🧪 Test 3: No Barge-In")
+
+    listening = []
+
+    def listen(stop, on_speech_start):
+        listening.append(True)
+        stop.wait(5)  # Nobody talks until playback ends
+        return None
+
+    async def run():
+        speaker = FakeSpeaker(seconds=0.1)
+        cancels = []
+
+        async def send_cancel():
+            cancels.append(True)
+
+        barge_in = BargeIn(listen, send_cancel, enabled=True)
+        pipeline = make_pipeline(speaker, barge_in)
+        pipeline.feed("Short and sweet reply here. ")
+        await pipeline.finish()
+        barge_in.untrack(pipeline)
+        await asyncio.wait_for(barge_in._listener, timeout=2)
+        interrupted = await barge_in.interrupt()  # ENTER after the reply: nothing to cut off
+        return speaker, barge_in, cancels, interrupted
+
+    speaker, barge_in, cancels, interrupted = asyncio.run(run())
+    assert listening, "Listener never started"
+    assert speaker.stops == 0 and not cancels and not interrupted
+    assert barge_in.utterances.empty()
+    print("   ✅ PASS")
+
+
+def test_barge_in_endpointer_is_stricter():
+    """Test 4: A short burst starts a normal turn but not a barge-in"""
+    print("\n🧪 Test 4: Stricter Barge-In Start")
+
+    def feed(endpointer, audio):
+        for i in range(0, len(audio) - FRAME_SAMPLES + 1, FRAME_SAMPLES):
+            endpointer.feed(audio[i:i + FRAME_SAMPLES])
+        return endpointer.started
+
+    rng = np.random.default_rng(0)
+    quiet = (rng.standard_normal(SAMPLE_RATE // 2) * 0.002).astype(np.float32)
+    t = np.arange(int(0.15 * SAMPLE_RATE)) / SAMPLE_RATE
+    burst = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    audio = np.concatenate([quiet, burst])
+
+    assert feed(Endpointer(EnergyVAD()), audio), "Normal endpointer ignored the burst"
+    assert not feed(Endpointer(EnergyVAD(), start_ms=BARGE_IN_START_MS), audio), \
+        "Barge-in triggered on a 150ms burst"
+    print("   ✅ PASS")
+
+
+def test_claim_mic_closes_monitor():
+    """Test 5: claim_mic waits for the monitor's stream to close and keeps it closed"""
+    print("\n🧪 Test 5: One Mic Stream At A Time")
+
+    streams = []  # Open input streams
+
+    def listen(stop, on_speech_start):
+        streams.append("monitor")
+        try:
+            stop.wait(5)
+            time.sleep(0.1)  # Closing the device takes a moment
+            return None
+        finally:
+            streams.remove("monitor")
+
+    async def run():
+        speaker = FakeSpeaker(seconds=2)
+
+        async def send_cancel():
+            pass
+
+        barge_in = BargeIn(listen, send_cancel, enabled=True)
+        pipeline = make_pipeline(speaker, barge_in)
+        pipeline.feed("A long reply the user cuts off with ENTER. ")
+        await asyncio.sleep(0.2)
+        assert streams == ["monitor"], f"Monitor not listening: {streams}"
+
+        await barge_in.interrupt()  # ENTER
+        audio = await barge_in.claim_mic()
+        open_at_record = list(streams)
+
+        barge_in.start_listening()  # A proactive reply starting mid-recording
+        started_while_claimed = barge_in._listener is not None and not barge_in._listener.done()
+        barge_in.release_mic()
+        await pipeline.finish()
+        return audio, open_at_record, started_while_claimed
+
+    audio, open_at_record, started_while_claimed = asyncio.run(run())
+    assert audio is None, f"Unexpected utterance: {audio}"
+    assert open_at_record == [], f"Streams still open when recording starts: {open_at_record}"
+    assert not started_while_claimed, "Monitor reopened the mic during recording"
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all barge-in tests"""
+    print("=" * 60)
+    print("✋ BARGE-IN - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_cancel_stops_playback,
+        test_barge_in_interrupts,
+        test_reply_without_barge_in,
+        test_barge_in_endpointer_is_stricter,
+        test_claim_mic_closes_monitor,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,243 @@
+"""
+WebSocket Broadcaster - Test Suite
+
+Verifies per-client send queues, fan-out without blocking on slow
+peers, the slow-client coalesce/drop policy, token micro-batching and topic
+subscriptions using fake sockets.
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app import broadcaster as broadcaster_module
+from app.broadcaster import Broadcaster, TokenCoalescer
+from app.protocol import END, MODE_CHANGED, SPEECH_START, SPEECH_END, token_message, emotion_message, parse_topics
+
+
+class FakeWebSocket:
+    """Records frames; optionally blocks to simulate a busy client"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.frames = []
+        self.closed_with = None
+        self.query_params = {}
+
+    async def send_text(self, message):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.frames.append(message)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def test_fan_out():
+    """Test 1: Every client receives every frame in order, in its own protocol"""
+    print("\n🧪 Test 1: Fan-out")
+
+    async def run():
+        hub = Broadcaster()
+        a, b = FakeWebSocket(), FakeWebSocket()
+        hub.register(a, role="chat")
+        hub.register(b, role="overlay", structured=True)
+        for message in [token_message("Hel"), token_message("lo"), emotion_message("shy"), END]:
+            hub.broadcast(message)
+        await asyncio.sleep(0.05)
+        return hub, a, b
+
+    hub, a, b = asyncio.run(run())
+    assert a.frames == ["Hel", "lo", "[EMOTION]shy", "[END]"], f"Legacy client got {a.frames}"
+    assert b.frames == [
+        '{"type":"token","text":"Hel"}',
+        '{"type":"token","text":"lo"}',
+        '{"type":"emotion","emotion":"shy"}',
+        '{"type":"end"}',
+    ], f"Structured client got {b.frames}"
+    assert hub.get_stats()["roles"] == {"chat": 1, "overlay": 1}
+    print("   ✅ PASS")
+
+
+def test_exclude_and_unregister():
+    """Test 2: Excluded and removed clients get nothing"""
+    print("\n🧪 Test 2: Exclude & Unregister")
+
+    async def run():
+        hub = Broadcaster()
+        a, b = FakeWebSocket(), FakeWebSocket()
+        hub.register(a)
+        hub.register(b)
+        hub.broadcast(SPEECH_START, exclude=a)
+        await asyncio.sleep(0.01)
+        hub.unregister(b)
+        hub.broadcast(SPEECH_END)
+        await asyncio.sleep(0.05)
+        return hub, a, b
+
+    hub, a, b = asyncio.run(run())
+    assert a.frames == ["[SPEECH_END]"], f"Client A got {a.frames}"
+    assert b.frames == ["[SPEECH_START]"], f"Client B got {b.frames}"
+    assert len(hub) == 1
+    print("   ✅ PASS")
+
+
+def test_slow_client_does_not_block():
+    """Test 3: A slow client doesn't delay a fast one"""
+    print("\n🧪 Test 3: Slow Client Isolation")
+
+    async def run():
+        hub = Broadcaster()
+        fast, slow = FakeWebSocket(), FakeWebSocket(delay=0.2)
+        hub.register(fast)
+        hub.register(slow)
+        for i in range(10):
+            hub.broadcast(token_message(f"t{i}"))
+        await asyncio.sleep(0.05)
+        return fast, slow
+
+    fast, slow = asyncio.run(run())
+    assert len(fast.frames) == 10, f"Fast client only got {len(fast.frames)} frames"
+    assert len(slow.frames) <= 1, "Slow client should still be draining"
+    print("   ✅ PASS")
+
+
+def test_slow_client_coalesced_then_dropped():
+    """Test 4: Full queue coalesces tokens, drops on control frames"""
+    print("\n🧪 Test 4: Slow Client Policy")
+
+    original_size = broadcaster_module.SEND_QUEUE_SIZE
+    broadcaster_module.SEND_QUEUE_SIZE = 4
+
+    async def run():
+        hub = Broadcaster()
+        slow = FakeWebSocket(delay=1.0)
+        conn = hub.register(slow)
+        for i in range(10):
+            hub.broadcast(token_message(f"t{i}"))
+        coalesced = conn.coalesced
+        still_connected = hub.is_connected(slow)
+        hub.broadcast(END)  # Not coalescable -> client is dropped
+        await asyncio.sleep(0.01)
+        return hub, slow, coalesced, still_connected
+
+    try:
+        hub, slow, coalesced, still_connected = asyncio.run(run())
+    finally:
+        broadcaster_module.SEND_QUEUE_SIZE = original_size
+
+    assert coalesced > 0, "Tokens were not coalesced"
+    assert still_connected, "Client dropped while tokens could be coalesced"
+    assert not hub.is_connected(slow), "Slow client not dropped"
+    assert slow.closed_with == broadcaster_module.SLOW_CLIENT_CLOSE_CODE
+    print("   ✅ PASS")
+
+
+def test_token_coalescing():
+    """Test 5: Tokens are batched by time window and byte budget"""
+    print("\n🧪 Test 5: Token Coalescing")
+
+    async def run():
+        frames = []
+        with TokenCoalescer(frames.append, window_ms=20, max_bytes=10) as out:
+            for token in ["ab", "cd", "ef"]:
+                out.push(token)
+            await asyncio.sleep(0.05)  # Window elapses -> one frame
+            out.push("0123456789")      # Byte budget reached -> immediate frame
+            out.push("tail")            # Flushed on exit
+        return frames
+
+    frames = asyncio.run(run())
+    assert frames == ["abcdef", "0123456789", "tail"], f"Unexpected frames: {frames}"
+    print("   ✅ PASS")
+
+
+def test_topic_subscriptions():
+    """Test 6: Broadcasts only reach subscribed clients; direct sends always do"""
+    print("\n🧪 Test 6: Topic Subscriptions")
+
+    async def run():
+        hub = Broadcaster()
+        chat, overlay, vision = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        hub.register(chat, role="text_chat")  # No subscription -> everything
+        hub.register(overlay, role="overlay", topics=parse_topics("emotion,speech-control"))
+        hub.register(vision, role="vision", topics=parse_topics(""))
+        for message in [token_message("Hi"), emotion_message("happy"), END, SPEECH_START]:
+            hub.broadcast(message)
+        hub.send(vision, MODE_CHANGED)
+        await asyncio.sleep(0.05)
+        return hub, chat, overlay, vision
+
+    hub, chat, overlay, vision = asyncio.run(run())
+    assert chat.frames == ["Hi", "[EMOTION]happy", "[END]", "[SPEECH_START]"], f"Chat got {chat.frames}"
+    assert overlay.frames == ["[EMOTION]happy", "[SPEECH_START]"], f"Overlay got {overlay.frames}"
+    assert vision.frames == ["[MODE CHANGED]"], f"Vision got {vision.frames}"
+    assert hub.get_stats()["filtered"] == 6
+    print("   ✅ PASS")
+
+
+def test_session_scoping():
+    """Test 7: Session-scoped broadcasts stay within the session"""
+    print("\n🧪 Test 7: Session Scoping")
+
+    async def run():
+        hub = Broadcaster()
+        laptop, phone = FakeWebSocket(), FakeWebSocket()
+        hub.register(laptop, session="laptop")
+        hub.register(phone, session="phone")
+        hub.broadcast(token_message("for laptop"), session="laptop")
+        hub.broadcast(END)  # No session -> everyone
+        await asyncio.sleep(0.05)
+        return hub, laptop, phone
+
+    hub, laptop, phone = asyncio.run(run())
+    assert laptop.frames == ["for laptop", "[END]"], f"Laptop got {laptop.frames}"
+    assert phone.frames == ["[END]"], f"Phone got {phone.frames}"
+    assert hub.has_clients("phone") and not hub.has_clients("tablet")
+    assert hub.get_stats()["sessions"] == {"laptop": 1, "phone": 1}
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all broadcaster tests"""
+    print("=" * 60)
+    print("📡 BROADCASTER - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_fan_out,
+        test_exclude_and_unregister,
+        test_slow_client_does_not_block,
+        test_slow_client_coalesced_then_dropped,
+        test_token_coalescing,
+        test_topic_subscriptions,
+        test_session_scoping,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,142 @@
+"""
+Streaming Emotion Parser - Test Suite
+
+Verifies that the emotion tag is detected and stripped within the first
+tokens of a streamed response, that the emotion is reported before the
+text is finished, and that the result always matches extract_emotion on
+the full response, whatever the token boundaries.
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.emotion import EmotionStreamParser, extract_emotion
+
+
+def run_parser(tokens):
+    """Feed tokens; returns (parser, emitted text, emotions reported, tokens fed before the emotion)"""
+    emotions = []
+    parser = EmotionStreamParser(on_emotion=emotions.append)
+    emitted = ""
+    reported_at = None
+    for i, token in enumerate(tokens):
+        emitted += parser.feed(token)
+        if emotions and reported_at is None:
+            reported_at = i + 1
+    emitted += parser.finish()
+    return parser, emitted, emotions, reported_at
+
+
+def split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_tag_detected_early():
+    """Test 1: Emotion is reported as soon as the tag closes"""
+    print("\n🧪 Test 1: Early Emotion")
+
+    tokens = ["<", "emotion", "=te", "asing", ">\n", "Oh", ", look", " who", " remembered", " I exist."]
+    parser, emitted, emotions, reported_at = run_parser(tokens)
+    assert emotions == ["teasing"], f"Unexpected emotions: {emotions}"
+    assert reported_at == 5, f"Emotion reported after {reported_at} tokens"
+    assert emitted == "Oh, look who remembered I exist."
+    assert parser.text == emitted
+    print("   ✅ PASS")
+
+
+def test_clean_text_is_streamed():
+    """Test 2: Text after the tag is forwarded token by token"""
+    print("\n🧪 Test 2: Clean Pass-Through")
+
+    parser = EmotionStreamParser()
+    assert parser.feed("<emotion=calm>") == ""
+    assert parser.feed(" \n") == "", "Leading whitespace forwarded"
+    assert parser.feed("Mhm.") == "Mhm."
+    assert parser.feed(" Go on.") == " Go on."
+    assert parser.emotion == "calm"
+    print("   ✅ PASS")
+
+
+def test_fallbacks():
+    """Test 3: Bare emotion words, missing tags and broken replies"""
+    print("\n🧪 Test 3: Fallbacks")
+
+    parser, emitted, emotions, _ = run_parser(["happy", " ", "Hello", " there"])
+    assert (parser.emotion, emitted) == ("happy", "Hello there")
+
+    parser, emitted, emotions, reported_at = run_parser(["Hello", " there"])
+    assert (parser.emotion, emitted) == ("neutral", "Hello there")
+    assert reported_at == 1, "Untagged reply was held back"
+
+    parser, emitted, emotions, _ = run_parser(["sad"])
+    assert (parser.emotion, emitted) == ("neutral", "sad"), "Lone emotion word should stay visible"
+
+    parser, emitted, emotions, _ = run_parser(["<emotion=calm"])
+    assert emotions == ["neutral"], "Unclosed tag must still settle an emotion"
+    print("   ✅ PASS")
+
+
+def test_matches_extract_emotion():
+    """Test 4: Same result as extract_emotion for any token boundaries"""
+    print("\n🧪 Test 4: Matches extract_emotion")
+
+    responses = [
+        "<emotion=happy>\nHeh. You actually finished it?",
+        "<emotion=serious>",
+        "calm\nTake a break, okay?",
+        "happyness is overrated",
+        "neutral",
+        "Just text, no tag at all.",
+        "x" * 80,
+        "",
+    ]
+    for response in responses:
+        expected = extract_emotion(response)
+        for size in (1, 2, 5, len(response) or 1):
+            parser, emitted, emotions, _ = run_parser(split(response, size))
+            assert (parser.emotion, emitted.strip()) == expected, \
+                f"{response!r} split by {size}: {(parser.emotion, emitted)} != {expected}"
+            assert len(emotions) == 1, f"Emotion reported {len(emotions)} times"
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all streaming emotion parser tests"""
+    print("=" * 60)
+    print("🎭 STREAMING EMOTION PARSER - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_tag_detected_early,
+        test_clean_text_is_streamed,
+        test_fallbacks,
+        test_matches_extract_emotion,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
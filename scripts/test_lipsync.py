@@ -0,0 +1,186 @@
+"""
+Lip-Sync - Test Suite
+
+Verifies the mouth envelope computed from played PCM (frame count,
+silence stays closed, loudness-independent levels), that the audio
+engine reports a segment's start when it is heard, that LipSync sends
+exactly one batched message per sentence at that moment, and that the
+backend relays lipsync frames to speech-control subscribers only.
+"""
+
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+# Add voice and backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "voice"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+import numpy as np
+
+from audio_engine import AudioEngine, NullOutput
+from lipsync import LipSync, envelope, LIPSYNC_FPS, LIPSYNC_LEVELS
+from app.broadcaster import Broadcaster
+from app.protocol import lipsync_message, parse_topics
+
+RATE = 24000
+SPEED = 10  # Null device clock runs 10x real time
+
+
+def speech_like(seconds, amplitude, rate=RATE):
+    """Syllable-ish bursts: 200 Hz tone gated on/off at 4 Hz"""
+    t = np.arange(int(seconds * rate)) / rate
+    gate = (np.sin(2 * np.pi * 4 * t) > 0).astype(np.float32)
+    return (amplitude * gate * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+
+
+class FakeWebSocket:
+    """Records what the voice client sends (or what the backend relays)"""
+
+    def __init__(self):
+        self.frames = []
+        self.query_params = {}
+
+    async def send(self, message):
+        self.frames.append(message)
+
+    async def send_text(self, message):
+        self.frames.append(message)
+
+    async def close(self, code=1000):
+        pass
+
+
+def test_envelope():
+    """Test 1: One level per frame, silence closed, same shape for quiet and loud speech"""
+    print("\n🧪 Test 1: Envelope")
+
+    loud = speech_like(1.0, 0.6)
+    quiet = speech_like(1.0, 0.1)
+    levels = envelope(loud, RATE)
+    assert len(levels) == LIPSYNC_FPS, f"Expected {LIPSYNC_FPS} frames, got {len(levels)}"
+    assert all(isinstance(v, int) and 0 <= v <= LIPSYNC_LEVELS for v in levels)
+    assert max(levels) == LIPSYNC_LEVELS and min(levels) == 0, f"Mouth never opens/closes: {levels}"
+    quiet_levels = envelope(quiet, RATE)
+    assert max(abs(a - b) for a, b in zip(levels, quiet_levels)) <= 1, "Levels depend on loudness"
+
+    assert envelope(np.zeros(RATE // 2, np.float32), RATE) == [0] * (LIPSYNC_FPS // 2 + 1)
+    assert envelope(np.zeros(0, np.float32), RATE) == []
+    assert len(envelope(speech_like(0.5, 0.3, 16000), 16000)) == int(np.ceil(0.5 * LIPSYNC_FPS))
+    print(f"   {levels}")
+    print("   ✅ PASS")
+
+
+def test_on_start_when_heard():
+    """Test 2: A queued segment's on_start fires when it starts playing, not when queued"""
+    print("\n🧪 Test 2: Start Callback")
+
+    async def run():
+        engine = AudioEngine(output=NullOutput(SPEED), sample_rate=RATE, blocksize=480)
+        log = []
+        try:
+            first = asyncio.ensure_future(engine.play((speech_like(0.4, 0.3), RATE),
+                                                      on_start=lambda: log.append("start 1")))
+            second = asyncio.ensure_future(engine.play((speech_like(0.4, 0.3), RATE),
+                                                       on_start=lambda: log.append("start 2")))
+            first.add_done_callback(lambda _: log.append("end 1"))
+            second.add_done_callback(lambda _: log.append("end 2"))
+            await asyncio.gather(first, second)
+            await asyncio.sleep(0)
+        finally:
+            engine.close()
+        return log
+
+    log = asyncio.run(run())
+    assert log.index("start 2") > log.index("start 1"), f"Unexpected order: {log}"
+    assert log.count("start 1") == 1 and log.count("start 2") == 1, f"Callback repeated: {log}"
+    assert log[-1] == "end 2"
+    print("   ✅ PASS")
+
+
+def test_one_message_per_segment():
+    """Test 3: LipSync sends one batched envelope per sentence, in play order"""
+    print("\n🧪 Test 3: Batched Messages")
+
+    async def run():
+        engine = AudioEngine(output=NullOutput(SPEED), sample_rate=RATE, blocksize=480)
+        ws = FakeWebSocket()
+        lipsync = LipSync(ws.send, engine=engine)
+        try:
+            await lipsync.play((speech_like(1.2, 0.3), RATE))
+            await lipsync.play((speech_like(0.6, 0.3), RATE))
+            await asyncio.sleep(0)
+        finally:
+            engine.close()
+        return ws, lipsync
+
+    ws, lipsync = asyncio.run(run())
+    messages = [json.loads(frame) for frame in ws.frames]
+    assert len(messages) == 2, f"Expected 2 messages, got {len(messages)}"
+    assert all(m["type"] == "lipsync" and m["fps"] == LIPSYNC_FPS for m in messages)
+    assert [len(m["levels"]) for m in messages] == [30, 15], "Wrong envelope per segment"
+    assert lipsync.frames == 45 and lipsync.messages == 2
+    print(f"   45 frames at {LIPSYNC_FPS} Hz sent as {lipsync.messages} messages")
+    print("   ✅ PASS")
+
+
+def test_backend_relay():
+    """Test 4: lipsync reaches speech-control subscribers only (no legacy form)"""
+    print("\n🧪 Test 4: Backend Relay")
+
+    async def run():
+        hub = Broadcaster()
+        overlay, legacy, chat = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        hub.register(overlay, role="overlay", structured=True,
+                     topics=parse_topics("emotion,speech-control"))
+        hub.register(legacy, role="overlay")
+        hub.register(chat, role="text_chat", structured=True, topics=parse_topics("tokens,emotion"))
+        hub.broadcast(lipsync_message(25, [0, 5, 9]))
+        await asyncio.sleep(0.05)
+        return overlay, legacy, chat
+
+    overlay, legacy, chat = asyncio.run(run())
+    assert [json.loads(f) for f in overlay.frames] == [{"type": "lipsync", "fps": 25, "levels": [0, 5, 9]}]
+    assert legacy.frames == [], f"Legacy client got {legacy.frames}"
+    assert chat.frames == [], f"Unsubscribed client got {chat.frames}"
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all lip-sync tests"""
+    print("=" * 60)
+    print("👄 LIP-SYNC - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_envelope,
+        test_on_start_when_heard,
+        test_one_message_per_segment,
+        test_backend_relay,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,143 @@
+"""
+Conversation Memory Buffer - Test Suite
+
+Verifies running token totals, trimming by token budget and turn
+count, and that trimming stays fast with large buffers. The database
+is replaced with a temporary SQLite file and writes are captured.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.memory import MemoryBuffer
+from app.tokenizer import TokenCounter
+from fake_backend import uses_fake_database
+
+
+@uses_fake_database
+def test_running_total():
+    """Test 1: Running total matches a full recount"""
+    print("\n🧪 Test 1: Running Token Total")
+
+    buffer = MemoryBuffer(max_turns=50, max_tokens=100000)
+    for i in range(30):
+        buffer.add("user", "x" * (i * 4))
+        buffer.add("assistant", "y" * 40)
+
+    recount = sum(buffer._estimate_tokens(m["content"]) for m in buffer.get())
+    assert buffer.total_tokens == recount, f"Total {buffer.total_tokens} != recount {recount}"
+    assert buffer.get_summary()["estimated_tokens"] == recount
+    print("   ✅ PASS")
+
+
+@uses_fake_database
+def test_trim_by_tokens():
+    """Test 2: Oldest messages are dropped to fit the token budget"""
+    print("\n🧪 Test 2: Token Budget Trimming")
+
+    buffer = MemoryBuffer(max_turns=100, max_tokens=100)
+    for i in range(10):
+        buffer.add("user", f"{i}" * 40)  # 10 tokens each
+        buffer.add("assistant", "z" * 80)  # 20 tokens each
+
+    assert buffer.total_tokens <= 100, f"Over budget: {buffer.total_tokens}"
+    assert buffer.get()[-1]["content"] == "z" * 80, "Newest message was trimmed"
+    assert buffer.get()[-2]["content"] == "9" * 40
+    assert len(buffer.get()) == len(buffer._token_counts)
+    print("   ✅ PASS")
+
+
+@uses_fake_database
+def test_trim_by_turns_and_clear():
+    """Test 3: Turn limit applies and clear() resets the total"""
+    print("\n🧪 Test 3: Turn Limit & Clear")
+
+    buffer = MemoryBuffer(max_turns=2, max_tokens=100000)
+    for i in range(5):
+        buffer.add("user", f"question {i}")
+        buffer.add("assistant", f"answer {i}")
+
+    assert [m["content"] for m in buffer.get()] == ["question 3", "answer 3", "question 4", "answer 4"]
+    buffer.clear(quiet=True)
+    assert buffer.total_tokens == 0 and len(buffer.get()) == 0
+    print("   ✅ PASS")
+
+
+@uses_fake_database
+def test_large_buffer_is_fast():
+    """Test 4: Trimming a large buffer is linear, not quadratic"""
+    print("\n🧪 Test 4: Large Buffer Performance")
+
+    buffer = MemoryBuffer(max_turns=5000, max_tokens=20000)
+    start = time.perf_counter()
+    for i in range(20000):
+        buffer.add("user", "token " * 10)
+    elapsed = time.perf_counter() - start
+
+    assert buffer.total_tokens <= 20000
+    assert elapsed < 2.0, f"20k adds took {elapsed:.2f}s"
+    print(f"   ⏱️  20k adds with trimming in {elapsed * 1000:.0f}ms")
+    print("   ✅ PASS")
+
+
+@uses_fake_database
+def test_pluggable_counter():
+    """Test 5: A custom tokenizer drives the budget"""
+    print("\n🧪 Test 5: Pluggable Tokenizer")
+
+    class WordCounter(TokenCounter):
+        def _count(self, text):
+            return len(text.split())
+
+    buffer = MemoryBuffer(max_turns=100, max_tokens=6, counter=WordCounter(path=""))
+    buffer.add("user", "one two three")
+    buffer.add("assistant", "four five six")
+    buffer.add("user", "seven eight")
+
+    assert buffer.total_tokens == 5, f"Expected 5 words, got {buffer.total_tokens}"
+    assert buffer.get()[0]["content"] == "four five six"
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all memory buffer tests"""
+    print("=" * 60)
+    print("🧠 MEMORY BUFFER - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_running_total,
+        test_trim_by_tokens,
+        test_trim_by_turns_and_clear,
+        test_large_buffer_is_fast,
+        test_pluggable_counter,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,263 @@
+"""
+Long-Term Memory Index - Test Suite
+
+Verifies relevance-ranked retrieval over saved memories: hashed
+embeddings, top-k cosine search, incremental indexing on save, building
+from the database, search latency at 100k memories, and the recent
+memories cache (small databases, rows still queued for the writer) and
+that saving from the event loop embeds in a worker thread. Uses a
+temporary SQLite file and the model-free hashed embedder.
+"""
+
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+import numpy as np
+
+from app import memory_long
+from app import memory_index as memory_index_module
+from app.models import Memory
+from app.memory_index import MemoryIndex, HashingEmbedder
+from app.memory_long import RecentMemoryCache
+from app.persistence import WriteBehindQueue
+from fake_backend import FakeWriter, temp_database, patched
+
+
+MEMORIES = [
+    "[HAPPY] You told me you love green tea in the morning",
+    "[TEASING] You spent all night fixing that Python bug",
+    "[CALM] Your sister is visiting next weekend",
+    "[SAD] You said your cat has been sick lately",
+    "[EXCITED] You started learning to play the guitar",
+]
+
+
+def memory_database(texts, name="test_index"):
+    """Temp DB holding the given memories -> session factory"""
+    Session = temp_database(name)
+    db = Session()
+    db.add_all(Memory(emotion="neutral", content=text) for text in texts)
+    db.commit()
+    db.close()
+    return Session
+
+
+def test_embeddings_are_stable():
+    """Test 1: Hashed embeddings are unit length and deterministic"""
+    print("\n🧪 Test 1: Hashed Embeddings")
+
+    embedder = HashingEmbedder()
+    a = embedder.embed("How is your cat doing?")
+    b = HashingEmbedder().embed("How is your cat doing?")
+    assert a.dtype == np.float32 and a.shape == (embedder.dim,)
+    assert abs(np.linalg.norm(a) - 1.0) < 1e-5, "Not normalized"
+    assert np.array_equal(a, b), "Embedding changed between instances"
+    assert not embedder.embed("").any(), "Empty text should embed to zeros"
+    print("   ✅ PASS")
+
+
+def test_relevance_ranking():
+    """Test 2: Search returns the related memory first"""
+    print("\n🧪 Test 2: Relevance Ranking")
+
+    index = MemoryIndex(capacity=2)  # Forces the matrix to grow
+    for text in MEMORIES:
+        index.add(text)
+
+    assert index.search("is my cat still sick?", k=1) == [MEMORIES[3]]
+    assert index.search("any tea today?", k=1) == [MEMORIES[0]]
+    assert index.search("that python bug again", k=2)[0] == MEMORIES[1]
+    assert index.search("", k=2) == [MEMORIES[4], MEMORIES[3]], "Empty query should return recent"
+    assert index.search("zzzz qqqq", k=3) == [], "Unrelated query matched"
+    print("   ✅ PASS")
+
+
+def test_save_and_fetch():
+    """Test 3: save_memory indexes incrementally; index builds from the DB"""
+    print("\n🧪 Test 3: Incremental Indexing & DB Build")
+
+    Session = memory_database(MEMORIES)
+    index = MemoryIndex()
+    writer = FakeWriter()
+    with patched(memory_long, memory_index=index, write_behind=writer, SessionLocal=Session,
+                 recent_memories=RecentMemoryCache()):
+        index.load(Session)
+        assert len(index) == len(MEMORIES) and index.loaded
+        memory_long.fetch_recent_memories()  # Warmed at startup like the index
+
+        memory_long.save_memory("happy", "[HAPPY] Your guitar teacher said you improved a lot")
+        assert len(index) == len(MEMORIES) + 1, "New memory not indexed"
+        assert writer.rows[-1]["emotion"] == "happy", "Memory not persisted"
+
+        results = asyncio.run(memory_long.fetch_relevant_memories("how's guitar practice going?"))
+        assert len(results) == 3, f"Expected 3 memories, got {len(results)}"
+        assert "guitar" in results[0] and "guitar" in results[1]
+        assert memory_long.fetch_recent_memories(1) == ["[HAPPY] Your guitar teacher said you improved a lot"]
+    print("   ✅ PASS")
+
+
+def test_recent_cache_write_through():
+    """Test 4: Recent memories come from the cache after the first load"""
+    print("\n🧪 Test 4: Recent Memories Cache")
+
+    cache = RecentMemoryCache(size=4)
+    with patched(memory_long, recent_memories=cache, write_behind=FakeWriter(),
+                 memory_index=MemoryIndex(),  # Not loaded - recency only
+                 SessionLocal=memory_database(MEMORIES)):
+        first = memory_long.fetch_recent_memories(3)  # Miss: reads the DB
+        assert first == [MEMORIES[4], MEMORIES[3], MEMORIES[2]], f"Unexpected: {first}"
+
+        memory_long.SessionLocal = None  # Any further DB access would fail
+        memory_long.save_memory("calm", "[CALM] You went for a run today")
+        assert memory_long.fetch_recent_memories(2) == ["[CALM] You went for a run today", MEMORIES[4]]
+        assert asyncio.run(memory_long.fetch_relevant_memories("anything", 1)) == ["[CALM] You went for a run today"]
+
+    stats = cache.get_stats()
+    assert stats == {"cached": 4, "complete": False, "hits": 2, "misses": 1}, f"Unexpected stats: {stats}"
+    print("   ✅ PASS")
+
+
+def test_search_latency_at_scale():
+    """Test 5: Top-k search stays within a few ms at 100k memories (sparse == dense scoring)"""
+    print("\n🧪 Test 5: Search Latency (100k memories)")
+
+    index = MemoryIndex()
+    count = 100_000
+    rng = np.random.default_rng(7)
+    vectors = rng.standard_normal((count, index.embedder.dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index._reserve(count)
+    index._vectors[:count] = vectors
+    index._contents.extend(f"memory {i}" for i in range(count))
+    index.add(MEMORIES[3])
+
+    index.search("warm up", k=3)
+    start = time.perf_counter()
+    runs = 20
+    for _ in range(runs):
+        results = index.search("is my cat still sick?", k=3)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / runs
+
+    print(f"   Average search: {elapsed_ms:.2f}ms")
+    assert results[0] == MEMORIES[3], "Lost the relevant memory among 100k"
+    assert elapsed_ms < 10, f"Search too slow: {elapsed_ms:.2f}ms"
+
+    # Scoring only the query's non-zero columns must match the full product
+    sparse = index.search("is my cat still sick?", k=10, min_score=-1)
+    memory_index_module.SPARSE_QUERY_FRACTION = 0.0
+    try:
+        dense = index.search("is my cat still sick?", k=10, min_score=-1)
+    finally:
+        memory_index_module.SPARSE_QUERY_FRACTION = 0.25
+    assert sparse == dense, "Sparse and dense scoring disagree"
+    print("   ✅ PASS")
+
+
+def test_recent_cache_small_db_and_pending_rows():
+    """Test 6: A small DB is cached whole; queued rows are merged without a flush"""
+    print("\n🧪 Test 6: Small DB & Pending Rows")
+
+    Session = memory_database(MEMORIES[:2], name="test_recent")
+    writer = WriteBehindQueue(Session, batch_size=100, flush_interval=0.5)
+    cache = RecentMemoryCache(size=4)
+    with patched(memory_long, SessionLocal=Session, write_behind=writer,
+                 memory_index=MemoryIndex(), recent_memories=cache):
+        try:
+            memory_long.save_memory("sad", MEMORIES[3])  # Queued, not committed yet
+            start = time.perf_counter()
+            first = memory_long.fetch_recent_memories(10)
+            load_ms = (time.perf_counter() - start) * 1000
+            assert first == [MEMORIES[3], MEMORIES[1], MEMORIES[0]], f"Pending row not merged: {first}"
+            assert load_ms < 250, f"Load waited for the writer ({load_ms:.0f}ms)"
+
+            for _ in range(3):  # Bigger than the cache, but the whole DB is cached
+                assert memory_long.fetch_recent_memories(10) == first
+            writer.flush()
+            cache.invalidate()
+            assert memory_long.fetch_recent_memories(10) == first, "Committed row duplicated"
+
+            for text in MEMORIES[:3]:  # Cache overflows - no longer the whole DB
+                memory_long.save_memory("calm", text)
+            memory_long.fetch_recent_memories(10)
+        finally:
+            writer.stop()
+
+    stats = cache.get_stats()
+    assert stats == {"cached": 4, "complete": False, "hits": 3, "misses": 3}, f"Unexpected stats: {stats}"
+    print("   ✅ PASS")
+
+
+def test_save_indexes_off_loop():
+    """Test 7: On the event loop, save_memory embeds in a worker thread"""
+    print("\n🧪 Test 7: Indexing Off The Event Loop")
+
+    threads = []
+
+    class RecordingEmbedder(HashingEmbedder):
+        def embed_many(self, texts):
+            threads.append(threading.current_thread())
+            return super().embed_many(texts)
+
+    async def run():
+        index = MemoryIndex(embedder=RecordingEmbedder())
+        index.loaded = True
+        with patched(memory_long, memory_index=index, write_behind=FakeWriter(),
+                     recent_memories=RecentMemoryCache()):
+            memory_long.save_memory("happy", MEMORIES[0])
+            queued = len(index)
+            await asyncio.gather(*memory_long._index_tasks)
+        return index, queued
+
+    index, queued = asyncio.run(run())
+    assert queued == 0, "save_memory embedded on the event loop"
+    assert len(index) == 1 and index.search("green tea", k=1) == [MEMORIES[0]]
+    assert threads and threads[0] is not threading.main_thread(), "Embedding ran on the loop thread"
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all memory index tests"""
+    print("=" * 60)
+    print("🧬 LONG-TERM MEMORY INDEX - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_embeddings_are_stable,
+        test_relevance_ranking,
+        test_save_and_fetch,
+        test_recent_cache_write_through,
+        test_search_latency_at_scale,
+        test_recent_cache_small_db_and_pending_rows,
+        test_save_indexes_off_loop,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,203 @@
+"""
+Write-Behind Persistence - Test Suite
+
+Verifies that conversation rows are batched into few transactions,
+flushed on the time window and on shutdown, that submit() never
+touches the database on the caller's thread, that uncommitted rows are
+visible through pending(), plus the SQLite storage
+profile and index migration. Uses temporary SQLite files.
+"""
+
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db import configure_sqlite, init_db
+from app.models import ConversationHistory
+from app.persistence import WriteBehindQueue
+
+
+def make_engine():
+    """Engine for a fresh database in a temp directory, tuned like app.db"""
+    path = Path(tempfile.mkdtemp()) / "test_memory.db"
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    configure_sqlite(engine)
+    return engine
+
+
+def make_db():
+    """Fresh database; returns a session factory"""
+    engine = make_engine()
+    init_db(engine)
+    return sessionmaker(bind=engine)
+
+
+def count_rows(session_factory):
+    db = session_factory()
+    try:
+        return db.query(ConversationHistory).count()
+    finally:
+        db.close()
+
+
+def test_batching():
+    """Test 1: Many rows are committed in a handful of transactions"""
+    print("\n🧪 Test 1: Batching")
+
+    sessions = make_db()
+    writer = WriteBehindQueue(sessions, batch_size=32, flush_interval=0.5)
+    for i in range(100):
+        writer.submit(ConversationHistory, role="user", content=f"message {i}")
+    writer.flush()
+
+    assert count_rows(sessions) == 100, "Rows missing after flush"
+    assert writer.batches <= 4, f"Too many transactions: {writer.batches}"
+    assert writer.depth == 0
+    writer.stop()
+    print("   ✅ PASS")
+
+
+def test_time_window():
+    """Test 2: A lone row is written once the flush interval elapses"""
+    print("\n🧪 Test 2: Time Window")
+
+    sessions = make_db()
+    writer = WriteBehindQueue(sessions, batch_size=32, flush_interval=0.05)
+    writer.submit(ConversationHistory, role="assistant", content="Hmph.")
+    time.sleep(0.3)
+
+    assert count_rows(sessions) == 1, "Row not written after the window"
+    writer.stop()
+    print("   ✅ PASS")
+
+
+def test_submit_is_non_blocking():
+    """Test 3: submit() returns without waiting for a commit"""
+    print("\n🧪 Test 3: Non-blocking Submit")
+
+    sessions = make_db()
+    writer = WriteBehindQueue(sessions, batch_size=1000, flush_interval=1.0)
+    start = time.perf_counter()
+    for i in range(200):
+        writer.submit(ConversationHistory, role="system", content=f"Desktop: task {i}")
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    assert elapsed_ms < 50, f"submit() took {elapsed_ms:.1f}ms for 200 rows"
+    assert writer.depth > 0, "Rows were written synchronously"
+    writer.stop()
+    assert count_rows(sessions) == 200, "stop() lost queued rows"
+    print(f"   ⏱️  200 submits in {elapsed_ms:.2f}ms")
+    print("   ✅ PASS")
+
+
+def test_errors_are_contained():
+    """Test 4: A failing batch is reported and the writer keeps going"""
+    print("\n🧪 Test 4: Error Handling")
+
+    sessions = make_db()
+    writer = WriteBehindQueue(sessions, batch_size=32, flush_interval=0.01)
+    writer.submit(ConversationHistory, role=None, content="role is NOT NULL")
+    writer.flush()
+    writer.submit(ConversationHistory, role="user", content="still works")
+    writer.flush()
+
+    assert writer.errors == 1, f"Expected 1 failed batch, got {writer.errors}"
+    assert count_rows(sessions) == 1
+    writer.stop()
+    print("   ✅ PASS")
+
+
+def test_storage_profile():
+    """Test 5: WAL/pragmas are applied and old databases get the new index"""
+    print("\n🧪 Test 5: Storage Profile & Migration")
+
+    engine = make_engine()
+    with engine.begin() as conn:
+        # Schema as created before the composite index existed
+        conn.execute(text(
+            "CREATE TABLE conversation_history (id INTEGER PRIMARY KEY, role VARCHAR NOT NULL, "
+            "content TEXT NOT NULL, timestamp DATETIME, session_id VARCHAR)"
+        ))
+    init_db(engine)
+
+    with engine.connect() as conn:
+        journal = conn.execute(text("PRAGMA journal_mode")).scalar()
+        synchronous = conn.execute(text("PRAGMA synchronous")).scalar()
+        indexes = {row[1] for row in conn.execute(text("PRAGMA index_list(conversation_history)"))}
+        plan = " ".join(str(row[-1]) for row in conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM conversation_history "
+            "WHERE session_id = 'default' ORDER BY timestamp DESC LIMIT 20"
+        )))
+
+    assert journal.lower() == "wal", f"journal_mode is {journal}"
+    assert synchronous == 1, f"synchronous is {synchronous} (expected NORMAL)"
+    assert "ix_conversation_history_session_ts" in indexes, f"Index missing: {indexes}"
+    assert "ix_conversation_history_session_ts" in plan, f"History load doesn't use the index: {plan}"
+    print("   ✅ PASS")
+
+
+def test_pending_rows():
+    """Test 6: pending() lists queued rows until they are committed"""
+    print("\n🧪 Test 6: Pending Rows")
+
+    sessions = make_db()
+    writer = WriteBehindQueue(sessions, batch_size=100, flush_interval=1.0)
+    writer.submit(ConversationHistory, role="user", content="first")
+    writer.submit(ConversationHistory, role="assistant", content="second")
+    pending = [fields["content"] for fields in writer.pending(ConversationHistory)]
+    assert pending == ["first", "second"], f"Unexpected pending rows: {pending}"
+    assert writer.pending(object) == [], "Rows of other models listed"
+
+    writer.flush()
+    assert writer.pending(ConversationHistory) == [], "Committed rows still pending"
+    assert count_rows(sessions) == 2
+    writer.stop()
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all persistence tests"""
+    print("=" * 60)
+    print("💾 WRITE-BEHIND PERSISTENCE - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_batching,
+        test_time_window,
+        test_submit_is_non_blocking,
+        test_errors_are_contained,
+        test_storage_profile,
+        test_pending_rows,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,250 @@
+"""
+Speculative Prefill - Test Suite
+
+Verifies that partial transcripts warm the LLM prompt cache without
+getting in the way: prefill requests carry n_predict=0 on the
+conversation's slot, yield to user turns and preempt background
+chatter, collapse to the latest partial, are dropped (or cancelled
+mid-request) once the final transcript arrives, and build exactly the
+prefix the real turn sends.
+The LLM server and database are replaced with fakes.
+"""
+
+import sys
+import json
+import asyncio
+from contextlib import aclosing
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+import httpx
+
+from app.llm_client import LLMClient
+from app.llm_scheduler import LLMScheduler, LLMPreempted, PRIORITY_USER, PRIORITY_IDLE
+from app.memory import MemoryBuffer
+from app.prefill import SpeculativePrefill
+from app.prompt import build_messages, build_prefix_messages
+from fake_backend import uses_fake_database
+
+log = []
+
+
+async def fake_stream(messages, slot_key=None):
+    """Stand-in for the LLM: one token per 10ms"""
+    for i in range(5):
+        await asyncio.sleep(0.01)
+        yield f"{messages[-1]['content']}{i} "
+
+
+async def fake_prefill(messages, slot_key=None):
+    await asyncio.sleep(0.02)
+    log.append(("prefill", messages[-1]["content"]))
+
+
+def make_scheduler():
+    return LLMScheduler(stream_response=fake_stream, prefill_prompt=fake_prefill)
+
+
+def test_prefill_request():
+    """Test 1: Prefill is a non-streaming n_predict=0 request on the chat's slot"""
+    print("\n🧪 Test 1: Prefill Request")
+
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json={"choices": [{"message": {"content": ""}}]})
+
+    async def run():
+        client = LLMClient(url="http://llm.test/v1/chat/completions", slots=2)
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client.slot_for("other")
+        await client.prefill([{"role": "user", "content": "so what do"}], slot_key="default")
+        chat_payload = client.build_payload([], slot_key="default")
+        await client._client.aclose()
+        return chat_payload
+
+    chat_payload = asyncio.run(run())
+    payload = requests[0]
+    assert payload["n_predict"] == 0 and payload["stream"] is False, payload
+    assert payload["cache_prompt"] is True
+    assert payload["id_slot"] == chat_payload["id_slot"] == 1, "Prefill must warm the chat's own slot"
+    print("   ✅ PASS")
+
+
+def test_scheduling():
+    """Test 2: Prefills preempt background work and yield to user turns"""
+    print("\n🧪 Test 2: Prefill Priority")
+
+    async def idle(scheduler):
+        try:
+            async for _ in scheduler.stream([{"role": "user", "content": "idle"}], PRIORITY_IDLE):
+                pass
+            log.append(("idle", "done"))
+        except LLMPreempted:
+            log.append(("idle", "preempted"))
+
+    async def user(scheduler):
+        async for _ in scheduler.stream([{"role": "user", "content": "user"}], PRIORITY_USER):
+            pass
+        log.append(("user", "done"))
+
+    async def run():
+        scheduler = make_scheduler()
+        background = asyncio.create_task(idle(scheduler))
+        await asyncio.sleep(0.015)
+        assert await scheduler.prefill([{"role": "user", "content": "partial one"}])
+
+        chat = asyncio.create_task(user(scheduler))
+        await asyncio.sleep(0)
+        stale = asyncio.create_task(scheduler.prefill([{"role": "user", "content": "stale"}], should_run=lambda: False))
+        await asyncio.gather(background, chat)
+        assert await stale is False
+        return scheduler.get_stats()
+
+    log.clear()
+    stats = asyncio.run(run())
+    assert log == [("idle", "preempted"), ("prefill", "partial one"), ("user", "done")], log
+    assert stats["prefilled"] == 1 and stats["skipped_prefills"] == 1, stats
+    print("   ✅ PASS")
+
+
+def test_coalescing_and_commit():
+    """Test 3: Only the newest partial is prefilled; the final transcript drops queued ones"""
+    print("\n🧪 Test 3: Coalescing & Commit")
+
+    def build(text):
+        return [{"role": "user", "content": text}]
+
+    async def run():
+        scheduler = make_scheduler()
+        prefill = SpeculativePrefill(min_chars=4, scheduler=scheduler)
+
+        prefill.submit("s", "so", build)  # Too short
+        prefill.submit("s", "so what", build)
+        await asyncio.sleep(0.005)  # First prefill in flight
+        for text in ("so what do", "so what do you", "so what do you think"):
+            prefill.submit("s", text, build)
+        prefill.submit("s", "so what do you think", build)  # Duplicate
+        await asyncio.sleep(0.1)
+
+        # Next utterance: partial queued behind a user turn, then the final arrives
+        user = asyncio.create_task(consume(scheduler))
+        await asyncio.sleep(0)
+        prefill.submit("s", "tell me a story", build)
+        await asyncio.sleep(0)
+        prefill.commit("s")
+        await user
+        await asyncio.sleep(0.05)
+        return prefill.get_stats()
+
+    async def consume(scheduler):
+        async for _ in scheduler.stream([{"role": "user", "content": "final"}], PRIORITY_USER):
+            pass
+
+    log.clear()
+    stats = asyncio.run(run())
+    assert log == [("prefill", "so what"), ("prefill", "so what do you think")], log
+    assert stats["submitted"] == 5 and stats["superseded"] == 2 and stats["prefilled"] == 2, stats
+    assert stats["active_sessions"] == 0
+    print("   ✅ PASS")
+
+
+@uses_fake_database
+def test_prefix_matches_final_turn():
+    """Test 4: The prefilled prefix is byte-identical to the start of the real request"""
+    print("\n🧪 Test 4: Prefix Matches The Final Turn")
+
+    for max_tokens in (100000, 60):  # Without and with trimming on add()
+        memory = MemoryBuffer(max_turns=3, max_tokens=max_tokens, session_id=f"prefix-{max_tokens}")
+        for i in range(4):
+            memory.add("user", f"question number {i} " * 3)
+            memory.add("assistant", f"answer number {i} " * 3)
+
+        final = "so what do you think about that"
+        before = list(memory.get())
+        prefix = build_prefix_messages("calm mode", memory.preview_add("user", final))
+        assert list(memory.get()) == before, "preview_add must not modify the history"
+
+        memory.add("user", final)
+        messages = build_messages("calm mode", ["a memory"], history=memory.get(), summary="earlier")
+        assert messages[:len(prefix)] == prefix, f"Prefix diverged (max_tokens={max_tokens})"
+        assert len(messages) == len(prefix) + 1, "Only the volatile context should follow the prefix"
+    print("   ✅ PASS")
+
+
+def test_commit_cancels_in_flight():
+    """Test 5: A prefill still running when the final transcript arrives doesn't delay the turn"""
+    print("\n🧪 Test 5: Commit Cancels In-Flight Prefill")
+
+    def build(text):
+        return [{"role": "user", "content": text}]
+
+    async def run():
+        scheduler = make_scheduler()
+        prefill = SpeculativePrefill(min_chars=4, scheduler=scheduler)
+
+        prefill.submit("s", "so what do you think", build)
+        await asyncio.sleep(0.005)  # Prefill holds the LLM slot
+        running = prefill._sessions["s"].task
+        assert scheduler.active is not None and scheduler.active.label == "prefill"
+
+        prefill.commit("s")
+        final = scheduler.stream([{"role": "user", "content": "so what do you think"}], PRIORITY_USER)
+        async with aclosing(final) as tokens:
+            async for _ in tokens:
+                log.append(("user", "first token"))
+                break
+        await asyncio.sleep(0.05)
+        return prefill.get_stats(), scheduler.get_stats(), running
+
+    log.clear()
+    stats, scheduler_stats, running = asyncio.run(run())
+    assert running.cancelled(), "Prefill task was not cancelled"
+    assert log == [("user", "first token")], f"User turn waited behind the prefill: {log}"
+    assert stats["cancelled"] == 1 and stats["prefilled"] == 0, stats
+    assert scheduler_stats["prefilled"] == 0, scheduler_stats
+    assert scheduler_stats["active"] is None and scheduler_stats["pending"] == 0, scheduler_stats
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all speculative prefill tests"""
+    print("=" * 60)
+    print("⚡ SPECULATIVE PREFILL - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_prefill_request,
+        test_scheduling,
+        test_coalescing_and_commit,
+        test_prefix_matches_final_turn,
+        test_commit_cancels_in_flight,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,114 @@
+"""
+Prompt Prefix Caching - Test Suite
+
+Verifies that prompts are ordered for llama.cpp KV-cache reuse: a
+memoized static system prompt, append-only history, and volatile
+context last. Also checks the slot-affinity and cache_prompt hints
+sent to the server.
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.prompt import build_messages, build_static_prompt, build_prompt, SYSTEM_PROMPT
+from app.llm_client import LLMClient
+
+
+def test_static_prefix_is_memoized():
+    """Test 1: The static prompt is built once per mode"""
+    print("\n🧪 Test 1: Memoized Static Prefix")
+
+    first = build_static_prompt("You tease gently and act playful.")
+    second = build_static_prompt("You tease gently and act playful.")
+    assert first is second, "Static prompt rebuilt"
+    assert SYSTEM_PROMPT.strip() in first
+    assert build_static_prompt("You are calm, mature, and direct.") != first
+    print("   ✅ PASS")
+
+
+def test_turns_share_prefix():
+    """Test 2: Consecutive turns only differ after the shared prefix"""
+    print("\n🧪 Test 2: Stable Prefix Across Turns")
+
+    history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "[TEASING] Hmph."}]
+    turn1 = build_messages("mode", ["memory A"], history=history[:1],
+                           task_insights={"be_quiet": True})
+    turn2 = build_messages("mode", ["memory B", "memory A"], history=history + [{"role": "user", "content": "again"}],
+                           vision_context="User is coding")
+
+    # Everything except the trailing context message of turn 1 is a prefix of turn 2
+    assert turn2[:len(turn1) - 1] == turn1[:-1], "Prefix changed between turns"
+    assert turn1[0]["content"] is turn2[0]["content"], "System prompt not byte-identical"
+    assert "memory B" in turn2[-1]["content"] and "User is coding" in turn2[-1]["content"]
+    assert "memory" not in turn2[0]["content"], "Volatile context leaked into the prefix"
+    print("   ✅ PASS")
+
+
+def test_build_prompt_compatible():
+    """Test 3: build_prompt still returns one combined system prompt"""
+    print("\n🧪 Test 3: build_prompt Compatibility")
+
+    prompt = build_prompt("mode", ["remember this"], vision_context="looking at code")
+    assert prompt.startswith(build_static_prompt("mode"))
+    assert prompt.endswith("looking at code")
+    assert "remember this" in prompt
+    print("   ✅ PASS")
+
+
+def test_slot_affinity():
+    """Test 4: Sessions keep their llama.cpp slot; LRU key gives one up"""
+    print("\n🧪 Test 4: Slot Affinity")
+
+    client = LLMClient(slots=2)
+    assert client.slot_for("laptop") == 0
+    assert client.slot_for("phone") == 1
+    assert client.slot_for("laptop") == 0, "Session moved slots"
+    assert client.slot_for("tablet") == 1, "LRU slot (phone) not reused"
+
+    payload = client.build_payload([{"role": "user", "content": "hi"}], slot_key="laptop")
+    assert payload["cache_prompt"] is True
+    assert payload["id_slot"] == 0
+    assert "id_slot" not in client.build_payload([])
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all prompt caching tests"""
+    print("=" * 60)
+    print("🧩 PROMPT PREFIX CACHING - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_static_prefix_is_memoized,
+        test_turns_share_prefix,
+        test_build_prompt_compatible,
+        test_slot_affinity,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,136 @@
+"""
+WebSocket Protocol - Test Suite
+
+Verifies the typed message envelope: JSON and legacy encodings,
+parsing of both inbound formats, version negotiation and topics.
+"""
+
+import sys
+import json
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.protocol import (
+    END, PING, MSG_CHAT, MSG_MODE, MSG_SPEECH_START, MSG_VISION_FACE,
+    MSG_VISION_DESKTOP, MSG_ERROR, PROTOCOL_VERSION, ALL_TOPICS, TOPIC_EMOTION, TOPIC_SPEECH,
+    token_message, emotion_message, hello_message, negotiate_version, parse_message, parse_topics
+)
+
+
+def test_encoding():
+    """Test 1: Each message has a JSON and a legacy form"""
+    print("\n🧪 Test 1: Encoding")
+
+    token = token_message("Héllo")
+    assert token.encode(True) == '{"type":"token","text":"Héllo"}'
+    assert token.encode(False) == "Héllo"
+    assert emotion_message("shy").encode(False) == "[EMOTION]shy"
+    assert END.encode(False) == "[END]"
+    assert PING.encode(False) == ""
+    assert hello_message(1).encode(False) is None, "Legacy clients must not see hello"
+    assert token.encode(True) is token.encode(True), "Encoding not cached"
+    print("   ✅ PASS")
+
+
+def test_parse_structured():
+    """Test 2: JSON frames parse into typed messages"""
+    print("\n🧪 Test 2: Structured Parsing")
+
+    msg = parse_message('{"type": "chat", "text": "[not a marker]"}', structured=True)
+    assert msg.type == MSG_CHAT and msg.get("text") == "[not a marker]"
+
+    desktop = json.dumps({"type": "vision_desktop", "task": "coding", "app": "vscode",
+                          "file_type": "py", "has_error": True, "offer": "Need help?",
+                          "window": "a | b", "text": "x|y"})
+    msg = parse_message(desktop, structured=True)
+    assert msg.type == MSG_VISION_DESKTOP
+    assert msg.get("window") == "a | b" and msg.get("has_error") is True
+
+    assert parse_message("{broken", structured=True).type == MSG_ERROR
+    print("   ✅ PASS")
+
+
+def test_parse_legacy():
+    """Test 3: Original string prefixes still work"""
+    print("\n🧪 Test 3: Legacy Parsing")
+
+    assert parse_message("[SPEECH_START]", structured=False).type == MSG_SPEECH_START
+
+    msg = parse_message("[VISION_FACE]present", structured=False)
+    assert msg.type == MSG_VISION_FACE and msg.get("state") == "present"
+
+    msg = parse_message("[VISION_DESKTOP]coding|vscode|py|True|Need help?|main.py|Traceback", structured=False)
+    assert msg.get("app") == "vscode" and msg.get("has_error") is True
+    assert msg.get("text") == "Traceback"
+
+    msg = parse_message("/mode serious", structured=False)
+    assert msg.type == MSG_MODE and msg.get("mode") == "serious"
+
+    msg = parse_message("{hi there}", structured=False)
+    assert msg.type == MSG_CHAT and msg.get("text") == "{hi there}"
+    print("   ✅ PASS")
+
+
+def test_negotiation():
+    """Test 4: Versions are clamped; anything unknown means legacy"""
+    print("\n🧪 Test 4: Version Negotiation")
+
+    assert negotiate_version(None) == 0
+    assert negotiate_version("abc") == 0
+    assert negotiate_version("1") == 1
+    assert negotiate_version(99) == PROTOCOL_VERSION
+    assert negotiate_version(-3) == 0
+    print("   ✅ PASS")
+
+
+def test_topics():
+    """Test 5: Subscriptions parse from query strings and lists"""
+    print("\n🧪 Test 5: Topic Parsing")
+
+    assert parse_topics(None) == ALL_TOPICS, "Unsubscribed clients should get everything"
+    assert parse_topics("") == frozenset()
+    assert parse_topics("emotion, speech-control,bogus") == {TOPIC_EMOTION, TOPIC_SPEECH}
+    assert parse_topics(["emotion"]) == {TOPIC_EMOTION}
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all protocol tests"""
+    print("=" * 60)
+    print("📨 WEBSOCKET PROTOCOL - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_encoding,
+        test_parse_structured,
+        test_parse_legacy,
+        test_negotiation,
+        test_topics,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
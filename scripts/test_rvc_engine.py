@@ -0,0 +1,158 @@
+"""
+RVC Engine - Test Suite
+
+Verifies that the voice conversion model is loaded once and reused for
+every utterance (instead of a new process per sentence), that
+concurrent callers share one load, and that load or conversion failures
+fall back to passthrough. The model is replaced with a fake backend.
+"""
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+# Add voice to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "voice"))
+
+import numpy as np
+
+from rvc.inferencer import RVCEngine, PassthroughBackend, convert_array, model_id
+
+
+class FakeBackend:
+    """Slow to load, fast to convert (like a real RVC model)"""
+
+    name = "fake"
+
+    def __init__(self, fail_load=False, fail_convert=False):
+        self.fail_load = fail_load
+        self.fail_convert = fail_convert
+        self.loads = 0
+        self.converted = 0
+
+    def load(self):
+        self.loads += 1
+        time.sleep(0.05)
+        if self.fail_load:
+            raise FileNotFoundError("weights/alisa.pth")
+
+    def convert(self, audio, sample_rate):
+        if self.fail_convert:
+            raise RuntimeError("out of memory")
+        self.converted += 1
+        return audio * 0.5, 40000
+
+
+def test_model_loaded_once():
+    """Test 1: Many utterances, one model load"""
+    print("\n🧪 Test 1: Model Loaded Once")
+
+    backend = FakeBackend()
+    engine = RVCEngine(backend)
+    audio = np.ones((2400, 1), dtype=np.float32)
+
+    for _ in range(20):
+        converted, sample_rate = engine.convert(audio, 24000)
+    assert backend.loads == 1, f"Model loaded {backend.loads} times"
+    assert backend.converted == 20 and sample_rate == 40000
+    assert float(converted[0, 0]) == 0.5, "Backend output not returned"
+
+    stats = engine.get_stats()
+    assert stats["loaded"] and stats["conversions"] == 20 and stats["fallbacks"] == 0, stats
+    print(f"   Load: {stats['load_seconds']}s once, then {stats['avg_convert_ms']}ms per utterance")
+    print("   ✅ PASS")
+
+
+def test_concurrent_callers():
+    """Test 2: Warm-up and the first sentence racing still load once"""
+    print("\n🧪 Test 2: Concurrent Callers")
+
+    backend = FakeBackend()
+    engine = RVCEngine(backend)
+    audio = np.zeros((100, 1), dtype=np.float32)
+
+    threads = [threading.Thread(target=engine.load)]
+    threads += [threading.Thread(target=engine.convert, args=(audio, 24000)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.loads == 1, f"Model loaded {backend.loads} times"
+    assert backend.converted == 4 and engine.ready
+    print("   ✅ PASS")
+
+
+def test_fallbacks():
+    """Test 3: Missing model / failed conversion -> base voice instead of silence"""
+    print("\n🧪 Test 3: Passthrough Fallbacks")
+
+    audio = np.ones((100, 1), dtype=np.float32)
+
+    backend = FakeBackend(fail_load=True)
+    engine = RVCEngine(backend)
+    for _ in range(3):
+        converted, sample_rate = engine.convert(audio, 24000)
+        assert converted is audio and sample_rate == 24000
+    assert backend.loads == 1, "A failed load should not be retried per utterance"
+    assert not engine.ready and engine.get_stats()["fallbacks"] == 3
+
+    engine = RVCEngine(FakeBackend(fail_convert=True))
+    converted, sample_rate = engine.convert(audio, 24000)
+    assert converted is audio and engine.ready and engine.get_stats()["fallbacks"] == 1
+    print("   ✅ PASS")
+
+
+def test_passthrough_default():
+    """Test 4: The default (RVC disabled) engine is a zero-copy passthrough"""
+    print("\n🧪 Test 4: Passthrough Stand-In")
+
+    engine = RVCEngine(PassthroughBackend())
+    audio = np.zeros((24000, 1), dtype=np.float32)
+    converted, sample_rate = engine.convert(audio, 24000)
+    assert converted is audio and sample_rate == 24000
+
+    converted, _ = convert_array(audio, 24000)
+    assert converted is audio, "Module-level converter should be passthrough by default"
+    assert model_id() == "none"
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all RVC engine tests"""
+    print("=" * 60)
+    print("🎤 RVC ENGINE - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_model_loaded_once,
+        test_concurrent_callers,
+        test_fallbacks,
+        test_passthrough_default,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
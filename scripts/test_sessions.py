@@ -0,0 +1,159 @@
+"""
+Session Registry - Test Suite
+
+Verifies per-session buffers, LRU eviction, pinning of connected
+sessions, idle eviction, loading off the event loop and read-only
+lookups that never create buffers. Buffers are stand-ins, so no
+database is touched.
+"""
+
+import sys
+import asyncio
+import threading
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.sessions import SessionRegistry, normalize_session_id, DEFAULT_SESSION
+
+
+class FakeBuffer:
+    """Stand-in for MemoryBuffer (records which session it was loaded for)"""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.messages = []
+
+    def add(self, role, content):
+        self.messages.append({"role": role, "content": content})
+
+
+def test_isolation():
+    """Test 1: Each session gets its own buffer"""
+    print("\n🧪 Test 1: Session Isolation")
+
+    registry = SessionRegistry(buffer_factory=FakeBuffer)
+    registry.get("laptop").add("user", "hi from laptop")
+    registry.get("phone").add("user", "hi from phone")
+
+    assert registry.get("laptop").messages == [{"role": "user", "content": "hi from laptop"}]
+    assert registry.get("phone").session_id == "phone"
+    assert registry.get("laptop") is registry.get("laptop"), "Buffer reloaded while resident"
+    assert registry.loads == 2
+    print("   ✅ PASS")
+
+
+def test_lru_eviction():
+    """Test 2: Least recently used idle session is evicted at capacity"""
+    print("\n🧪 Test 2: LRU Eviction")
+
+    registry = SessionRegistry(max_sessions=2, buffer_factory=FakeBuffer)
+    registry.get("a")
+    registry.get("b")
+    registry.get("a")  # b is now least recently used
+    registry.get("c")
+
+    assert "b" not in registry, "LRU session not evicted"
+    assert "a" in registry and "c" in registry
+    assert registry.evictions == 1
+    print("   ✅ PASS")
+
+
+def test_connected_sessions_are_pinned():
+    """Test 3: Sessions with clients survive capacity and idle eviction"""
+    print("\n🧪 Test 3: Connected Sessions Pinned")
+
+    registry = SessionRegistry(max_sessions=1, idle_timeout=60, buffer_factory=FakeBuffer)
+    asyncio.run(registry.attach("desk"))
+    registry.get("other")
+
+    assert "desk" in registry, "Connected session was evicted"
+    assert registry.evict_idle(now=10**10) == 1, "Idle session not evicted"
+    assert "desk" in registry and "other" not in registry
+
+    registry.detach("desk")
+    assert registry.evict_idle(now=10**10) == 1
+    assert len(registry) == 0
+    print("   ✅ PASS")
+
+
+def test_session_ids():
+    """Test 4: Handshake session IDs are sanitized"""
+    print("\n🧪 Test 4: Session ID Normalization")
+
+    assert normalize_session_id(None) == DEFAULT_SESSION
+    assert normalize_session_id("") == DEFAULT_SESSION
+    assert normalize_session_id("laptop-1") == "laptop-1"
+    assert normalize_session_id("../../etc; drop") == "....etcdrop"
+    assert len(normalize_session_id("x" * 500)) == 64
+    print("   ✅ PASS")
+
+
+def test_load_off_loop_and_peek():
+    """Test 5: load() builds buffers in a worker thread once; peek() never creates one"""
+    print("\n🧪 Test 5: Async Load & Peek")
+
+    threads = []
+
+    def factory(session_id):
+        threads.append(threading.current_thread())
+        return FakeBuffer(session_id)
+
+    registry = SessionRegistry(max_sessions=2, buffer_factory=factory)
+    registry.get("a")
+    registry.get("b")
+
+    for session_id in ("probe-1", "probe-2", "probe-3"):  # e.g. /history/summary?session=...
+        assert registry.peek(session_id) is None
+    assert registry.peek("a") is not None
+    assert set(registry.get_stats()["resident"]) == {"a", "b"}, "peek() created or evicted buffers"
+
+    async def run():
+        return await asyncio.gather(registry.load("c"), registry.load("c"))
+
+    first, second = asyncio.run(run())
+    assert first is second and first.session_id == "c"
+    assert len(threads) == 3, f"Expected one load for 'c', got {len(threads) - 2}"
+    assert threads[-1] is not threading.main_thread(), "Buffer loaded on the event loop thread"
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all session registry tests"""
+    print("=" * 60)
+    print("🗃️ SESSION REGISTRY - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_isolation,
+        test_lru_eviction,
+        test_connected_sessions_are_pinned,
+        test_session_ids,
+        test_load_off_loop_and_peek,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
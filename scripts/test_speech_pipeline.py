@@ -0,0 +1,231 @@
+"""
+Streaming Speech Pipeline - Test Suite
+
+Verifies sentence segmentation of streamed text, that speech starts
+while the reply is still streaming, that synthesis of the next sentence
+overlaps playback of the current one, that the audio queue stays
+bounded, cancellation, and that with the audio engine the start signal
+follows the engine's start event. TTS and playback are simulated with
+sleeps (or a null audio device).
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# Add voice to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "voice"))
+
+import numpy as np
+
+from audio_engine import AudioEngine, NullOutput
+from speech_pipeline import SentenceSegmenter, SpeechPipeline
+
+SYNTH_TIME = 0.05
+PLAY_TIME = 0.1
+
+
+class FakeAudio:
+    """Records synthesis/playback order instead of producing sound"""
+
+    def __init__(self):
+        self.log = []
+        self.synthesized = 0
+        self.played = 0
+        self.max_ahead = 0
+        self.discarded = []
+
+    async def synthesize(self, text):
+        await asyncio.sleep(SYNTH_TIME)
+        self.synthesized += 1
+        self.max_ahead = max(self.max_ahead, self.synthesized - self.played)
+        self.log.append(("synth", text))
+        return text
+
+    async def play(self, audio):
+        self.log.append(("play", audio))
+        await asyncio.sleep(PLAY_TIME)
+        self.played += 1
+
+    def discard(self, audio):
+        self.discarded.append(audio)
+
+
+def test_segmentation():
+    """Test 1: Streamed text is cut into sentences"""
+    print("\n🧪 Test 1: Sentence Segmentation")
+
+    segmenter = SentenceSegmenter(min_chars=12)
+    sentences = []
+    for token in ["Hmm... ", "you actually", " finished it? ", "Not bad.", " I guess", " 3.5 hours", " was worth it!\n", "Heh"]:
+        sentences += segmenter.feed(token)
+    rest = segmenter.flush()
+
+    assert sentences == [
+        "Hmm... you actually finished it?",
+        "Not bad. I guess 3.5 hours was worth it!",
+    ], f"Unexpected sentences: {sentences}"
+    assert rest == "Heh"
+
+    long_text = "word " * 80
+    cut = SentenceSegmenter(max_chars=100).feed(long_text)
+    assert cut and all(len(s) <= 100 for s in cut), "Long text without punctuation not cut"
+    print("   ✅ PASS")
+
+
+def test_speech_starts_while_streaming():
+    """Test 2: First sentence plays before the reply has finished streaming"""
+    print("\n🧪 Test 2: Time To First Audio")
+
+    async def run():
+        audio = FakeAudio()
+        events = []
+        pipeline = SpeechPipeline(audio.synthesize, audio.play,
+                                  on_start=lambda: events.append("start"),
+                                  on_end=lambda: events.append("end"),
+                                  discard=audio.discard)
+        pipeline.feed("Oh, look who remembered I exist. ")
+        await asyncio.sleep(0.3)  # The LLM is still generating...
+        started_while_streaming = "start" in events
+        pipeline.feed("Took you long enough.")
+        await pipeline.finish()
+        return audio, events, pipeline, started_while_streaming
+
+    audio, events, pipeline, started_while_streaming = asyncio.run(run())
+    assert started_while_streaming, "Speech waited for the end of the reply"
+    assert events == ["start", "end"], f"Unexpected events: {events}"
+    assert pipeline.time_to_first_audio < SYNTH_TIME + 0.05
+    assert audio.discarded == ["Oh, look who remembered I exist.", "Took you long enough."]
+    print(f"   First audio after {pipeline.time_to_first_audio * 1000:.0f}ms")
+    print("   ✅ PASS")
+
+
+def test_synthesis_overlaps_playback():
+    """Test 3: Segment N+1 is synthesized while segment N plays; queue stays bounded"""
+    print("\n🧪 Test 3: Overlap & Bounded Queue")
+
+    async def run():
+        audio = FakeAudio()
+        pipeline = SpeechPipeline(audio.synthesize, audio.play, max_queued=2)
+        start = time.perf_counter()
+        for i in range(8):
+            pipeline.feed(f"This is sentence number {i}. ")
+        await pipeline.finish()
+        return audio, time.perf_counter() - start
+
+    audio, elapsed = asyncio.run(run())
+    sequential = 8 * (SYNTH_TIME + PLAY_TIME)
+    assert audio.played == 8
+    assert elapsed < sequential * 0.8, f"No overlap: {elapsed:.2f}s vs {sequential:.2f}s sequential"
+    assert audio.max_ahead <= 4, f"Synthesis ran {audio.max_ahead} segments ahead"
+    assert audio.log.index(("synth", "This is sentence number 1.")) < audio.log.index(("play", "This is sentence number 1."))
+    print(f"   {elapsed:.2f}s for 8 segments (sequential: {sequential:.2f}s)")
+    print("   ✅ PASS")
+
+
+def test_cancel_and_failures():
+    """Test 4: Failed segments are skipped; cancel stops playback and cleans up"""
+    print("\n🧪 Test 4: Failures & Cancel")
+
+    async def run():
+        audio = FakeAudio()
+
+        async def flaky(text):
+            if "broken" in text:
+                raise RuntimeError("TTS service hiccup")
+            return await audio.synthesize(text)
+
+        events = []
+        pipeline = SpeechPipeline(flaky, audio.play, on_end=lambda: events.append("end"))
+        pipeline.feed("This one is broken somehow. But this one works fine.")
+        await pipeline.finish()
+        played_after_failure = audio.played
+
+        audio2 = FakeAudio()
+        pipeline2 = SpeechPipeline(audio2.synthesize, audio2.play, discard=audio2.discard)
+        for i in range(5):
+            pipeline2.feed(f"Cancelled sentence number {i}. ")
+        await asyncio.sleep(0.12)
+        await pipeline2.cancel()
+        await pipeline2.finish()  # No-op after cancel
+        return played_after_failure, events, audio2
+
+    played_after_failure, events, audio2 = asyncio.run(run())
+    assert played_after_failure == 1, "Working segment was not played"
+    assert events == ["end"]
+    assert audio2.played < 5, "Cancel did not stop playback"
+    assert audio2.synthesized - len(audio2.discarded) <= 1, "Queued audio was not discarded"
+    print("   ✅ PASS")
+
+
+def test_start_follows_engine():
+    """Test 5: With the audio engine, on_start fires when the first segment is heard"""
+    print("\n🧪 Test 5: Start Signal From The Engine")
+
+    rate = 24000
+
+    async def synthesize(text):
+        return np.full(int(0.3 * rate), 0.2, dtype=np.float32), rate
+
+    async def run():
+        engine = AudioEngine(output=NullOutput(10), sample_rate=rate, blocksize=480)
+        log = []
+        try:
+            # Something else is still playing when the reply's first sentence is handed over
+            other = asyncio.ensure_future(engine.play((np.full(rate, 0.1, dtype=np.float32), rate)))
+            other.add_done_callback(lambda _: log.append("other done"))
+            pipeline = SpeechPipeline(synthesize, engine.play,
+                                      on_start=lambda: log.append("start"),
+                                      on_end=lambda: log.append("end"),
+                                      gapless=True)
+            pipeline.feed("First sentence of the reply. Second one here. ")
+            await pipeline.finish()
+            await other
+        finally:
+            engine.close()
+        return log
+
+    log = asyncio.run(run())
+    assert log == ["other done", "start", "end"], f"Start not tied to playback: {log}"
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all speech pipeline tests"""
+    print("=" * 60)
+    print("🎤 STREAMING SPEECH PIPELINE - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_segmentation,
+        test_speech_starts_while_streaming,
+        test_synthesis_overlaps_playback,
+        test_cancel_and_failures,
+        test_start_follows_engine,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,199 @@
+"""
+STT Worker - Test Suite
+
+Verifies the resident speech-to-text process: the model is loaded and
+warmed up once at startup, every request reuses it, partial transcripts
+stream back per decoded segment, and load/decode failures are reported
+instead of hanging the chat loop. Whisper is replaced with a fake model
+(the worker runs in a real separate process).
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add voice to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "voice"))
+
+import numpy as np
+
+from stt_worker import STTWorker, SAMPLE_RATE
+
+
+class FakeWhisper:
+    """One word per second of audio; words name the decode call they came from"""
+
+    def __init__(self, config):
+        self.config = config
+        self.calls = 0
+
+    def transcribe(self, audio, beam_size, language, vad_filter):
+        self.calls += 1
+        if np.isnan(audio).any():
+            raise ValueError("bad audio")
+        call = self.calls
+        seconds = int(len(audio) / SAMPLE_RATE)
+
+        def segments():
+            for i in range(seconds):
+                yield SimpleNamespace(text=f" call{call}-beam{beam_size}-{i}")
+
+        return segments(), None
+
+
+def fake_factory(config):
+    return FakeWhisper(config)
+
+
+def broken_factory(config):
+    raise FileNotFoundError("model.bin")
+
+
+def test_warm_start():
+    """Test 1: Model loads and warms up before the first request"""
+    print("\n🧪 Test 1: Warm Start")
+
+    worker = STTWorker(model_size="tiny", beam_size=2, cpu_threads=1, model_factory=fake_factory)
+    try:
+        worker.start()
+        assert worker.wait_ready(timeout=30), "Worker never became ready"
+        stats = worker.get_stats()
+        assert stats["ready"] and stats["alive"] and stats["model_size"] == "tiny"
+        assert stats["load_seconds"] is not None and stats["warmup_seconds"] is not None
+
+        # Call 1 was the warm-up decode, so the first real request is call 2
+        text = worker.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32))
+        assert text == "call2-beam2-0", f"Unexpected transcript: {text!r}"
+    finally:
+        worker.stop()
+    print("   ✅ PASS")
+
+
+def test_partials_and_reuse():
+    """Test 2: Partial transcripts per segment; one resident model for every request"""
+    print("\n🧪 Test 2: Partial Transcripts & Model Reuse")
+
+    worker = STTWorker(beam_size=1, model_factory=fake_factory)
+    try:
+        worker.start()
+        pid = worker._process.pid
+        partials = []
+        text = worker.transcribe(np.zeros(3 * SAMPLE_RATE, dtype=np.float32), on_partial=partials.append)
+        # The last segment only arrives with the final transcript (no duplicate partial)
+        assert partials == ["call2-beam1-0", "call2-beam1-0 call2-beam1-1"], f"Partials: {partials}"
+        assert text == "call2-beam1-0 call2-beam1-1 call2-beam1-2"
+
+        text = worker.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32))
+        assert text == "call3-beam1-0", "Model was not reused"
+        assert worker._process.pid == pid and worker.get_stats()["transcriptions"] == 2
+    finally:
+        worker.stop()
+    assert not worker.alive
+    print("   ✅ PASS")
+
+
+def test_async_partials():
+    """Test 3: transcribe_async delivers partials on the event loop (async callbacks too)"""
+    print("\n🧪 Test 3: Async Transcription")
+
+    worker = STTWorker(model_factory=fake_factory)
+
+    async def run():
+        partials = []
+        ticks = 0
+
+        async def on_partial(text):
+            partials.append((asyncio.get_running_loop() is loop, text))
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        loop = asyncio.get_running_loop()
+        tick_task = asyncio.create_task(ticker())
+        text = await worker.transcribe_async(np.zeros(2 * SAMPLE_RATE, dtype=np.float32), on_partial=on_partial)
+        await asyncio.sleep(0.05)
+        tick_task.cancel()
+        return text, partials, ticks
+
+    try:
+        worker.start()
+        text, partials, ticks = asyncio.run(run())
+        assert text.endswith("-1") and len(partials) == 1, f"{text!r} {partials}"
+        assert all(on_loop for on_loop, _ in partials), "Partials must run on the event loop"
+        assert ticks > 5, "Event loop was blocked while waiting for Whisper"
+    finally:
+        worker.stop()
+    print("   ✅ PASS")
+
+
+def test_failures():
+    """Test 4: Load and decode failures surface as errors"""
+    print("\n🧪 Test 4: Failure Handling")
+
+    worker = STTWorker(model_factory=broken_factory)
+    try:
+        worker.start()
+        assert worker.wait_ready(timeout=30) is False, "Broken model reported ready"
+        try:
+            worker.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), timeout=5)
+            assert False, "Expected RuntimeError"
+        except RuntimeError as e:
+            assert "model.bin" in str(e)
+    finally:
+        worker.stop()
+
+    worker = STTWorker(model_factory=fake_factory)
+    try:
+        worker.start()
+        try:
+            worker.transcribe(np.full(SAMPLE_RATE, np.nan, dtype=np.float32))
+            assert False, "Expected RuntimeError"
+        except RuntimeError as e:
+            assert "bad audio" in str(e)
+        assert worker.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32)), "Worker died after a bad request"
+    finally:
+        worker.stop()
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all STT worker tests"""
+    print("=" * 60)
+    print("🧠 STT WORKER - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_warm_start,
+        test_partials_and_reuse,
+        test_async_partials,
+        test_failures,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,169 @@
+"""
+Rolling Conversation Summarizer - Test Suite
+
+Verifies that trimmed turns are queued for summarizing, folded into the
+session summary by the (faked) LLM, put back when a user request
+preempts the run, persisted, and injected into the prompt context.
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app import memory as memory_module
+from app.memory import MemoryBuffer
+from app.models import ConversationSummary
+from app.prompt import build_messages
+from app.sessions import SessionRegistry
+from app.summarizer import ConversationSummarizer
+from app.llm_scheduler import LLMScheduler, PRIORITY_USER
+from fake_backend import uses_fake_database
+
+
+async def fake_stream(messages, slot_key=None):
+    """Stand-in for the LLM: a short summary, one word per 20ms"""
+    for word in ["User ", "likes ", "tea ", "and ", "is ", "learning ", "Rust."]:
+        await asyncio.sleep(0.02)
+        yield word
+
+
+def make_summarizer():
+    """Summarizer on its own scheduler with the fake LLM"""
+    return ConversationSummarizer(min_messages=4, scheduler=LLMScheduler(stream_response=fake_stream))
+
+
+def filled_buffer(session_id="test", turns=6):
+    """Small buffer that has trimmed some turns"""
+    buffer = MemoryBuffer(max_turns=2, max_tokens=100000, session_id=session_id)
+    for i in range(turns):
+        buffer.add("user", f"question {i}")
+        buffer.add("assistant", f"answer {i}")
+    return buffer
+
+
+@uses_fake_database
+def test_evicted_turns_are_queued():
+    """Test 1: Trimmed user/assistant messages wait for the summarizer"""
+    print("\n🧪 Test 1: Trimmed Turns Queued")
+
+    buffer = filled_buffer(turns=5)
+    buffer.add("system", "Desktop context: VS Code")  # Transient, never summarized
+    buffer.add("user", "question 5")
+    buffer.add("assistant", "answer 5")
+
+    pending = [m["content"] for m in buffer.evicted]
+    assert pending[:2] == ["question 0", "answer 0"], f"Unexpected order: {pending}"
+    assert all(not c.startswith("Desktop") for c in pending), "System context was queued"
+    assert buffer.get_summary()["pending_summary"] == len(pending)
+    print("   ✅ PASS")
+
+
+@uses_fake_database
+def test_summarize_updates_and_persists():
+    """Test 2: Summary is updated, saved, and loaded with the session"""
+    print("\n🧪 Test 2: Summarize & Persist")
+
+    summarizer = make_summarizer()
+    buffer = filled_buffer(session_id="persist")
+    assert summarizer.needs_summary(buffer)
+    trimmed = len(buffer.evicted)
+
+    ok = asyncio.run(summarizer.summarize(buffer))
+    assert ok, "Summarize failed"
+    assert buffer.summary == "User likes tea and is learning Rust."
+    assert buffer.messages_summarized == trimmed
+    assert not buffer.evicted, "Pending messages not consumed"
+
+    db = memory_module.SessionLocal()
+    row = db.get(ConversationSummary, "persist")
+    db.close()
+    assert row is not None and row.summary == buffer.summary
+    assert MemoryBuffer(session_id="persist").summary == buffer.summary, "Summary not loaded"
+    print("   ✅ PASS")
+
+
+@uses_fake_database
+def test_preempted_run_restores_messages():
+    """Test 3: A user request preempts the summary and nothing is lost"""
+    print("\n🧪 Test 3: Preemption Restores Pending Messages")
+
+    summarizer = make_summarizer()
+    buffer = filled_buffer(session_id="preempt")
+    pending = list(buffer.evicted)
+
+    async def run():
+        task = asyncio.create_task(summarizer.summarize(buffer))
+        await asyncio.sleep(0.05)
+        async for _ in summarizer.scheduler.stream([{"role": "user", "content": "hi"}], PRIORITY_USER):
+            pass
+        return await task
+
+    ok = asyncio.run(run())
+    assert not ok, "Preempted summary reported success"
+    assert list(buffer.evicted) == pending, "Pending messages lost"
+    assert buffer.summary == ""
+    assert summarizer.get_stats()["preempted"] == 1
+    print("   ✅ PASS")
+
+
+@uses_fake_database
+def test_run_pending_and_prompt():
+    """Test 4: Idle pass summarizes resident sessions; summary reaches the prompt"""
+    print("\n🧪 Test 4: Idle Pass & Prompt Injection")
+
+    registry = SessionRegistry(buffer_factory=lambda session_id: filled_buffer(session_id))
+    registry.get("a")
+    registry.get("b")
+    registry.get("quiet").take_evicted()  # Nothing to summarize
+
+    summarizer = make_summarizer()
+    done = asyncio.run(summarizer.run_pending(registry))
+    assert done == 2, f"Expected 2 summaries, got {done}"
+
+    memory = registry.get("a")
+    messages = build_messages("mode", [], history=list(memory.get()), summary=memory.summary)
+    assert memory.summary in messages[-1]["content"], "Summary missing from context"
+    assert memory.summary not in messages[0]["content"], "Summary leaked into static prefix"
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all summarizer tests"""
+    print("=" * 60)
+    print("📝 CONVERSATION SUMMARIZER - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_evicted_turns_are_queued,
+        test_summarize_updates_and_persists,
+        test_preempted_run_restores_messages,
+        test_run_pending_and_prompt,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,195 @@
+"""
+TTS Audio Cache - Test Suite
+
+Verifies that short phrases are synthesized once and then served from
+memory or disk, that the key covers voice/rate/pitch/RVC model, that
+both tiers evict least-recently-used entries by size, that the disk
+size stays exact across overwrites and crashed writes, and that the
+fallback phrases can be pre-warmed. TTS is replaced with a fake.
+"""
+
+import sys
+import asyncio
+import tempfile
+from pathlib import Path
+
+# Add voice to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "voice"))
+
+import numpy as np
+
+from tts_cache import TTSCache, PREWARM_PHRASES
+
+
+class FakeSynth:
+    """Counts synthesis calls; one second of quiet audio per call"""
+
+    def __init__(self, samples: int = 24000):
+        self.samples = samples
+        self.calls = []
+
+    async def __call__(self, text):
+        self.calls.append(text)
+        pcm = np.full((self.samples, 1), 0.25, dtype=np.float32)
+        return pcm, 24000
+
+
+def test_memory_hit():
+    """Test 1: A repeated phrase is synthesized once"""
+    print("\n🧪 Test 1: Memory Hits")
+
+    synth = FakeSynth()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSCache(tmp)
+
+        async def run():
+            first = await cache.get_or_create("Hmph.", "voice", "+0%", "+0Hz", synth)
+            second = await cache.get_or_create("  Hmph. ", "voice", "+0%", "+0Hz", synth)
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert synth.calls == ["Hmph."], f"Unexpected synth calls: {synth.calls}"
+        assert second is first, "Memory hit should return the cached tuple"
+        stats = cache.get_stats()
+        assert stats["memory_hits"] == 1 and stats["misses"] == 1, stats
+
+        long_text = "This sentence is far too long to be worth caching, because replies like it almost never repeat word for word."
+        asyncio.run(cache.get_or_create(long_text, "voice", "+0%", "+0Hz", synth))
+        asyncio.run(cache.get_or_create(long_text, "voice", "+0%", "+0Hz", synth))
+        assert synth.calls.count(long_text) == 2, "Long sentences should bypass the cache"
+    print("   ✅ PASS")
+
+
+def test_disk_hit_and_key():
+    """Test 2: A new cache instance finds phrases on disk; voice/rate/pitch/model are part of the key"""
+    print("\n🧪 Test 2: Disk Hits & Cache Key")
+
+    synth = FakeSynth()
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(TTSCache(tmp).get_or_create("Mhm.", "ana", "+10%", "+5Hz", synth))
+
+        cache = TTSCache(tmp)  # Fresh process, empty memory tier
+
+        async def run():
+            pcm, sample_rate = await cache.get_or_create("Mhm.", "ana", "+10%", "+5Hz", synth)
+            assert sample_rate == 24000 and pcm.shape == (24000, 1) and pcm.dtype == np.float32
+            assert abs(float(pcm[0, 0]) - 0.25) < 1e-3, "Audio changed on disk"
+            await cache.get_or_create("Mhm.", "jenny", "+10%", "+5Hz", synth)
+            await cache.get_or_create("Mhm.", "ana", "+20%", "+5Hz", synth)
+            await cache.get_or_create("Mhm.", "ana", "+10%", "+8Hz", synth)
+            await cache.get_or_create("Mhm.", "ana", "+10%", "+5Hz", synth, model="alisa.pth:1")
+
+        asyncio.run(run())
+        stats = cache.get_stats()
+        assert stats["disk_hits"] == 1, stats
+        assert len(synth.calls) == 5, f"Each key variant should synthesize once: {synth.calls}"
+    print("   ✅ PASS")
+
+
+def test_lru_eviction():
+    """Test 3: Both tiers stay under their size limits, dropping the least recently used"""
+    print("\n🧪 Test 3: LRU Eviction By Size")
+
+    synth = FakeSynth(samples=1000)  # 4000 bytes in memory, ~2 KB on disk
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSCache(tmp, memory_bytes=8000, disk_bytes=5000)
+
+        async def run():
+            await cache.get_or_create("One.", "v", "r", "p", synth)
+            await cache.get_or_create("Two.", "v", "r", "p", synth)
+            await cache.get_or_create("One.", "v", "r", "p", synth)  # One is now most recent
+            await cache.get_or_create("Three.", "v", "r", "p", synth)  # Evicts Two from memory
+            await cache.get_or_create("One.", "v", "r", "p", synth)
+            await cache.get_or_create("Two.", "v", "r", "p", synth)
+
+        asyncio.run(run())
+        stats = cache.get_stats()
+        assert stats["memory_bytes"] <= 8000 and stats["memory_items"] == 2, stats
+        assert stats["disk_bytes"] <= 5000, stats
+        assert stats["evictions"] >= 1, stats
+        assert synth.calls.count("One.") == 1, f"Recently used phrase was evicted: {synth.calls}"
+        assert sum(p.stat().st_size for p in Path(tmp).glob("*.npz")) == stats["disk_bytes"]
+    print("   ✅ PASS")
+
+
+def test_prewarm():
+    """Test 4: Fallback phrases are ready before the first reply"""
+    print("\n🧪 Test 4: Pre-warming")
+
+    synth = FakeSynth()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSCache(tmp)
+
+        async def synthesize(text):
+            return await cache.get_or_create(text, "voice", "+0%", "+0Hz", synth)
+
+        async def failing(text):
+            raise ConnectionError("offline")
+
+        warmed = asyncio.run(cache.prewarm(synthesize))
+        assert warmed == len(PREWARM_PHRASES) and len(synth.calls) == len(PREWARM_PHRASES)
+
+        asyncio.run(synthesize("Alright, no problem."))
+        assert len(synth.calls) == len(PREWARM_PHRASES), "Pre-warmed phrase was synthesized again"
+        assert asyncio.run(cache.prewarm(failing, ["Hmph."])) == 0, "Failures should be skipped"
+    print("   ✅ PASS")
+
+
+def test_disk_accounting():
+    """Test 5: Overwriting an entry doesn't double-count it; crash leftovers aren't entries"""
+    print("\n🧪 Test 5: Disk Size Accounting")
+
+    audio = (np.full((1000, 1), 0.25, dtype=np.float32), 24000)
+    with tempfile.TemporaryDirectory() as tmp:
+        orphan = Path(tmp) / "deadbeef.npz.tmp"
+        orphan.write_bytes(b"x" * 100)  # Crash mid-write in an earlier run
+
+        cache = TTSCache(tmp, disk_bytes=100000)
+        for _ in range(3):
+            cache._store("same-key", audio)
+        files = list(Path(tmp).iterdir())
+        stats = cache.get_stats()
+        assert files == [Path(tmp) / "same-key.npz"], f"Unexpected files: {files}"
+        assert stats["disk_bytes"] == files[0].stat().st_size, stats
+        assert stats["evictions"] == 0, stats
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all TTS cache tests"""
+    print("=" * 60)
+    print("💾 TTS AUDIO CACHE - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_memory_hit,
+        test_disk_hit_and_key,
+        test_lru_eviction,
+        test_prewarm,
+        test_disk_accounting,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
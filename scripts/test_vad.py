@@ -0,0 +1,169 @@
+"""
+VAD Capture - Test Suite
+
+Verifies the streaming capture path used by voice_input.py: the
+callback ring buffer, energy VAD endpointing (recording ends shortly
+after the user stops talking, however long they spoke), noise
+rejection and the utterance length cap. Audio is synthesized, so no
+microphone is needed.
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+# Add voice to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "voice"))
+
+import numpy as np
+
+from vad import (
+    SAMPLE_RATE, FRAME_SAMPLES, PRE_ROLL_MS, END_SILENCE_MS,
+    AudioRingBuffer, EnergyVAD, Endpointer
+)
+
+rng = np.random.default_rng(0)
+
+
+def noise(seconds, level=0.002):
+    return (rng.standard_normal(int(seconds * SAMPLE_RATE)) * level).astype(np.float32)
+
+
+def voice(seconds, level=0.3):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (level * np.sin(2 * np.pi * 220 * t) + noise(seconds)).astype(np.float32)
+
+
+def run_endpointer(audio, **kwargs):
+    """Feed audio frame by frame; returns (utterance, seconds of input consumed)"""
+    endpointer = Endpointer(EnergyVAD(), **kwargs)
+    for i in range(0, len(audio) - FRAME_SAMPLES + 1, FRAME_SAMPLES):
+        utterance = endpointer.feed(audio[i:i + FRAME_SAMPLES])
+        if utterance is not None:
+            return utterance, (i + FRAME_SAMPLES) / SAMPLE_RATE
+    return endpointer.flush(), len(audio) / SAMPLE_RATE
+
+
+def test_ring_buffer():
+    """Test 1: Ring buffer wraps around and drops the oldest audio on overrun"""
+    print("\n🧪 Test 1: Ring Buffer")
+
+    ring = AudioRingBuffer(capacity=10)
+    ring.write(np.arange(6))
+    assert ring.read(4).tolist() == [0, 1, 2, 3]
+    ring.write(np.arange(6, 12))  # Wraps around the end
+    assert ring.read(8).tolist() == list(range(4, 12))
+    assert ring.read(1, timeout=0.01) is None, "Empty read should time out"
+
+    ring.write(np.arange(25))  # Reader fell behind
+    assert ring.overruns == 1 and len(ring) == 10
+    assert ring.read(10).tolist() == list(range(15, 25)), "Should keep the newest audio"
+
+    # Audio thread -> reader thread
+    ring = AudioRingBuffer()
+    source = np.arange(FRAME_SAMPLES * 50, dtype=np.float32)
+
+    def producer():
+        for i in range(0, len(source), 160):  # 10 ms callback blocks
+            ring.write(source[i:i + 160])
+
+    thread = threading.Thread(target=producer)
+    thread.start()
+    frames = [ring.read(FRAME_SAMPLES, timeout=1.0) for _ in range(50)]
+    thread.join()
+    assert ring.overruns == 0
+    assert np.array_equal(np.concatenate(frames), source), "Frames lost or reordered"
+    print("   ✅ PASS")
+
+
+def test_endpointing_tracks_speech():
+    """Test 2: Recording ends ~END_SILENCE_MS after speech, for short and long turns"""
+    print("\n🧪 Test 2: Endpointing")
+
+    for spoken in (0.6, 4.0):
+        audio = np.concatenate([noise(1.0), voice(spoken), noise(3.0)])
+        utterance, consumed = run_endpointer(audio)
+        assert utterance is not None, f"{spoken}s utterance not detected"
+
+        speech_end = 1.0 + spoken
+        latency = consumed - speech_end
+        assert abs(latency - END_SILENCE_MS / 1000) <= 0.1, f"Ended {latency:.2f}s after speech"
+
+        expected = spoken + (PRE_ROLL_MS + END_SILENCE_MS) / 1000
+        length = len(utterance) / SAMPLE_RATE
+        assert abs(length - expected) <= 0.15, f"Utterance {length:.2f}s, expected ~{expected:.2f}s"
+        print(f"   {spoken}s spoken -> {length:.2f}s captured, ended {latency:.2f}s after speech")
+
+    # The old fixed 5 s recording cut long turns off
+    audio = np.concatenate([noise(0.5), voice(8.0), noise(2.0)])
+    utterance, _ = run_endpointer(audio)
+    assert len(utterance) / SAMPLE_RATE > 8.0, "Long utterance was cut off"
+    print("   ✅ PASS")
+
+
+def test_noise_rejection():
+    """Test 3: Background noise and short clicks aren't utterances"""
+    print("\n🧪 Test 3: Noise Rejection")
+
+    utterance, _ = run_endpointer(noise(3.0, level=0.02))
+    assert utterance is None, "Steady noise detected as speech"
+
+    click = np.concatenate([noise(1.0), voice(0.12), noise(2.0)])
+    utterance, _ = run_endpointer(click)
+    assert utterance is None, "Click detected as speech"
+
+    # A real utterance after a click still gets through
+    audio = np.concatenate([click, voice(1.0), noise(1.5)])
+    utterance, _ = run_endpointer(audio)
+    assert utterance is not None and len(utterance) / SAMPLE_RATE > 1.0
+    print("   ✅ PASS")
+
+
+def test_max_length():
+    """Test 4: Utterances are capped"""
+    print("\n🧪 Test 4: Max Utterance Length")
+
+    audio = np.concatenate([noise(0.5), voice(6.0)])
+    utterance, consumed = run_endpointer(audio, max_seconds=3)
+    assert utterance is not None and consumed < 4.0, f"Cap ignored ({consumed:.2f}s)"
+    assert abs(len(utterance) / SAMPLE_RATE - 3.0) <= 0.05
+    print("   ✅ PASS")
+
+
+def run_all_tests():
+    """Run all VAD capture tests"""
+    print("=" * 60)
+    print("🎙️ VAD CAPTURE - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_ring_buffer,
+        test_endpointing_tracks_speech,
+        test_noise_rejection,
+        test_max_length,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"   ❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"   ❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"✅ Passed: {passed}/{len(tests)}")
+    print(f"❌ Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
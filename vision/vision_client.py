@@ -5,8 +5,8 @@ from face_emotion import detect_face_and_emotion, get_detection_mode
 from vision_config import DETECTION_INTERVAL, FRAME_SKIP, CURRENT_PRESET
 import time
 from collections import deque
+from ws_protocol import WS_URL, face_message
 
-WS_URL = "ws://127.0.0.1:8000/ws/chat"
 
 # Performance monitoring
 class PerformanceMonitor:
@@ -111,10 +111,10 @@ async def vision_loop():
                     if face != last_presence:
                         if face == "face":
                             print("✅ User detected")
-                            messages_to_send.append("[VISION_FACE]present")
+                            messages_to_send.append(face_message("present"))
                         else:
                             print("❌ User left")
-                            messages_to_send.append("[VISION_FACE]absent")
+                            messages_to_send.append(face_message("absent"))
                             away_time = current_time
                         
                         last_presence = face
@@ -123,11 +123,11 @@ async def vision_loop():
                     if attention != last_attention and face == "face":
                         if attention == "focused":
                             print("👀 User looking at screen")
-                            messages_to_send.append("[VISION_FACE]focused")
+                            messages_to_send.append(face_message("focused"))
                             focused_time = current_time
                         else:
                             print("😴 User looking away")
-                            messages_to_send.append("[VISION_FACE]distracted")
+                            messages_to_send.append(face_message("distracted"))
                             away_time = current_time
                         
                         last_attention = attention
@@ -135,7 +135,7 @@ async def vision_loop():
                     # Emotion changed (if implemented)
                     if emotion != last_emotion and face == "face" and emotion != "neutral":
                         print(f"😊 Emotion detected: {emotion}")
-                        messages_to_send.append(f"[VISION_FACE]{emotion}")
+                        messages_to_send.append(face_message(emotion))
                         last_emotion = emotion
                     
                     # Send all messages efficiently
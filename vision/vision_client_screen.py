@@ -13,9 +13,7 @@ from face_emotion import detect_face_and_emotion
 from screen_capture import capture_screen
 from screen_analyze import analyze_screen
 from desktop_understanding import desktop_understanding
-
-# WebSocket connection URL
-WS_URL = "ws://127.0.0.1:8000/ws/chat"
+from ws_protocol import WS_URL, face_message, desktop_message
 
 # Throttle timing (in seconds)
 SCREEN_CAPTURE_INTERVAL = 10  # Analyze screen every 10 seconds (not too often)
@@ -112,7 +110,7 @@ async def vision_with_screen_loop():
                     
                     # Send face/attention updates when state changes
                     if presence != last_presence:
-                        messages_to_send.append(f"[VISION_FACE]{presence}")
+                        messages_to_send.append(face_message(presence))
                         if presence == "present":
                             print("✅ User detected")
                         else:
@@ -120,7 +118,7 @@ async def vision_with_screen_loop():
                         last_presence = presence
                     
                     if attention_state != last_attention and presence == "present":
-                        messages_to_send.append(f"[VISION_FACE]{attention_state}")
+                        messages_to_send.append(face_message(attention_state))
                         if attention_state == "focused":
                             print("👀 User looking at screen")
                         else:
@@ -171,17 +169,8 @@ async def vision_with_screen_loop():
                                             print(f"💡 Alisa can offer: {analysis['offer_message']}")
                                         
                                         # Send to backend with understanding context
-                                        # Format: [VISION_DESKTOP]task|app|file_type|has_error|offer|window|text
-                                        desktop_msg = (
-                                            f"[VISION_DESKTOP]"
-                                            f"{analysis['task']}|"
-                                            f"{analysis['app_type']}|"
-                                            f"{analysis['file_type']}|"
-                                            f"{analysis['has_error']}|"
-                                            f"{analysis['offer_message']}|"
-                                            f"{window_title}|"
-                                            f"{screen_text[:200]}"
-                                        )
+                                        # Fields are sent as-is (no "|" escaping issues with JSON)
+                                        desktop_msg = desktop_message(analysis, window_title, screen_text[:200])
                                         messages_to_send.append(desktop_msg)
                                         
                                         last_window_title = window_title
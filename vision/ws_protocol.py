@@ -0,0 +1,44 @@
+"""
+WebSocket Protocol Helpers for the vision clients
+Typed JSON frames (protocol=1) shared by vision_client and vision_client_screen
+
+Mirrors backend/app/protocol.py:
+    {"type": "vision_face", "state": "present"}
+    {"type": "vision_desktop", "task": "coding", "app": "ide", "file_type": "python",
+     "has_error": true, "offer": "...", "window": "main.py - VS Code", "text": "..."}
+"""
+
+import json
+import os
+
+PROTOCOL_VERSION = 1
+
+# Conversation session shared with the chat/voice clients on this device
+SESSION_ID = os.getenv("ALISA_SESSION", "default")
+
+# Empty subscription: the vision clients only send, so the chat stream isn't pushed to them
+WS_URL = (f"ws://127.0.0.1:8000/ws/chat?role=vision&protocol={PROTOCOL_VERSION}"
+          f"&subscribe=&session={SESSION_ID}")
+
+
+def encode(msg_type, **data):
+    return json.dumps({"type": msg_type, **data}, ensure_ascii=False)
+
+
+def face_message(state):
+    """Presence, attention or emotion change (present/absent, focused/distracted, happy...)"""
+    return encode("vision_face", state=state)
+
+
+def desktop_message(analysis, window, text):
+    """Desktop understanding result (desktop_understanding.analyze_screen_context)"""
+    return encode(
+        "vision_desktop",
+        task=analysis["task"],
+        app=analysis["app_type"],
+        file_type=analysis["file_type"],
+        has_error=bool(analysis["has_error"]),
+        offer=analysis["offer_message"] or "",
+        window=window,
+        text=text,
+    )
@@ -0,0 +1,75 @@
+"""
+In-Memory Audio
+TTS output goes from the network to the speakers without touching the disk
+
+Pipeline:
+edge-tts chunks → bytes buffer → decoded once to NumPy PCM
+→ (RVC on the array) → played from memory (audio_engine.py)
+
+Audio is passed around as a (pcm, sample_rate) tuple, where pcm is a
+float32 array shaped (samples, channels) in the range [-1, 1].
+"""
+
+import io
+
+import numpy as np
+
+# MP3 decoding (pydub needs ffmpeg; soundfile >= 0.12 can decode MP3 itself)
+try:
+    from pydub import AudioSegment
+    PYDUB_AVAILABLE = True
+except ImportError:
+    PYDUB_AVAILABLE = False
+
+from audio_engine import audio_engine
+
+
+async def stream_tts_bytes(communicate) -> bytes:
+    """Collect an edge_tts.Communicate stream into memory"""
+    buffer = io.BytesIO()
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            buffer.write(chunk["data"])
+    return buffer.getvalue()
+
+
+def pcm_from_samples(samples, sample_width: int, channels: int) -> np.ndarray:
+    """Integer PCM samples (interleaved) -> float32 (samples, channels)"""
+    scale = float(1 << (8 * sample_width - 1))
+    pcm = np.asarray(samples, dtype=np.float32) / scale
+    return pcm.reshape(-1, channels)
+
+
+def decode_audio(data: bytes, format: str = "mp3"):
+    """
+    Decode compressed audio once; returns (pcm, sample_rate)
+    Blocks (pydub runs ffmpeg) - async callers use asyncio.to_thread(decode_audio, ...)
+    """
+    if PYDUB_AVAILABLE:
+        segment = AudioSegment.from_file(io.BytesIO(data), format=format)
+        pcm = pcm_from_samples(segment.get_array_of_samples(), segment.sample_width, segment.channels)
+        return pcm, segment.frame_rate
+
+    import soundfile as sf
+    pcm, sample_rate = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    return pcm, sample_rate
+
+
+def to_int16(pcm: np.ndarray) -> np.ndarray:
+    """float32 [-1, 1] -> int16 (for WAV / the TTS cache)"""
+    return (np.clip(pcm, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def play_pcm(pcm: np.ndarray, sample_rate: int):
+    """Play a PCM array and block until it finishes"""
+    audio_engine.play_blocking((pcm, sample_rate))
+
+
+def stop_playback():
+    """Cut off whatever is playing (waiting play calls return right away)"""
+    audio_engine.stop()
+
+
+async def play_pcm_async(audio):
+    """Play a (pcm, sample_rate) tuple without blocking the event loop (gapless when queued ahead)"""
+    await audio_engine.play(audio)
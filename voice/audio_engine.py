@@ -0,0 +1,349 @@
+"""
+Audio Output Engine
+One callback-driven output stream shared by every voice module
+
+Pipeline:
+play((pcm, sample_rate)) → mono at the engine rate → segment queue
+→ output callback pulls fixed blocks (segments back to back, no gaps)
+→ per-block RMS → level listeners (lip-sync)
+
+Nothing polls: the callback runs on the audio thread and only copies
+samples. Segment start/end and levels are handed to the event loop of
+whoever queued the audio, delayed by the device's output latency so
+"finished" means heard, not just handed over.
+
+Without sounddevice (or with ALISA_AUDIO_DEVICE=null) a NullOutput
+drives the same callback in real time, so the engine runs - and can be
+tested - without a sound card.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+try:
+    import sounddevice as sd
+    SOUNDDEVICE_AVAILABLE = True
+except (ImportError, OSError):  # OSError: PortAudio library missing
+    SOUNDDEVICE_AVAILABLE = False
+
+# Output sample rate (edge-tts produces 24 kHz; other rates are resampled)
+AUDIO_SAMPLE_RATE = int(os.getenv("ALISA_AUDIO_RATE", "24000"))
+
+# Samples per callback (~21 ms at 24 kHz) - also the lip-sync level resolution
+AUDIO_BLOCKSIZE = 512
+
+# Output device: unset = system default, a name/index, or "null" (no sound card)
+AUDIO_DEVICE = os.getenv("ALISA_AUDIO_DEVICE") or None
+
+
+class SoundDeviceOutput:
+    """sounddevice output stream that asks fill() for every block"""
+
+    def __init__(self, device=AUDIO_DEVICE):
+        self.device = int(device) if isinstance(device, str) and device.isdigit() else device
+        self._stream = None
+
+    @property
+    def latency(self) -> float:
+        """Seconds between a block being filled and it reaching the speakers"""
+        return float(self._stream.latency) if self._stream is not None else 0.0
+
+    def start(self, sample_rate: int, blocksize: int, fill):
+        def callback(outdata, frames, time_info, status):
+            fill(outdata[:, 0])
+
+        self._stream = sd.OutputStream(
+            samplerate=sample_rate,
+            blocksize=blocksize,
+            channels=1,
+            dtype="float32",
+            device=self.device,
+            latency="low",
+            callback=callback
+        )
+        self._stream.start()
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+class NullOutput:
+    """
+    Stand-in sound card: pulls blocks at the real-time rate and discards them
+    speed > 1 runs the clock faster (tests)
+    """
+
+    latency = 0.0
+
+    def __init__(self, speed: float = 1.0):
+        self.speed = speed
+        self.samples = 0
+        self._closed = threading.Event()
+        self._thread = None
+
+    def start(self, sample_rate: int, blocksize: int, fill):
+        self._closed.clear()
+
+        def run():
+            block = np.zeros(blocksize, dtype=np.float32)
+            interval = blocksize / sample_rate / self.speed
+            next_at = time.perf_counter()
+            while not self._closed.is_set():
+                fill(block)
+                self.samples += blocksize
+                next_at += interval
+                self._closed.wait(max(0.0, next_at - time.perf_counter()))
+
+        self._thread = threading.Thread(target=run, name="alisa-null-audio", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+
+def create_output():
+    """Sound card if available, otherwise the null device"""
+    if AUDIO_DEVICE == "null":
+        return NullOutput()
+    if not SOUNDDEVICE_AVAILABLE:
+        print("⚠️ sounddevice not available - audio goes to a null device")
+        return NullOutput()
+    return SoundDeviceOutput(AUDIO_DEVICE)
+
+
+class Playback:
+    """One queued segment"""
+
+    __slots__ = ("pcm", "pos", "loop", "on_start", "started", "finished", "done")
+
+    def __init__(self, pcm: np.ndarray, loop=None, on_start=None):
+        self.pcm = pcm
+        self.pos = 0
+        self.loop = loop  # Event loop to report to (None for blocking callers)
+        self.on_start = on_start  # Runs on that loop when the segment is first heard
+        self.started = loop.create_future() if loop else None
+        self.finished = loop.create_future() if loop else None
+        self.done = threading.Event()
+
+
+def _resolve(future):
+    if future is not None and not future.done():
+        future.set_result(True)
+
+
+class AudioEngine:
+    """
+    Gapless, callback-driven playback
+
+    Usage:
+        await audio_engine.play((pcm, sample_rate))   # Returns once it has been heard
+        await audio_engine.play(audio, on_start=fn)    # fn() when it starts being heard
+        audio_engine.add_level_listener(fn)            # fn(rms) per block while playing
+        audio_engine.stop()                            # Drop everything (barge-in)
+    """
+
+    def __init__(self, output=None, sample_rate: int = AUDIO_SAMPLE_RATE,
+                 blocksize: int = AUDIO_BLOCKSIZE):
+        self.output = output  # Created on first use (create_output)
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._running = False
+        self._level_listeners = []
+        self._last_loop = None  # Loop of the segment that played last
+        self._was_playing = False
+
+        # Stats
+        self.segments = 0
+        self.blocks = 0
+        self.stops = 0
+
+    @property
+    def playing(self) -> bool:
+        return bool(self._queue)
+
+    def start(self):
+        """Open the output stream (play() does this on first use)"""
+        with self._lock:
+            if self._running:
+                return
+            if self.output is None:
+                self.output = create_output()
+            self.output.start(self.sample_rate, self.blocksize, self._fill)
+            self._running = True
+
+    def close(self):
+        """Close the output stream; queued audio is dropped"""
+        self.stop()
+        with self._lock:
+            if self._running:
+                self.output.close()
+                self._running = False
+
+    def add_level_listener(self, listener):
+        """listener(rms) runs on the playing segment's event loop once per block, then 0.0 when it goes quiet"""
+        self._level_listeners.append(listener)
+
+    def remove_level_listener(self, listener):
+        if listener in self._level_listeners:
+            self._level_listeners.remove(listener)
+
+    def prepare(self, audio) -> np.ndarray:
+        """(pcm, sample_rate) -> contiguous float32 mono at the engine rate"""
+        pcm, sample_rate = audio
+        pcm = np.asarray(pcm, dtype=np.float32)
+        if pcm.ndim == 2:
+            pcm = pcm.mean(axis=1) if pcm.shape[1] > 1 else pcm[:, 0]
+        if sample_rate != self.sample_rate and len(pcm):
+            length = max(1, int(round(len(pcm) * self.sample_rate / sample_rate)))
+            positions = np.linspace(0, len(pcm) - 1, length)
+            pcm = np.interp(positions, np.arange(len(pcm)), pcm).astype(np.float32)
+        return np.ascontiguousarray(pcm)
+
+    def enqueue(self, audio, loop=None, on_start=None) -> Playback:
+        """Queue a segment behind whatever is playing; returns its Playback"""
+        playback = Playback(self.prepare(audio), loop, on_start)
+        if len(playback.pcm) == 0:
+            _resolve(playback.started)
+            _resolve(playback.finished)
+            playback.done.set()
+            return playback
+        self.start()
+        with self._lock:
+            self._queue.append(playback)
+        self.segments += 1
+        return playback
+
+    async def play(self, audio, on_start=None):
+        """Play a (pcm, sample_rate) segment and wait until it has been heard"""
+        playback = self.enqueue(audio, asyncio.get_running_loop(), on_start)
+        try:
+            await playback.finished
+        except asyncio.CancelledError:
+            self._remove(playback)
+            raise
+
+    def play_blocking(self, audio):
+        """play() for synchronous callers (blocks the calling thread)"""
+        self.enqueue(audio).done.wait()
+
+    def stop(self):
+        """Drop everything queued or playing; waiting play() calls return right away"""
+        with self._lock:
+            dropped = list(self._queue)
+            self._queue.clear()
+        if dropped:
+            self.stops += 1
+        for playback in dropped:
+            self._post(playback.loop, [(playback, "end", None)], delay=0.0)
+            playback.done.set()
+
+    def _remove(self, playback: Playback):
+        with self._lock:
+            if playback in self._queue:
+                self._queue.remove(playback)
+        playback.done.set()
+
+    def _fill(self, out: np.ndarray):
+        """Audio thread: copy the next block out of the queue (never blocks on the event loop)"""
+        n = len(out)
+        filled = 0
+        events = []
+        with self._lock:
+            while filled < n and self._queue:
+                playback = self._queue[0]
+                if playback.pos == 0:
+                    events.append((playback, "start", None))
+                take = min(n - filled, len(playback.pcm) - playback.pos)
+                out[filled:filled + take] = playback.pcm[playback.pos:playback.pos + take]
+                playback.pos += take
+                filled += take
+                if playback.pos >= len(playback.pcm):
+                    self._queue.popleft()
+                    events.append((playback, "end", None))
+        out[filled:] = 0.0
+        self.blocks += 1
+
+        if filled:
+            loop = events[-1][0].loop if events else self._queue_head_loop()
+            rms = float(np.sqrt(np.mean(np.square(out[:filled]))))
+            events.append((None, "level", rms))
+            self._was_playing = True
+        elif self._was_playing:
+            loop = self._last_loop
+            events.append((None, "level", 0.0))  # Gone quiet - close the mouth
+            self._was_playing = False
+        else:
+            return
+
+        for playback, kind, _ in events:
+            if kind == "end" and playback.loop is None:
+                playback.done.set()  # Blocking caller
+        self._last_loop = loop or self._last_loop
+        self._post(loop, events, delay=self.output.latency)
+
+    def _queue_head_loop(self):
+        return self._queue[0].loop if self._queue else self._last_loop
+
+    def _post(self, loop, events, delay: float):
+        """Hand events to an event loop (from any thread)"""
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._schedule, loop, events, delay)
+        except RuntimeError:
+            pass  # Loop already closed (speak() wrappers run a loop per call)
+
+    def _schedule(self, loop, events, delay: float):
+        if delay > 0:
+            loop.call_later(delay, self._deliver, events)
+        else:
+            self._deliver(events)
+
+    def _deliver(self, events):
+        """Event loop: resolve start/end futures and notify level listeners"""
+        for playback, kind, value in events:
+            if kind == "start":
+                if playback.on_start is not None and not playback.started.done():
+                    try:
+                        playback.on_start()
+                    except Exception as e:
+                        print(f"⚠️ Segment start callback failed: {e}")
+                _resolve(playback.started)
+            elif kind == "end":
+                _resolve(playback.started)
+                _resolve(playback.finished)
+                playback.done.set()
+            elif kind == "level":
+                for listener in list(self._level_listeners):
+                    try:
+                        listener(value)
+                    except Exception as e:
+                        print(f"⚠️ Level listener failed: {e}")
+
+    def get_stats(self):
+        return {
+            "sample_rate": self.sample_rate,
+            "blocksize": self.blocksize,
+            "latency": self.output.latency if self.output is not None else None,
+            "segments": self.segments,
+            "blocks": self.blocks,
+            "stops": self.stops,
+            "queued": len(self._queue),
+        }
+
+
+# Global instance
+audio_engine = AudioEngine()
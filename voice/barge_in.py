@@ -0,0 +1,129 @@
+"""
+Barge-In
+Lets the user cut Alisa off mid-reply by talking over her
+
+While a reply plays, the microphone is watched with a stricter VAD
+(voice_input.listen_for_barge_in). As soon as the user starts talking:
+1. Playback stops (SpeechPipeline.cancel)
+2. A cancel message tells the backend to abort the generation, which
+   frees the LLM instead of producing tokens nobody will hear
+3. The user's utterance keeps recording and becomes the next turn
+
+Only one microphone stream is open at a time: before recording a turn,
+claim_mic() stops the monitor and waits for its stream to close (many
+audio backends refuse a second input stream on the same device).
+
+Audio-free: the listener and the cancel sender are passed in.
+Speakers bleeding into the mic can trigger it - use headphones,
+or set ALISA_BARGE_IN=0 to interrupt with ENTER only.
+"""
+
+import asyncio
+import os
+import threading
+
+# Listen for the user while Alisa is speaking
+BARGE_IN_ENABLED = os.getenv("ALISA_BARGE_IN", "1") != "0"
+
+
+class BargeIn:
+    """
+    Interruption state for one voice client
+
+    Usage:
+        barge_in = BargeIn(listen_for_barge_in, send_cancel)
+        barge_in.track(pipeline)            # Reply started (first token)
+        on_start -> barge_in.start_listening()
+        on_end   -> barge_in.stop_listening()
+        barge_in.untrack(pipeline)          # Reply fully spoken
+        audio = await barge_in.utterances.get()   # What the user said over her
+        audio = await barge_in.claim_mic()  # Before record_audio (monitor's capture or None)
+        barge_in.release_mic()              # After it
+    """
+
+    def __init__(self, listen, send_cancel, enabled: bool = BARGE_IN_ENABLED):
+        self.listen = listen  # listen(stop_event, on_speech_start) -> audio or None (blocking)
+        self.send_cancel = send_cancel  # async fn() - tells the backend to stop
+        self.enabled = enabled
+        self.utterances = asyncio.Queue()
+        self._pipeline = None
+        self._stop = None
+        self._listener = None
+        self._mic_claimed = False  # A turn is being recorded - don't open a second stream
+
+        # Stats
+        self.interruptions = 0
+
+    @property
+    def speaking(self):
+        """A reply is being generated or played"""
+        return self._pipeline is not None
+
+    def track(self, pipeline):
+        """A reply started - it can be interrupted from now on"""
+        self._pipeline = pipeline
+
+    def untrack(self, pipeline):
+        """The reply finished on its own"""
+        if self._pipeline is pipeline:
+            self._pipeline = None
+
+    def start_listening(self):
+        """Playback started - watch the mic for the user talking over it"""
+        if not self.enabled or self._mic_claimed or (self._listener is not None and not self._listener.done()):
+            return
+        loop = asyncio.get_running_loop()
+        self._stop = threading.Event()
+
+        def on_speech_start():
+            # Mic thread -> event loop
+            loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self.interrupt()))
+
+        self._listener = asyncio.create_task(self._listen(self._stop, on_speech_start))
+
+    def stop_listening(self):
+        """Playback ended - stop watching unless the user is already mid-sentence"""
+        if self._stop is not None:
+            self._stop.set()
+
+    async def claim_mic(self):
+        """
+        Stop the monitor and wait until its input stream is closed, so the caller
+        can open its own. If the user was already talking, the monitor finishes
+        that utterance first and it is returned (reused instead of re-recorded).
+        """
+        self._mic_claimed = True
+        self.stop_listening()
+        if self._listener is not None:
+            await self._listener  # _listen never raises
+        if not self.utterances.empty():
+            return self.utterances.get_nowait()
+        return None
+
+    def release_mic(self):
+        """The caller closed its stream - the monitor may listen again"""
+        self._mic_claimed = False
+
+    async def _listen(self, stop, on_speech_start):
+        try:
+            audio = await asyncio.to_thread(self.listen, stop, on_speech_start)
+        except Exception as e:
+            print(f"⚠️ Barge-in listener failed: {e}")
+            return
+        if audio is not None:
+            self.utterances.put_nowait(audio)
+
+    async def interrupt(self) -> bool:
+        """Cut Alisa off: stop playback and abort the reply on the backend"""
+        pipeline = self._pipeline
+        if pipeline is None:
+            return False
+        self._pipeline = None
+        self.interruptions += 1
+        print("\n✋ Interrupted")
+        await pipeline.cancel()
+        try:
+            await self.send_cancel()
+        except Exception as e:
+            print(f"⚠️ Failed to send cancel: {e}")
+        return True
@@ -0,0 +1,103 @@
+"""
+Lip-Sync
+Drives the overlay's mouth from the audio that is actually playing
+
+Per spoken segment (one sentence):
+PCM → RMS per 40 ms frame → noise floor removed, scaled to the segment's
+loud parts → mouth levels 0-9 → ONE lipsync message sent the moment the
+segment starts being heard
+
+Batching the whole sentence into one message keeps a 25 Hz envelope off
+the socket and out of Tk's event queue: the overlay gets a handful of
+small messages per reply and plays each envelope back on its own clock.
+
+    {"type": "lipsync", "fps": 25, "levels": [0, 3, 8, 9, 6, 2, 0]}
+"""
+
+import asyncio
+
+import numpy as np
+
+from audio_engine import audio_engine
+from ws_protocol import lipsync_message
+
+# Mouth updates per second (the overlay redraws at most this often)
+LIPSYNC_FPS = 25
+
+# Mouth levels are 0 (closed) .. LIPSYNC_LEVELS (wide open)
+LIPSYNC_LEVELS = 9
+
+# Frame RMS below this is breath/room noise - mouth stays closed
+LIPSYNC_NOISE_FLOOR = 0.01
+
+# Percentile of the segment's frame RMS that counts as fully open
+LIPSYNC_PEAK_PERCENTILE = 95
+
+
+def envelope(pcm, sample_rate: int, fps: int = LIPSYNC_FPS) -> list:
+    """(pcm, sample_rate) -> one mouth level (0-9) per 1/fps seconds of audio"""
+    pcm = np.asarray(pcm, dtype=np.float32)
+    if pcm.ndim == 2:
+        pcm = pcm.mean(axis=1)
+    frame = max(1, int(round(sample_rate / fps)))
+    count = int(np.ceil(len(pcm) / frame))
+    if count == 0:
+        return []
+
+    padded = np.zeros(count * frame, dtype=np.float32)
+    padded[:len(pcm)] = pcm
+    rms = np.sqrt(np.mean(np.square(padded.reshape(count, frame)), axis=1))
+
+    # Normalise per segment so quiet and loud sentences both move the mouth
+    open_rms = float(np.percentile(rms, LIPSYNC_PEAK_PERCENTILE))
+    if open_rms <= LIPSYNC_NOISE_FLOOR:
+        return [0] * count
+    scaled = (rms - LIPSYNC_NOISE_FLOOR) / (open_rms - LIPSYNC_NOISE_FLOOR)
+    return np.clip(np.round(scaled * LIPSYNC_LEVELS), 0, LIPSYNC_LEVELS).astype(int).tolist()
+
+
+class LipSync:
+    """
+    Plays segments through the audio engine and publishes their mouth envelope
+
+    Usage:
+        lipsync = LipSync(ws.send)
+        SpeechPipeline(synthesize, lipsync.play, ...)   # Instead of play_pcm_async
+    """
+
+    def __init__(self, send, fps: int = LIPSYNC_FPS, engine=audio_engine):
+        self.send = send  # async fn(str) - the client's WebSocket
+        self.fps = fps
+        self.engine = engine
+
+        # Stats
+        self.messages = 0
+        self.frames = 0
+
+    async def play(self, audio, on_start=None):
+        """
+        Play one (pcm, sample_rate) segment; its envelope goes out when it starts being heard
+        on_start() is called at that moment too (same contract as AudioEngine.play)
+        """
+        pcm, sample_rate = audio
+        levels = envelope(pcm, sample_rate, self.fps)  # Computed before queueing, not on the audio thread
+
+        def started():
+            self._publish(levels)
+            if on_start is not None:
+                on_start()
+
+        await self.engine.play(audio, on_start=started)
+
+    def _publish(self, levels: list):
+        if not levels:
+            return
+        self.messages += 1
+        self.frames += len(levels)
+        asyncio.ensure_future(self._send(lipsync_message(levels, self.fps)))
+
+    async def _send(self, message: str):
+        try:
+            await self.send(message)
+        except Exception as e:
+            print(f"⚠️ Failed to send lip-sync: {e}")
@@ -1,10 +1,14 @@
 """
 RVC Voice Conversion Inferencer
-Currently a stub - implement real RVC or use as passthrough
+Passthrough by default - set RVC_ENABLED to convert with a real model
+
+The model and feature index are loaded ONCE by a long-lived engine
+(RVCEngine) and reused for every utterance. Conversion takes and returns
+in-memory PCM arrays (see audio_buffer.py).
 """
-import subprocess
 import os
-import shutil
+import threading
+import time
 from pathlib import Path
 
 # Get absolute paths relative to this file
@@ -16,75 +20,183 @@ INDEX_PATH = RVC_DIR / "index" / "alisa.index"
 RVC_ENABLED = False  # Set to True when you have real RVC implementation
 USE_PASSTHROUGH = True  # Set to True to skip RVC and use base TTS directly
 
-def convert(input_wav, output_wav):
+# Inference device - CPU works everywhere ("cuda:0" if you have a GPU)
+RVC_DEVICE = os.getenv("ALISA_RVC_DEVICE", "cpu:0")
+
+# Conversion parameters
+RVC_PITCH = 0  # Semitones
+RVC_F0_METHOD = "rmvpe"
+RVC_INDEX_RATE = 0.75
+RVC_FILTER_RADIUS = 3
+RVC_RMS_MIX_RATE = 0.25
+RVC_PROTECT = 0.33
+
+
+class PassthroughBackend:
+    """Stand-in backend: returns the audio unchanged (tests, RVC disabled)"""
+
+    name = "passthrough"
+
+    def load(self):
+        pass
+
+    def convert(self, audio, sample_rate):
+        return audio, sample_rate
+
+
+class RVCPythonBackend:
     """
-    Convert voice using RVC model
-    
-    Current implementation: PASSTHROUGH MODE
-    - Simply copies input to output (no conversion)
-    - This allows testing the pipeline without RVC
-    
-    To enable real RVC:
-    1. Install RVC dependencies (see instructions below)
-    2. Set RVC_ENABLED = True
-    3. Set USE_PASSTHROUGH = False
+    rvc-python (pip install rvc-python), running in this process
+    The model + index stay loaded between utterances
     """
-    
-    if USE_PASSTHROUGH:
-        # Passthrough mode - just copy the file
-        print(f"⚠️ RVC passthrough mode - using base TTS directly")
-        shutil.copy(input_wav, output_wav)
-        return
-    
-    if not RVC_ENABLED:
-        print(f"⚠️ RVC disabled - using base TTS directly")
-        shutil.copy(input_wav, output_wav)
-        return
-    
-    # Real RVC implementation would go here
-    # Example using RVC-CLI or similar:
-    try:
-        # Ensure paths are absolute
-        input_path = Path(input_wav).resolve()
-        output_path = Path(output_wav).resolve()
-        
-        # Example RVC command (adjust based on your RVC installation)
-        cmd = [
-            "python", "infer.py",
-            "--model_path", str(MODEL_PATH),
-            "--index_path", str(INDEX_PATH),
-            "--input_path", str(input_path),
-            "--output_path", str(output_path),
-            "--pitch", "0",  # Adjust pitch shift
-            "--filter_radius", "3",
-            "--rms_mix_rate", "0.25",
-            "--protect", "0.33"
-        ]
-        
-        # Run RVC conversion
-        result = subprocess.run(
-            cmd, 
-            cwd=str(RVC_DIR),
-            check=True,
-            capture_output=True,
-            text=True
+
+    name = "rvc-python"
+
+    def __init__(self, model_path=MODEL_PATH, index_path=INDEX_PATH, device=RVC_DEVICE):
+        self.model_path = Path(model_path)
+        self.index_path = Path(index_path)
+        self.device = device
+        self._rvc = None
+
+    def load(self):
+        from rvc_python.infer import RVCInference
+
+        rvc = RVCInference(device=self.device)
+        index = str(self.index_path) if self.index_path.exists() else ""
+        rvc.load_model(str(self.model_path), index_path=index)
+        rvc.set_params(
+            f0up_key=RVC_PITCH,
+            f0method=RVC_F0_METHOD,
+            index_rate=RVC_INDEX_RATE,
+            filter_radius=RVC_FILTER_RADIUS,
+            rms_mix_rate=RVC_RMS_MIX_RATE,
+            protect=RVC_PROTECT
         )
-        
-        print(f"✅ RVC conversion complete")
-        
-    except FileNotFoundError:
-        print(f"⚠️ RVC infer.py not found - falling back to passthrough")
-        shutil.copy(input_wav, output_wav)
-    except subprocess.CalledProcessError as e:
-        print(f"⚠️ RVC conversion failed: {e}")
-        print(f"   stdout: {e.stdout}")
-        print(f"   stderr: {e.stderr}")
-        print(f"   Falling back to passthrough")
-        shutil.copy(input_wav, output_wav)
-    except Exception as e:
-        print(f"⚠️ RVC error: {e}")
-        print(f"   Falling back to passthrough")
-        shutil.copy(input_wav, output_wav)
+        self._rvc = rvc
+
+    def convert(self, audio, sample_rate):
+        # rvc-python only takes file paths - the WAVs are scratch space, the model stays loaded
+        import tempfile
+        import soundfile as sf
+
+        with tempfile.TemporaryDirectory(prefix="alisa_rvc_") as tmp:
+            input_wav = os.path.join(tmp, "input.wav")
+            output_wav = os.path.join(tmp, "output.wav")
+            sf.write(input_wav, audio, sample_rate)
+            self._rvc.infer_file(input_wav, output_wav)
+            converted, out_rate = sf.read(output_wav, dtype="float32", always_2d=True)
+        return converted, out_rate
+
+
+class RVCEngine:
+    """
+    Long-lived voice converter
+
+    - Loads the backend once (lazily, or up front with load())
+    - Serializes conversions (models aren't thread-safe)
+    - Falls back to passthrough if the model can't be loaded or a conversion fails
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._failed = False
+
+        # Stats
+        self.load_seconds = None
+        self.conversions = 0
+        self.convert_seconds = 0.0
+        self.fallbacks = 0
+
+    @property
+    def ready(self):
+        return self._loaded
+
+    def load(self):
+        """Load the model and index (once) - returns True when ready"""
+        with self._lock:
+            return self._load_locked()
+
+    def _load_locked(self):
+        if self._loaded or self._failed:
+            return self._loaded
+        start = time.perf_counter()
+        try:
+            self.backend.load()
+        except Exception as e:
+            self._failed = True  # Don't retry the load on every utterance
+            print(f"⚠️ RVC model failed to load ({self.backend.name}): {e}")
+            print("   Falling back to passthrough")
+            return False
+        self._loaded = True
+        self.load_seconds = time.perf_counter() - start
+        if not isinstance(self.backend, PassthroughBackend):
+            print(f"✅ RVC model loaded ({self.backend.name}) in {self.load_seconds:.1f}s")
+        return True
+
+    def convert(self, audio, sample_rate):
+        """Convert a PCM array; returns (audio, sample_rate)"""
+        with self._lock:
+            if not self._load_locked():
+                self.fallbacks += 1
+                return audio, sample_rate
+            start = time.perf_counter()
+            try:
+                result = self.backend.convert(audio, sample_rate)
+            except Exception as e:
+                print(f"⚠️ RVC conversion failed: {e}")
+                print("   Falling back to passthrough")
+                self.fallbacks += 1
+                return audio, sample_rate
+            self.conversions += 1
+            self.convert_seconds += time.perf_counter() - start
+            return result
+
+    def get_stats(self):
+        return {
+            "backend": self.backend.name,
+            "loaded": self._loaded,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "conversions": self.conversions,
+            "avg_convert_ms": round(self.convert_seconds / self.conversions * 1000, 1) if self.conversions else 0.0,
+            "fallbacks": self.fallbacks,
+        }
+
+
+def create_engine():
+    """Engine for the current configuration"""
+    if USE_PASSTHROUGH or not RVC_ENABLED:
+        return RVCEngine(PassthroughBackend())
+    return RVCEngine(RVCPythonBackend())
+
+
+# Global instance
+rvc_engine = create_engine()
+
+
+def model_id():
+    """
+    Identifies the active conversion (used in TTS cache keys)
+    Changes when RVC is toggled or the model file is replaced
+    """
+    if isinstance(rvc_engine.backend, PassthroughBackend):
+        return "none"
+    try:
+        return f"{MODEL_PATH.name}:{MODEL_PATH.stat().st_mtime_ns}"
+    except OSError:
+        return MODEL_PATH.name
+
+
+def convert_array(audio, sample_rate):
+    """
+    Convert an in-memory PCM array (float32, shape (samples, channels))
+    Returns (audio, sample_rate)
+
+    Passthrough/disabled: the array is returned as-is - no copies, no files.
+    Real RVC: runs on the already-loaded engine.
+    """
+    return rvc_engine.convert(audio, sample_rate)
 
 
 # Instructions for setting up real RVC
@@ -93,9 +205,9 @@ def convert(input_wav, output_wav):
 🎤 HOW TO SET UP REAL RVC VOICE CONVERSION 🎤
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-Option 1: Use RVC-CLI (Recommended)
-───────────────────────────────────
-1. Install RVC-CLI:
+Option 1: Use rvc-python (Recommended)
+──────────────────────────────────────
+1. Install rvc-python:
    pip install rvc-python
 
 2. Train or download your waifu voice model
@@ -105,6 +217,7 @@ Option 1: Use RVC-CLI (Recommended)
 3. Update this file:
    RVC_ENABLED = True
    USE_PASSTHROUGH = False
+   (ALISA_RVC_DEVICE=cuda:0 to use a GPU - CPU is the default)
 
 4. Test:
    python voice/voice_output_hinglish.py
@@ -119,8 +232,8 @@ Option 2: Use Mangio-RVC / RVC-WebUI
    cd Retrieval-based-Voice-Conversion-WebUI
    pip install -r requirements.txt
 
-3. Copy infer.py to voice/rvc/ or modify the convert() function
-   to point to your RVC installation
+3. Write a backend class with load() and convert(audio, sample_rate)
+   (see RVCPythonBackend) and return it from create_engine()
 
 4. Update paths in this file to match your RVC setup
 
@@ -132,7 +245,7 @@ Option 3: Use so-vits-svc (Alternative)
 
 2. Follow their training guide or use pretrained models
 
-3. Modify convert() function to call so-vits-svc inference
+3. Wrap its inference in a backend class (see RVCPythonBackend)
 
 
 Quick Test (Without RVC):
@@ -0,0 +1,278 @@
+"""
+Streaming Speech Pipeline
+Speaks a reply sentence by sentence while it is still being generated
+
+Pipeline:
+Tokens → SentenceSegmenter → synth worker (TTS per sentence)
+→ bounded audio queue → playback worker
+
+Sentence N+1 is synthesized while sentence N plays, so speech starts
+after the first sentence is synthesized instead of after the whole
+reply has been generated, synthesized and saved. With a queueing player
+(audio_engine.play, gapless=True) sentence N+1 is also handed to the
+output before sentence N ends, so there is no pause between them.
+
+Usage:
+    pipeline = SpeechPipeline(synthesize, play, on_start=..., on_end=...)
+    pipeline.feed(token_text)   # As tokens arrive
+    await pipeline.finish()     # After [END] - returns when playback is done
+"""
+
+import asyncio
+import re
+import time
+
+from audio_buffer import stream_tts_bytes, decode_audio
+from tts_cache import tts_cache
+
+# Don't cut sentences shorter than this ("Hmm..." gets merged with the next one)
+SEGMENT_MIN_CHARS = 12
+
+# Force a cut (at a comma or space) when no sentence end shows up
+SEGMENT_MAX_CHARS = 220
+
+# Synthesized segments allowed to wait for playback (bounds work done ahead)
+AUDIO_QUEUE_SIZE = 3
+
+# Sentence end: punctuation (plus closing quotes/brackets) followed by whitespace, or a newline
+_SENTENCE_END = re.compile(r'[.!?…]+["\')\]]*\s+|\n+')
+_SOFT_BREAK = re.compile(r'[,;:]\s+|\s+')
+
+
+class SentenceSegmenter:
+    """Cuts streamed text into speakable sentences"""
+
+    def __init__(self, min_chars: int = SEGMENT_MIN_CHARS, max_chars: int = SEGMENT_MAX_CHARS):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+
+    def feed(self, text: str):
+        """Add text; returns the sentences it completed"""
+        self._buffer += text
+        sentences = []
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                break
+            sentence = self._buffer[:cut].strip()
+            self._buffer = self._buffer[cut:]
+            if sentence:
+                sentences.append(sentence)
+        return sentences
+
+    def _find_cut(self):
+        for match in _SENTENCE_END.finditer(self._buffer):
+            if len(self._buffer[:match.start()].strip()) >= self.min_chars:
+                return match.end()
+        if len(self._buffer) > self.max_chars:
+            breaks = [m.end() for m in _SOFT_BREAK.finditer(self._buffer, 0, self.max_chars)]
+            return breaks[-1] if breaks else self.max_chars
+        return None
+
+    def flush(self) -> str:
+        """Whatever is left at the end of the reply"""
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return rest
+
+
+async def _call(callback, *args):
+    """Run a sync or async callback"""
+    if callback is None:
+        return None
+    result = callback(*args)
+    if asyncio.iscoroutine(result):
+        result = await result
+    return result
+
+
+class SpeechPipeline:
+    """
+    Sentence-level TTS with synthesis running one step ahead of playback
+
+    Args:
+        synthesize: async fn(text) -> audio (file path, buffer, ...)
+        play: async fn(audio) - returns when playback has finished
+        on_start: called when the first segment starts playing (e.g. send [SPEECH_START])
+        on_end: called after the last segment played (e.g. send [SPEECH_END])
+        discard: fn(audio) called once a segment is played or dropped (e.g. release a buffer)
+        stop: fn() that cuts off the segment being played (e.g. stop_playback) - used by cancel()
+        gapless: play(audio, on_start=fn) queues behind the audio already playing
+                 (AudioEngine.play), so the next segment is handed over while the current
+                 one is still playing; on_start follows the player's start event, i.e.
+                 fires when the first segment is actually heard
+        clean: fn(text) -> text applied to each sentence before synthesis
+        max_queued: synthesized segments that may wait for playback
+    """
+
+    def __init__(self, synthesize, play, on_start=None, on_end=None, discard=None,
+                 clean=None, max_queued: int = AUDIO_QUEUE_SIZE, stop=None, gapless: bool = False):
+        self.synthesize = synthesize
+        self.play = play
+        self.on_start = on_start
+        self.on_end = on_end
+        self.discard = discard
+        self.stop = stop
+        self.gapless = gapless
+        self.clean = clean or (lambda text: " ".join(text.split()))
+        self.segmenter = SentenceSegmenter()
+        self._texts = asyncio.Queue()
+        self._audio = asyncio.Queue(maxsize=max_queued)
+        self._synth_task = None
+        self._play_task = None
+        self._finished = False
+        self._cancelled = False
+        self._started = False
+        self._start_task = None  # on_start, run from the player's start event (gapless)
+
+        # Stats
+        self.segments = 0
+        self.created_at = time.perf_counter()
+        self.first_audio_at = None
+
+    @property
+    def time_to_first_audio(self):
+        """Seconds from pipeline creation to the first segment starting to play"""
+        if self.first_audio_at is None:
+            return None
+        return self.first_audio_at - self.created_at
+
+    def _start(self):
+        if self._synth_task is None:
+            self._synth_task = asyncio.create_task(self._synth_loop())
+            self._play_task = asyncio.create_task(self._play_loop())
+
+    def _queue(self, sentence: str):
+        text = self.clean(sentence)
+        if text:
+            self._start()
+            self.segments += 1
+            self._texts.put_nowait(text)
+
+    def feed(self, text: str):
+        """Add streamed reply text; complete sentences start synthesizing right away"""
+        if self._finished:
+            return
+        for sentence in self.segmenter.feed(text):
+            self._queue(sentence)
+
+    async def finish(self):
+        """End of reply: speak the remainder and wait until playback is done"""
+        if self._finished:
+            return
+        self._finished = True
+        rest = self.segmenter.flush()
+        if rest:
+            self._queue(rest)
+        if self._play_task is None:
+            return  # Nothing to say
+        self._texts.put_nowait(None)
+        try:
+            await self._play_task
+        except asyncio.CancelledError:
+            if not self._cancelled:
+                raise
+            # cancel() cut the reply short (barge-in) - nothing left to wait for
+
+    async def cancel(self):
+        """Stop speaking now and drop everything queued"""
+        self._finished = True
+        self._cancelled = True
+        for task in (self._synth_task, self._play_task):
+            if task is not None:
+                task.cancel()
+        if self._play_task is not None:
+            await _call(self.stop)  # Playback runs in a thread - cancelling the task doesn't end it
+        for task in (self._synth_task, self._play_task):
+            if task is not None:
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        while not self._audio.empty():
+            audio = self._audio.get_nowait()
+            if audio is not None:
+                await _call(self.discard, audio)
+
+    async def _synth_loop(self):
+        while True:
+            text = await self._texts.get()
+            if text is None:
+                await self._audio.put(None)
+                return
+            try:
+                audio = await self.synthesize(text)
+            except Exception as e:
+                print(f"⚠️ TTS failed for segment: {e}")
+                continue
+            if audio is not None:
+                await self._audio.put(audio)  # Waits while the queue is full
+
+    async def _wait_played(self, playing, audio):
+        try:
+            await playing
+        except Exception as e:
+            print(f"⚠️ Playback failed: {e}")
+        finally:
+            await _call(self.discard, audio)
+
+    async def _notify_start(self):
+        try:
+            await _call(self.on_start)
+        except Exception as e:
+            print(f"⚠️ Speech start callback failed: {e}")
+
+    def _heard(self):
+        """Player's start event for a segment - the first one starts the reply"""
+        if self._started:
+            return
+        self._started = True
+        self.first_audio_at = time.perf_counter()
+        self._start_task = asyncio.ensure_future(self._notify_start())
+
+    async def _play_loop(self):
+        playing = []  # (task, audio) handed to the player, oldest first
+        try:
+            while True:
+                audio = await self._audio.get()
+                if audio is None:
+                    break
+                if self.gapless:
+                    play = self.play(audio, on_start=self._heard)
+                else:
+                    if not self._started:
+                        self._started = True
+                        self.first_audio_at = time.perf_counter()
+                        await self._notify_start()
+                    play = self.play(audio)
+                playing.append((asyncio.ensure_future(play), audio))
+                # Gapless: keep the next segment queued behind the one playing
+                while len(playing) > (1 if self.gapless else 0):
+                    await self._wait_played(*playing.pop(0))
+            while playing:
+                await self._wait_played(*playing.pop(0))
+        finally:
+            for task, audio in playing:
+                task.cancel()
+                await _call(self.discard, audio)
+            if self._start_task is not None:
+                await self._start_task  # [SPEECH_START] always goes out before [SPEECH_END]
+            if self._started:
+                await _call(self.on_end)
+
+
+# ---------------------------------------------------------------------------
+# Default synthesizer (edge-tts, in memory), shared by the voice clients
+# ---------------------------------------------------------------------------
+
+async def edge_synthesize(text: str, voice: str, rate: str, pitch: str):
+    """Synthesize a segment with edge-tts; returns (pcm, sample_rate) - play with audio_engine.play"""
+    import edge_tts
+
+    async def synthesize(text):
+        mp3_bytes = await stream_tts_bytes(edge_tts.Communicate(text, voice, rate=rate, pitch=pitch))
+        return await asyncio.to_thread(decode_audio, mp3_bytes, format="mp3")
+
+    # Short phrases come from the TTS cache (tts_cache.py)
+    return await tts_cache.get_or_create(text, voice, rate, pitch, synthesize)
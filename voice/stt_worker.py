@@ -0,0 +1,273 @@
+"""
+Resident Speech-to-Text Worker
+Faster Whisper runs in its own process, loaded once and warmed up at startup
+
+Pipeline:
+Chat client → request queue (NumPy audio) → STT process (model already loaded)
+→ partial transcripts (one per decoded segment, except the last) → final transcript
+
+Why a process:
+- Model load + first decode happen while the user is still getting ready,
+  not on the first voice turn
+- Decoding never competes with the chat loop (or playback) for the GIL
+
+Configuration (environment variables):
+- ALISA_STT_MODEL: tiny / base / small (default) / medium
+- ALISA_STT_BEAM_SIZE: 1 = greedy (fastest on CPU)
+- ALISA_STT_THREADS: CPU threads used by the decoder
+- ALISA_STT_DEVICE / ALISA_STT_COMPUTE_TYPE: cpu + int8, or cuda + float16
+"""
+
+import asyncio
+import importlib.util
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+FASTER_WHISPER_AVAILABLE = importlib.util.find_spec("faster_whisper") is not None
+
+# Whisper model size
+STT_MODEL_SIZE = os.getenv("ALISA_STT_MODEL", "small")
+
+# Beam size (1 = greedy decoding - much faster on CPU, slightly less accurate)
+STT_BEAM_SIZE = int(os.getenv("ALISA_STT_BEAM_SIZE", "1"))
+
+# Decoder threads
+STT_THREADS = int(os.getenv("ALISA_STT_THREADS", str(min(4, os.cpu_count() or 1))))
+
+# Device and precision
+STT_DEVICE = os.getenv("ALISA_STT_DEVICE", "cpu")
+STT_COMPUTE_TYPE = os.getenv("ALISA_STT_COMPUTE_TYPE", "int8")
+
+# Language hint (None = auto-detect, needed for Hinglish)
+STT_LANGUAGE = os.getenv("ALISA_STT_LANGUAGE") or None
+
+# Seconds of silence decoded at startup to warm the model up
+STT_WARMUP_SECONDS = 1.0
+
+# Longest we wait for one transcription
+STT_TIMEOUT = 60
+
+SAMPLE_RATE = 16000
+
+
+def load_whisper(config):
+    """Default model factory (runs inside the worker process)"""
+    from faster_whisper import WhisperModel
+
+    return WhisperModel(
+        config["model_size"],
+        device=config["device"],
+        compute_type=config["compute_type"],
+        cpu_threads=config["cpu_threads"]
+    )
+
+
+def _decode(model, audio, config, on_segment):
+    """
+    Transcribe one utterance; calls on_segment(text_so_far) per segment
+    Each partial is sent once the NEXT segment is decoded, so the last one
+    never goes out as a partial - it would only repeat the final transcript
+    """
+    segments, _ = model.transcribe(
+        audio,
+        beam_size=config["beam_size"],
+        language=config["language"],
+        vad_filter=False  # Audio is already endpointed (vad.py)
+    )
+    parts = []
+    for segment in segments:  # Lazy - each segment is decoded as we iterate
+        text_so_far = " ".join(p for p in parts if p)
+        if text_so_far:
+            on_segment(text_so_far)
+        parts.append(segment.text.strip())
+    return " ".join(p for p in parts if p)
+
+
+def _worker_main(config, model_factory, requests, results):
+    """STT process: load once, warm up, then serve requests until None"""
+    try:
+        start = time.perf_counter()
+        model = model_factory(config)
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _decode(model, np.zeros(int(SAMPLE_RATE * STT_WARMUP_SECONDS), dtype=np.float32), config, lambda text: None)
+        warmup_seconds = time.perf_counter() - start
+    except Exception as e:
+        results.put(("failed", None, f"{type(e).__name__}: {e}"))
+        return
+    results.put(("ready", None, (load_seconds, warmup_seconds)))
+
+    while True:
+        request = requests.get()
+        if request is None:
+            return
+        request_id, audio = request
+        try:
+            text = _decode(model, audio, config, lambda partial: results.put(("partial", request_id, partial)))
+            results.put(("final", request_id, text))
+        except Exception as e:
+            results.put(("error", request_id, f"{type(e).__name__}: {e}"))
+
+
+class STTWorker:
+    """
+    Client side of the STT process
+
+    Usage:
+        stt_worker.start()                 # At startup - loads + warms in the background
+        text = await stt_worker.transcribe_async(audio, on_partial=print)
+    """
+
+    def __init__(self, model_size: str = STT_MODEL_SIZE, beam_size: int = STT_BEAM_SIZE,
+                 cpu_threads: int = STT_THREADS, device: str = STT_DEVICE,
+                 compute_type: str = STT_COMPUTE_TYPE, language: str = STT_LANGUAGE,
+                 model_factory=load_whisper):
+        self.config = {
+            "model_size": model_size,
+            "beam_size": beam_size,
+            "cpu_threads": cpu_threads,
+            "device": device,
+            "compute_type": compute_type,
+            "language": language,
+        }
+        self.model_factory = model_factory  # Must be picklable (module-level function)
+        self._ctx = mp.get_context("spawn")  # Same behaviour on Windows and Linux
+        self._process = None
+        self._requests = None
+        self._results = None
+        self._lock = threading.Lock()  # One transcription at a time
+        self._next_id = 0
+        self._ready = False
+        self._error = None
+
+        # Stats
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.transcriptions = 0
+
+    @property
+    def alive(self):
+        return self._process is not None and self._process.is_alive()
+
+    def start(self):
+        """Spawn the worker (returns immediately; the model loads in the background)"""
+        if self.alive:
+            return
+        self._ready = False
+        self._error = None
+        self._requests = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._process = self._ctx.Process(
+            target=_worker_main,
+            args=(self.config, self.model_factory, self._requests, self._results),
+            name="alisa-stt",
+            daemon=True
+        )
+        self._process.start()
+        print(f"🧠 STT worker starting (Whisper {self.config['model_size']}, "
+              f"beam {self.config['beam_size']}, {self.config['cpu_threads']} threads)")
+
+    def _next_message(self, timeout):
+        """Next message from the worker; raises if it died"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return self._results.get(timeout=min(0.5, max(0.01, deadline - time.monotonic())))
+            except queue.Empty:
+                if not self.alive:
+                    raise RuntimeError("STT worker exited")
+                if time.monotonic() >= deadline:
+                    raise TimeoutError("STT worker did not answer")
+
+    def _handle_status(self, kind, payload):
+        if kind == "ready":
+            self._ready = True
+            self.load_seconds, self.warmup_seconds = payload
+            print(f"✅ Whisper ready (load {self.load_seconds:.1f}s, warm-up {self.warmup_seconds:.1f}s)")
+        elif kind == "failed":
+            self._error = payload
+            print(f"❌ STT worker failed to load: {payload}")
+
+    def wait_ready(self, timeout: float = STT_TIMEOUT) -> bool:
+        """Block until the model is loaded and warmed up"""
+        with self._lock:
+            return self._wait_ready_locked(timeout)
+
+    def _wait_ready_locked(self, timeout):
+        if not self.alive and self._error is None:
+            self.start()  # Not started yet, or crashed - a failed load is not retried
+        deadline = time.monotonic() + timeout
+        while not self._ready and self._error is None:
+            kind, _, payload = self._next_message(deadline - time.monotonic())
+            self._handle_status(kind, payload)
+        return self._ready
+
+    def transcribe(self, audio, on_partial=None, timeout: float = STT_TIMEOUT) -> str:
+        """Transcribe float32 16 kHz audio (blocking); on_partial(text) per decoded segment but the last"""
+        with self._lock:
+            if not self._wait_ready_locked(timeout):
+                raise RuntimeError(f"STT worker unavailable: {self._error}")
+
+            self._next_id += 1
+            request_id = self._next_id
+            self._requests.put((request_id, np.asarray(audio, dtype=np.float32)))
+
+            deadline = time.monotonic() + timeout
+            while True:
+                kind, message_id, payload = self._next_message(deadline - time.monotonic())
+                if message_id != request_id:
+                    continue  # Left over from a request that timed out
+                if kind == "partial":
+                    if on_partial is not None:
+                        on_partial(payload)
+                elif kind == "final":
+                    self.transcriptions += 1
+                    return payload
+                elif kind == "error":
+                    raise RuntimeError(payload)
+
+    async def transcribe_async(self, audio, on_partial=None, timeout: float = STT_TIMEOUT) -> str:
+        """transcribe() without blocking the event loop; on_partial runs on the loop (may be async)"""
+        loop = asyncio.get_running_loop()
+
+        def dispatch(text):
+            result = on_partial(text)
+            if asyncio.iscoroutine(result):
+                asyncio.ensure_future(result)
+
+        forward = None
+        if on_partial is not None:
+            forward = lambda text: loop.call_soon_threadsafe(dispatch, text)
+        return await asyncio.to_thread(self.transcribe, audio, forward, timeout)
+
+    def stop(self):
+        """Shut the worker down"""
+        if self._process is None:
+            return
+        if self.alive:
+            self._requests.put(None)
+            self._process.join(timeout=5)
+            if self._process.is_alive():
+                self._process.terminate()
+        self._process = None
+        self._ready = False
+
+    def get_stats(self):
+        return {
+            **self.config,
+            "alive": self.alive,
+            "ready": self._ready,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "transcriptions": self.transcriptions,
+        }
+
+
+# Global instance
+stt_worker = STTWorker()
@@ -1,19 +1,13 @@
 import asyncio
 import websockets
-import os
 import re
-import tempfile
-import threading
-from concurrent.futures import ThreadPoolExecutor
-import edge_tts
-import pygame
 
 # Try different voice output methods in order of preference
 speak_func = None
 
 try:
     # Try Hinglish-aware voice first (best for Hinglish support!)
-    from voice_output_hinglish import speak_async as speak_hinglish_async
+    from voice_output_hinglish import synthesize_async as synthesize_hinglish, warm_up as warm_up_hinglish
     speak_func = "hinglish_async"  # Special marker
     print("🇮🇳 Using Hinglish-aware voice with auto-detection!")
 except Exception as e:
@@ -41,7 +35,12 @@ except Exception as e:
                 speak_func = speak
                 print("❌ No voice output available")
 
-WS_URL = "ws://127.0.0.1:8000/ws/chat"
+from ws_protocol import ws_url, user_message, decode, SPEECH_START, SPEECH_END
+from speech_pipeline import SpeechPipeline, edge_synthesize
+from lipsync import LipSync
+from tts_cache import tts_cache
+
+WS_URL = ws_url("text_chat")
 
 # Import voice configuration for custom TTS
 try:
@@ -52,142 +51,52 @@ except ImportError:
     SPEECH_RATE = "+10%"
     PITCH_SHIFT = "+5Hz"
 
-async def speak_with_timing(text, ws):
+# The backend strips the emotion tag while streaming; this only catches stray markup
+_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+def clean_text_for_speech(text: str) -> str:
+    """Remove leftover tags and collapse whitespace before speaking"""
+    return ' '.join(_TAG_PATTERN.sub('', text).split())
+
+async def synthesize_segment(text):
+    """One sentence of speech as (pcm, sample_rate) - cached for short phrases"""
+    if speak_func == "hinglish_async":
+        return await synthesize_hinglish(text)  # Hinglish detection + RVC per sentence
+    return await edge_synthesize(text, VOICE, SPEECH_RATE, PITCH_SHIFT)
+
+async def warm_up_speech():
+    """Load the RVC model once, then pre-warm the TTS cache, so early replies play instantly"""
+    if speak_func == "hinglish_async":
+        await warm_up_hinglish()
+    await tts_cache.prewarm(synthesize_segment)
+
+def report_warm_up(task):
+    """Done-callback for the warm-up task - nothing awaits it, so failures are logged here"""
+    if not task.cancelled() and task.exception() is not None:
+        print(f"⚠️ Speech warm-up failed: {task.exception()}")
+
+def create_speech_pipeline(ws):
     """
-    Custom TTS function with precise timing control.
-    Now with Hinglish auto-detection support!
-    Sends [SPEECH_START] only when audio playback actually begins.
+    Sentence-level TTS for one reply (see speech_pipeline.py)
+    Sends [SPEECH_START] when the first sentence starts playing
+    and [SPEECH_END] after the last one; each sentence's mouth envelope
+    (lipsync.py) goes out as it starts playing, so the avatar's mouth follows the audio
     """
-    # If using Hinglish-aware voice, use it directly
-    if speak_func == "hinglish_async":
-        try:
-            from voice_output_hinglish import speak_async as speak_hinglish_async
-            
-            # Send speech start
-            try:
-                await ws.send("[SPEECH_START]")
-                print("✅ [SPEECH_START] sent")
-            except Exception as e:
-                print(f"⚠️ Failed to send [SPEECH_START]: {e}")
-            
-            # Use Hinglish-aware TTS (handles language detection automatically)
-            await speak_hinglish_async(text)
-            
-            # Send speech end  
-            try:
-                await ws.send("[SPEECH_END]")
-                print("✅ [SPEECH_END] sent")
-            except Exception as e:
-                print(f"⚠️ Failed to send [SPEECH_END]: {e}")
-            
-            return
-            
-        except Exception as e:
-            print(f"⚠️ Hinglish TTS error, falling back: {e}")
-            # Fall through to default TTS
-    
-    # Original Edge TTS implementation (fallback)
-    output_file = None
-    try:
-        # Step 1: Create unique temporary file
-        fd, output_file = tempfile.mkstemp(suffix='.mp3', prefix='alisa_voice_')
-        os.close(fd)  # Close the file descriptor immediately
-        
-        # Step 2: Generate TTS audio (this takes time)
-        print(f"🎤 Generating TTS audio...")
-        communicate = edge_tts.Communicate(text, VOICE, rate=SPEECH_RATE, pitch=PITCH_SHIFT)
-        await communicate.save(output_file)
-        print(f"✅ TTS audio generated")
-        
-        # Step 3: Prepare audio playback
-        if pygame.mixer.get_init():
-            pygame.mixer.music.stop()
-            pygame.mixer.music.unload()
-        
-        if not pygame.mixer.get_init():
-            pygame.mixer.init()
-        
-        pygame.mixer.music.load(output_file)
-        
-        # Step 4: Start playback FIRST
-        pygame.mixer.music.play()
-        print(f"🎵 Audio playback started")
-        
-        # Step 5: NOW send [SPEECH_START] - mouth syncs with actual audio
+    async def notify(signal, name):
         try:
-            await ws.send("[SPEECH_START]")
-            print("✅ [SPEECH_START] sent (audio is now playing)")
+            await ws.send(signal)
+            print(f"✅ [{name}] sent")
         except Exception as e:
-            print(f"⚠️ Failed to send [SPEECH_START]: {e}")
-        
-        # Step 6: Wait for playback to finish
-        def wait_for_playback():
-            while pygame.mixer.music.get_busy():
-                pygame.time.Clock().tick(10)
-        
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, wait_for_playback)
-        
-        print(f"🎵 Audio playback finished")
-        pygame.mixer.music.unload()
-        
-        # Step 7: Clean up the temporary file
-        if output_file and os.path.exists(output_file):
-            try:
-                await asyncio.sleep(0.1)  # Small delay to ensure file is released
-                os.unlink(output_file)
-            except Exception as cleanup_error:
-                print(f"⚠️ Warning: Could not delete temp file: {cleanup_error}")
-        
-    except Exception as e:
-        print(f"⚠️ TTS error: {e}")
-        import traceback
-        traceback.print_exc()
-        
-        # Try to clean up on error
-        if output_file and os.path.exists(output_file):
-            try:
-                os.unlink(output_file)
-            except:
-                pass
-
+            print(f"⚠️ Failed to send [{name}]: {e}")
 
-def clean_text_for_speech(text: str) -> str:
-    """Remove emotion tags and other non-speech elements from text"""
-    # Remove <emotion=...> tags
-    text = re.sub(r'<emotion=[^>]+>', '', text)
-    # Remove any remaining < > tags
-    text = re.sub(r'<[^>]+>', '', text)
-    
-    # Official allowed emotions from prompt.py:
-    # happy, calm, teasing, serious, sad, neutral
-    emotions = ['happy', 'calm', 'teasing', 'serious', 'sad', 'neutral']
-    
-    # Only remove emotion word if:
-    # 1. It's at the very start
-    # 2. It's followed by actual content (not just the emotion word alone)
-    for emotion in emotions:
-        # Check if text starts with emotion word
-        if text.lower().strip() == emotion.lower():
-            # If the ENTIRE text is just the emotion word, keep it
-            # (This is a broken LLM response but at least it's visible)
-            continue
-        
-        # Match emotion at start as a complete word with whitespace/newline after
-        pattern = r'^\s*\b' + re.escape(emotion) + r'\b[\s\n]+'
-        match = re.match(pattern, text, flags=re.IGNORECASE)
-        if match:
-            # Only remove if there's content after the emotion word
-            remaining = text[match.end():]
-            if remaining.strip():
-                text = remaining
-                break
-    
-    # Clean up extra whitespace and newlines
-    text = ' '.join(text.split())
-    text = text.strip()
-    
-    return text
+    return SpeechPipeline(
+        synthesize_segment,
+        LipSync(ws.send).play,  # Plays via the audio engine + sends the mouth envelope
+        on_start=lambda: notify(SPEECH_START, "SPEECH_START"),
+        on_end=lambda: notify(SPEECH_END, "SPEECH_END"),
+        clean=clean_text_for_speech,
+        gapless=True  # Next sentence queued in the audio engine before this one ends
+    )
 
 async def text_chat():
     """
@@ -206,11 +115,15 @@ async def text_chat():
     print("=" * 60)
     print()
 
+    # Load the voice model and Alisa's usual short lines while connecting
+    warm_up_task = asyncio.create_task(warm_up_speech())
+    warm_up_task.add_done_callback(report_warm_up)
+
     try:
         async with websockets.connect(WS_URL) as ws:
             while True:
-                # Get user input
-                user_text = input("You: ").strip()
+                # Get user input (in a thread, so the warm-up keeps running during the prompt)
+                user_text = (await asyncio.to_thread(input, "You: ")).strip()
 
                 # Check for exit commands
                 if user_text.lower() in ['exit', 'quit', 'bye']:
@@ -222,59 +135,47 @@ async def text_chat():
                     continue
 
                 # Send message to backend
-                await ws.send(user_text)
+                await ws.send(user_message(user_text))
 
-                # Collect the full response
-                full_reply = ""
+                # Speak sentence by sentence while the reply streams in
+                pipeline = create_speech_pipeline(ws)
                 emotion = "neutral"
 
                 print("Alisa: ", end="", flush=True)
 
                 while True:
-                    msg = await ws.recv()
+                    msg = decode(await ws.recv())
+                    msg_type = msg["type"]
 
                     # Handle emotion tag
-                    if msg.startswith("[EMOTION]"):
-                        emotion = msg.replace("[EMOTION]", "").strip()
+                    if msg_type == "emotion":
+                        emotion = msg.get("emotion", "neutral")
                         continue
 
                     # Handle mode change confirmation
-                    if msg == "[MODE CHANGED]":
-                        full_reply = "✓ Mode changed successfully!"
+                    if msg_type == "mode_changed":
+                        pipeline.feed("✓ Mode changed successfully!")
                         continue
 
                     # Handle end of response
-                    if msg == "[END]":
+                    if msg_type == "end":
                         break
 
                     # Stream the response token by token
-                    full_reply += msg
-                    print(msg, end="", flush=True)
+                    if msg_type == "token":
+                        pipeline.feed(msg["text"])
+                        print(msg["text"], end="", flush=True)
 
                 print()  # New line after response
                 
                 # Always show emotion for debugging
                 print(f"💭 Emotion: {emotion}")
                 
-                # Clean the text before speaking (remove emotion tags)
-                clean_reply = clean_text_for_speech(full_reply)
-                
-                # Speak with precise timing control
-                if clean_reply.strip():  # Only speak if there's actual text
-                    print(f"🎤 Speaking: {clean_reply[:50]}...")
-                    
-                    # Use custom TTS function that sends [SPEECH_START] at perfect timing
-                    await speak_with_timing(clean_reply, ws)
-                    
-                    print("✅ Speech completed")
-                    
-                    # Notify overlay to stop talking animation
-                    try:
-                        print("📤 Sending [SPEECH_END] to overlay...")
-                        await ws.send("[SPEECH_END]")
-                        print("✅ [SPEECH_END] sent successfully")
-                    except Exception as e:
-                        print(f"⚠️ Failed to send [SPEECH_END]: {e}")
+                # Speak whatever is left and wait for playback to finish
+                await pipeline.finish()
+                if pipeline.segments:
+                    print(f"✅ Speech completed ({pipeline.segments} segments, "
+                          f"first audio after {pipeline.time_to_first_audio or 0:.2f}s)")
                 
                 print()  # Extra line for readability
 
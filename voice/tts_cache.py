@@ -0,0 +1,206 @@
+"""
+TTS Audio Cache
+Alisa repeats a lot of short lines ("Hmph.", "Mhm.", "Alright, no problem.")
+- synthesize them once, replay them from memory
+
+Key Features:
+- Content-addressed: key = hash of (text, voice, rate, pitch, RVC model)
+- Two tiers: in-memory LRU (bytes-bounded) + on-disk LRU (bytes-bounded)
+- Only short phrases are cached (long sentences rarely repeat)
+- Pre-warming of the known fallback phrases at startup
+- Hit/miss stats
+
+Audio is stored as (pcm, sample_rate) - see audio_buffer.py.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from audio_buffer import to_int16
+
+# Where cached phrases live on disk
+TTS_CACHE_DIR = Path(os.getenv("ALISA_TTS_CACHE_DIR", Path(__file__).parent / "tts_cache"))
+
+# Decoded PCM kept in RAM (float32 - a 1 s phrase at 24 kHz is ~94 KB)
+TTS_CACHE_MEMORY_BYTES = 32 * 1024 * 1024
+
+# Cached phrases on disk (int16)
+TTS_CACHE_DISK_BYTES = 64 * 1024 * 1024
+
+# Longer texts are synthesized every time (unique sentences would just churn the cache)
+TTS_CACHE_MAX_CHARS = 80
+
+# Lines Alisa is known to repeat (backend fallbacks and canned replies)
+PREWARM_PHRASES = [
+    "Hmph.",
+    "Mhm.",
+    "Heh.",
+    "Um...",
+    "I see.",
+    "Alright, no problem.",
+    "✓ Mode changed successfully!",
+]
+
+
+def cache_key(text: str, voice: str, rate: str, pitch: str, model: str = "none") -> str:
+    """Content address of a synthesized phrase"""
+    raw = "\x1f".join((" ".join(text.split()), voice, rate, pitch, model))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Memory + disk LRU of synthesized phrases
+
+    Usage:
+        audio = await tts_cache.get_or_create(text, voice, rate, pitch, synthesize)
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, memory_bytes: int = TTS_CACHE_MEMORY_BYTES,
+                 disk_bytes: int = TTS_CACHE_DISK_BYTES, max_chars: int = TTS_CACHE_MAX_CHARS):
+        self.directory = Path(directory)
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.max_chars = max_chars
+        self._memory = OrderedDict()  # key -> (pcm, sample_rate), oldest first
+        self._memory_size = 0
+        self._disk_lock = threading.Lock()
+        self._disk_size = None  # Scanned lazily
+
+        # Stats
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def cacheable(self, text: str) -> bool:
+        return 0 < len(text.strip()) <= self.max_chars
+
+    # --- Memory tier -----------------------------------------------------
+
+    def _remember(self, key: str, audio):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = audio
+        self._memory_size += audio[0].nbytes
+        while self._memory_size > self.memory_bytes and len(self._memory) > 1:
+            _, (pcm, _) = self._memory.popitem(last=False)
+            self._memory_size -= pcm.nbytes
+
+    # --- Disk tier (runs in worker threads) ------------------------------
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.npz"
+
+    def _scan_disk(self):
+        if self._disk_size is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for tmp in self.directory.glob("*.npz.tmp"):  # Left behind by a crash mid-write
+                tmp.unlink(missing_ok=True)
+            self._disk_size = sum(p.stat().st_size for p in self.directory.glob("*.npz"))
+
+    def _load(self, key: str):
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                pcm = data["pcm"].astype(np.float32) / 32767
+                sample_rate = int(data["sample_rate"])
+            os.utime(path)  # Mark as recently used
+            return pcm, sample_rate
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _store(self, key: str, audio):
+        pcm, sample_rate = audio
+        with self._disk_lock:
+            self._scan_disk()
+            path = self._path(key)
+            tmp = path.with_name(path.name + ".tmp")  # Outside the *.npz glob (size scan, eviction)
+            with open(tmp, "wb") as f:  # File object: savez would append .npz to a name
+                np.savez(f, pcm=to_int16(pcm), sample_rate=sample_rate)
+            old_size = path.stat().st_size if path.exists() else 0
+            os.replace(tmp, path)  # Readers never see half-written files
+            self._disk_size += path.stat().st_size - old_size
+            self._evict_disk()
+
+    def _evict_disk(self):
+        if self._disk_size <= self.disk_bytes:
+            return
+        files = sorted(self.directory.glob("*.npz"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            if self._disk_size <= self.disk_bytes:
+                break
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except OSError:
+                continue
+            self._disk_size -= size
+            self.evictions += 1
+
+    # --- Public API ------------------------------------------------------
+
+    async def get_or_create(self, text: str, voice: str, rate: str, pitch: str, synthesize, model: str = "none"):
+        """Cached audio for a phrase, synthesizing (and caching) it on a miss"""
+        if not self.cacheable(text):
+            return await synthesize(text)
+
+        key = cache_key(text, voice, rate, pitch, model)
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return audio
+
+        audio = await asyncio.to_thread(self._load, key)
+        if audio is not None:
+            self.disk_hits += 1
+            self._remember(key, audio)
+            return audio
+
+        self.misses += 1
+        audio = await synthesize(text)
+        if audio is not None:
+            self._remember(key, audio)
+            try:
+                await asyncio.to_thread(self._store, key, audio)
+            except OSError as e:
+                print(f"⚠️ Could not write TTS cache: {e}")
+        return audio
+
+    async def prewarm(self, synthesize, phrases=None):
+        """Load (or synthesize) the usual phrases so they play instantly; synthesize(text) must use this cache"""
+        phrases = PREWARM_PHRASES if phrases is None else phrases
+        warmed = 0
+        for phrase in phrases:
+            try:
+                if await synthesize(phrase) is not None:
+                    warmed += 1
+            except Exception as e:
+                print(f"⚠️ Could not pre-warm '{phrase}': {e}")
+        print(f"🔥 TTS cache warmed: {warmed}/{len(phrases)} phrases")
+        return warmed
+
+    def get_stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_items": len(self._memory),
+            "memory_bytes": self._memory_size,
+            "disk_bytes": self._disk_size or 0,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+# Global instance
+tts_cache = TTSCache()
@@ -0,0 +1,239 @@
+"""
+Voice Activity Detection & Endpointing
+Decides when the user starts and stops talking, so a turn is recorded
+for exactly as long as they speak
+
+Pipeline:
+Mic callback → AudioRingBuffer → 30 ms frames → VAD (speech / silence)
+→ Endpointer (pre-roll + utterance + trailing silence) → NumPy audio
+
+No audio libraries needed here - voice_input.py wires this to the microphone.
+"""
+
+import threading
+from collections import deque
+
+import numpy as np
+
+# Optional: WebRTC VAD (pip install webrtcvad) - falls back to the energy VAD
+try:
+    import webrtcvad
+    WEBRTCVAD_AVAILABLE = True
+except ImportError:
+    WEBRTCVAD_AVAILABLE = False
+
+# Whisper expects 16 kHz mono
+SAMPLE_RATE = 16000
+
+# Frame size for VAD decisions (WebRTC VAD accepts 10/20/30 ms)
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+# Audio kept from just before speech was detected (catches the first syllable)
+PRE_ROLL_MS = 300
+
+# Consecutive speech frames needed to start an utterance (ignores clicks)
+START_FRAMES = 3
+
+# Silence that ends an utterance
+END_SILENCE_MS = 700
+
+# Utterances shorter than this are dropped as noise
+MIN_SPEECH_MS = 250
+
+# Hard cap on one utterance
+MAX_UTTERANCE_SECONDS = 30
+
+# Energy VAD: speech must be this many times louder than the noise floor...
+ENERGY_RATIO = 3.0
+# ...and above this absolute RMS (float32 scale) - quiet rooms have a tiny floor
+ENERGY_MIN_RMS = 0.01
+
+# WebRTC VAD aggressiveness (0 = least, 3 = most aggressive filtering of non-speech)
+WEBRTC_MODE = 2
+
+# Mic audio buffered between the callback and the reader
+RING_SECONDS = 10
+
+# Barge-in (talking over Alisa) is stricter: her own voice can leak into the mic
+BARGE_IN_START_MS = 240
+BARGE_IN_ENERGY_RATIO = 6.0
+BARGE_IN_WEBRTC_MODE = 3
+
+
+class AudioRingBuffer:
+    """
+    Fixed-size float32 ring buffer between the audio callback and a reader
+
+    The callback never blocks or allocates: when the reader falls behind,
+    the oldest audio is overwritten and counted in `overruns`.
+    """
+
+    def __init__(self, capacity: int = SAMPLE_RATE * RING_SECONDS):
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self.capacity = capacity
+        self._write = 0  # Total samples written
+        self._read = 0  # Total samples read
+        self._cond = threading.Condition()
+        self._closed = False
+        self.overruns = 0
+
+    def __len__(self):
+        return self._write - self._read
+
+    def write(self, samples):
+        """Append samples (called from the audio thread)"""
+        samples = np.asarray(samples, dtype=np.float32).ravel()
+        n = len(samples)
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+            self._write += n - self.capacity
+            n = self.capacity
+        with self._cond:
+            start = self._write % self.capacity
+            first = min(n, self.capacity - start)
+            self._data[start:start + first] = samples[:first]
+            self._data[:n - first] = samples[first:]
+            self._write += n
+            if self._write - self._read > self.capacity:
+                self.overruns += 1
+                self._read = self._write - self.capacity
+            self._cond.notify()
+
+    def read(self, n: int, timeout: float = None):
+        """Next n samples; None on timeout or when closed with less than n left"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self) >= n or self._closed, timeout):
+                return None
+            if len(self) < n:
+                return None
+            start = self._read % self.capacity
+            idx = (start + np.arange(n)) % self.capacity if start + n > self.capacity else slice(start, start + n)
+            out = self._data[idx].copy()
+            self._read += n
+            return out
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class EnergyVAD:
+    """RMS-based VAD with an adaptive noise floor"""
+
+    def __init__(self, ratio: float = ENERGY_RATIO, min_rms: float = ENERGY_MIN_RMS):
+        self.ratio = ratio
+        self.min_rms = min_rms
+        self.noise_floor = None
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        rms = float(np.sqrt(np.mean(np.square(frame, dtype=np.float32))))
+        if self.noise_floor is None:
+            self.noise_floor = rms
+        speech = rms > max(self.noise_floor * self.ratio, self.min_rms)
+        if not speech:
+            # Track background noise (slowly, so speech tails don't raise it)
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+        return speech
+
+
+class WebRTCVAD:
+    """webrtcvad wrapper taking float32 frames"""
+
+    def __init__(self, mode: int = WEBRTC_MODE, sample_rate: int = SAMPLE_RATE):
+        self._vad = webrtcvad.Vad(mode)
+        self.sample_rate = sample_rate
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        pcm = (np.clip(frame, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+        return self._vad.is_speech(pcm, self.sample_rate)
+
+
+def create_vad():
+    """Best available VAD"""
+    if WEBRTCVAD_AVAILABLE:
+        return WebRTCVAD()
+    return EnergyVAD()
+
+
+def create_barge_in_vad():
+    """Best available VAD, tuned to ignore playback bleeding into the mic"""
+    if WEBRTCVAD_AVAILABLE:
+        return WebRTCVAD(mode=BARGE_IN_WEBRTC_MODE)
+    return EnergyVAD(ratio=BARGE_IN_ENERGY_RATIO)
+
+
+class Endpointer:
+    """
+    Turns a stream of frames into one utterance
+
+    feed(frame) returns the finished utterance (float32 array) once the
+    user stops talking, otherwise None.
+    """
+
+    def __init__(self, vad=None, frame_samples: int = FRAME_SAMPLES, sample_rate: int = SAMPLE_RATE,
+                 pre_roll_ms: int = PRE_ROLL_MS, end_silence_ms: int = END_SILENCE_MS,
+                 min_speech_ms: int = MIN_SPEECH_MS, max_seconds: float = MAX_UTTERANCE_SECONDS,
+                 start_ms: int = None):
+        self.vad = vad or create_vad()
+        frame_ms = 1000 * frame_samples / sample_rate
+        self.start_frames = START_FRAMES if start_ms is None else max(1, int(start_ms / frame_ms))
+        self.pre_roll = deque(maxlen=max(1, int(pre_roll_ms / frame_ms)))
+        self.end_frames = max(1, int(end_silence_ms / frame_ms))
+        self.min_frames = max(1, int(min_speech_ms / frame_ms))
+        self.max_frames = int(max_seconds * 1000 / frame_ms)
+        self.reset()
+
+    def reset(self):
+        self.pre_roll.clear()
+        self.frames = []
+        self.in_speech = False
+        self.speech_run = 0  # Consecutive speech frames before the start
+        self.speech_frames = 0
+        self.silence_run = 0
+
+    @property
+    def started(self):
+        return self.in_speech
+
+    def feed(self, frame: np.ndarray):
+        speech = self.vad.is_speech(frame)
+
+        if not self.in_speech:
+            self.pre_roll.append(frame)
+            self.speech_run = self.speech_run + 1 if speech else 0
+            if self.speech_run >= self.start_frames:
+                self.in_speech = True
+                self.frames = list(self.pre_roll)
+                self.speech_frames = self.speech_run
+                self.silence_run = 0
+            return None
+
+        self.frames.append(frame)
+        if speech:
+            self.speech_frames += 1
+            self.silence_run = 0
+        else:
+            self.silence_run += 1
+
+        if self.silence_run >= self.end_frames or len(self.frames) >= self.max_frames:
+            return self._finish()
+        return None
+
+    def _finish(self):
+        long_enough = self.speech_frames >= self.min_frames
+        audio = np.concatenate(self.frames) if long_enough else None
+        self.reset()
+        return audio
+
+    def flush(self):
+        """End of input: whatever was being said (or None)"""
+        if not self.in_speech:
+            return None
+        return self._finish()
+
+
+def create_barge_in_endpointer():
+    """Endpointer used while Alisa is speaking (needs longer, louder speech to start)"""
+    return Endpointer(create_barge_in_vad(), start_ms=BARGE_IN_START_MS)
@@ -6,20 +6,17 @@ Alisa Voice Chat - Full-featured voice interface
 - Emotion display
 - Overlay integration
 - Mode switching
+- Barge-in (talk over Alisa to interrupt her)
 - Clean console output
 """
 
 import asyncio
 import websockets
-import os
 import re
-from pathlib import Path
-import edge_tts
-import pygame
 
 # Voice input modules
 try:
-    from voice_input import record_audio, speech_to_text
+    from voice_input import record_audio, speech_to_text_async, start_stt, listen_for_barge_in
     VOICE_INPUT_AVAILABLE = True
 except ImportError:
     VOICE_INPUT_AVAILABLE = False
@@ -27,14 +24,21 @@ except ImportError:
 
 # Voice output - USE HINGLISH-AWARE VERSION FOR BEST RESULTS
 try:
-    from voice_output_hinglish import speak_async as speak_hinglish
+    from voice_output_hinglish import synthesize_async as synthesize_hinglish, warm_up as warm_up_hinglish
     USE_HINGLISH_TTS = True
     print("🇮🇳 Hinglish-aware TTS enabled!")
 except ImportError:
     USE_HINGLISH_TTS = False
     print("⚠️ Hinglish TTS not available, using basic Edge TTS")
 
-WS_URL = "ws://127.0.0.1:8000/ws/chat"
+from ws_protocol import ws_url, user_message, partial_transcript, decode, SPEECH_START, SPEECH_END, CANCEL
+from speech_pipeline import SpeechPipeline, edge_synthesize
+from audio_buffer import stop_playback
+from barge_in import BargeIn
+from lipsync import LipSync
+from tts_cache import tts_cache
+
+WS_URL = ws_url("voice_chat")
 
 # Import voice configuration
 try:
@@ -45,8 +49,6 @@ except ImportError:
     SPEECH_RATE = "+10%"
     PITCH_SHIFT = "+5Hz"
 
-OUTPUT_FILE = "alisa_voice.mp3"
-
 # Emotion emoji mapping
 EMOTION_EMOJI = {
     'happy': '😊',
@@ -62,92 +64,90 @@ EMOTION_EMOJI = {
 }
 
 
-async def speak_with_timing(text, ws):
+async def synthesize_segment(text):
+    """One sentence of speech as (pcm, sample_rate) - cached for short phrases"""
+    if USE_HINGLISH_TTS:
+        return await synthesize_hinglish(text)  # Hinglish detection + RVC per sentence
+    return await edge_synthesize(text, VOICE, SPEECH_RATE, PITCH_SHIFT)
+
+async def warm_up_speech():
+    """Load the RVC model once, then pre-warm the TTS cache, so early replies play instantly"""
+    if USE_HINGLISH_TTS:
+        await warm_up_hinglish()
+    await tts_cache.prewarm(synthesize_segment)
+
+def report_warm_up(task):
+    """Done-callback for the warm-up task - nothing awaits it, so failures are logged here"""
+    if not task.cancelled() and task.exception() is not None:
+        print(f"⚠️ Speech warm-up failed: {task.exception()}")
+
+def create_speech_pipeline(ws, barge_in):
     """
-    Generate TTS and play audio with perfect timing for overlay sync.
-    Now with Hinglish support via RVC!
+    Sentence-level TTS for one reply (see speech_pipeline.py)
+    Notifies the overlay when the first sentence starts and the last one ends
+    (plus each sentence's mouth envelope, see lipsync.py),
+    and listens for the user talking over Alisa while she speaks
     """
-    try:
-        # If Hinglish-aware TTS is available, use it
-        if USE_HINGLISH_TTS:
-            # Notify overlay
-            try:
-                await ws.send("[SPEECH_START]")
-            except Exception as e:
-                print(f"⚠️ Failed to send [SPEECH_START]: {e}")
-            
-            # Use Hinglish-aware TTS with RVC
-            await speak_hinglish(text)
-            
-            # Notify overlay end
-            try:
-                await ws.send("[SPEECH_END]")
-            except Exception as e:
-                print(f"⚠️ Failed to send [SPEECH_END]: {e}")
-            
-            return
-        
-        # Fallback to basic Edge TTS
-        communicate = edge_tts.Communicate(text, VOICE, rate=SPEECH_RATE, pitch=PITCH_SHIFT)
-        await communicate.save(OUTPUT_FILE)
-        
-        # Prepare and play audio
-        if pygame.mixer.get_init():
-            pygame.mixer.music.stop()
-            pygame.mixer.music.unload()
-        
-        if not pygame.mixer.get_init():
-            pygame.mixer.init()
-        
-        pygame.mixer.music.load(OUTPUT_FILE)
-        pygame.mixer.music.play()
-        
-        # Notify overlay
+    async def notify(signal):
         try:
-            await ws.send("[SPEECH_START]")
+            await ws.send(signal)
         except Exception as e:
-            print(f"⚠️ Failed to send [SPEECH_START]: {e}")
-        
-        # Wait for playback
-        def wait_for_playback():
-            while pygame.mixer.music.get_busy():
-                pygame.time.Clock().tick(10)
-        
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, wait_for_playback)
-        
-        pygame.mixer.music.unload()
-        
-    except Exception as e:
-        print(f"❌ TTS error: {e}")
+            print(f"⚠️ Failed to send {signal}: {e}")
+
+    async def on_start():
+        await notify(SPEECH_START)
+        barge_in.start_listening()
+
+    async def on_end():
+        barge_in.stop_listening()
+        await notify(SPEECH_END)
+
+    pipeline = SpeechPipeline(
+        synthesize_segment,
+        LipSync(ws.send).play,  # Plays via the audio engine + sends the mouth envelope
+        on_start=on_start,
+        on_end=on_end,
+        clean=clean_segment,
+        stop=stop_playback,
+        gapless=True  # Next sentence queued in the audio engine before this one ends
+    )
+    barge_in.track(pipeline)
+    return pipeline
+
+
+# The backend strips the emotion tag while streaming; this catches stray markup
+# and the extra emotion words the model sometimes says out loud
+_TAG_PATTERN = re.compile(r'<[^>]+>')
+_EMOTION_WORDS = [
+    'happy', 'calm', 'teasing', 'shy', 'serious', 'sad', 'neutral',
+    'excited', 'playful', 'confident', 'gentle', 'cheerful',
+    'blushing', 'surprised', 'nervous', 'embarrassed', 'flustered',
+    'angry', 'annoyed', 'worried', 'confused'
+]
+_LEADING_EMOTION_PATTERN = re.compile(
+    r'^\s*\b(?:' + '|'.join(_EMOTION_WORDS) + r')\b[\s\n]+', re.IGNORECASE
+)
+_STANDALONE_EMOTION_PATTERN = re.compile(
+    r'^\s*(?:' + '|'.join(_EMOTION_WORDS) + r')\s*$', re.IGNORECASE | re.MULTILINE
+)
+
+
+def clean_segment(text: str) -> str:
+    """Per-sentence cleanup for the speech pipeline (tags and lone emotion words only)"""
+    text = _TAG_PATTERN.sub('', text)
+    text = _STANDALONE_EMOTION_PATTERN.sub('', text)
+    return ' '.join(text.split()).strip()
 
 
 def clean_text_for_speech(text: str) -> str:
-    """Remove emotion tags and emotion words from text"""
-    text = re.sub(r'<emotion=[^>]+>', '', text)
-    text = re.sub(r'<[^>]+>', '', text)
-    
-    emotions = [
-        'happy', 'calm', 'teasing', 'shy', 'serious', 'sad', 'neutral',
-        'excited', 'playful', 'confident', 'gentle', 'cheerful',
-        'blushing', 'surprised', 'nervous', 'embarrassed', 'flustered',
-        'angry', 'annoyed', 'worried', 'confused'
-    ]
-    
-    # Remove emotion word at start
-    for emotion in emotions:
-        pattern = r'^\s*\b' + re.escape(emotion) + r'\b[\s\n]+'
-        text = re.sub(pattern, '', text, flags=re.IGNORECASE)
-    
-    # Remove standalone emotion words
-    for emotion in emotions:
-        pattern = r'^\s*' + re.escape(emotion) + r'\s*$'
-        text = re.sub(pattern, '', text, flags=re.IGNORECASE | re.MULTILINE)
-    
+    """Remove leftover tags and emotion words from text"""
+    text = _TAG_PATTERN.sub('', text)
+    text = _LEADING_EMOTION_PATTERN.sub('', text)
+    text = _STANDALONE_EMOTION_PATTERN.sub('', text)
     return ' '.join(text.split()).strip()
 
 
-async def listen_for_messages(ws):
+async def listen_for_messages(ws, barge_in):
     """
     Background task that listens for server messages.
     Handles both user-initiated responses and proactive vision reactions.
@@ -156,42 +156,41 @@ async def listen_for_messages(ws):
         try:
             full_reply = ""
             emotion = "neutral"
+            pipeline = None
             
-            # Collect the complete message first (don't print tokens as they arrive)
+            # Collect the message for display; speech starts with the first full sentence
             while True:
-                msg = await ws.recv()
+                msg = decode(await ws.recv())
                 
-                if msg.startswith("[EMOTION]"):
-                    emotion = msg.replace("[EMOTION]", "").strip()
-                elif msg == "[END]":
+                if msg["type"] == "emotion":
+                    emotion = msg.get("emotion", "neutral")
+                elif msg["type"] == "end":
                     break
-                elif not (msg.startswith("[") and msg.endswith("]")):
+                elif msg["type"] == "token":
                     # Collect text tokens
-                    full_reply += msg
+                    full_reply += msg["text"]
+                    if pipeline is None:
+                        pipeline = create_speech_pipeline(ws, barge_in)
+                    pipeline.feed(msg["text"])
             
             # Now print the complete message all at once
             if full_reply.strip():
                 # Clear current line
                 print("\r" + " " * 80 + "\r", end="", flush=True)
                 
-                # Clean the text for display and speech
+                # Clean the text for display
                 clean_display = clean_text_for_speech(full_reply)
                 
                 # Show emotion emoji
                 emoji = EMOTION_EMOJI.get(emotion.lower(), '🙂')
                 print(f"{clean_display} {emoji}")
                 
-                # Speak the cleaned text
-                if clean_display.strip():
-                    await speak_with_timing(clean_display, ws)
-                    
-                    # Notify overlay to stop
-                    try:
-                        await ws.send("[SPEECH_END]")
-                    except Exception as e:
-                        print(f"⚠️ Failed to send [SPEECH_END]: {e}")
-                
-                print()  # Blank line for readability
+            # Speak the rest and wait for playback (sends [SPEECH_END] to the overlay)
+            if pipeline is not None:
+                await pipeline.finish()  # Returns at once if the user barged in
+                barge_in.untrack(pipeline)
+                if full_reply.strip():
+                    print()  # Blank line for readability
             
         except websockets.exceptions.ConnectionClosed:
             print("\n❌ Connection closed")
@@ -201,24 +200,51 @@ async def listen_for_messages(ws):
             break
 
 
-async def voice_input_loop(ws):
+async def voice_input_loop(ws, barge_in):
     """
-    Main loop for voice input - press Enter to record and speak.
+    Main loop for voice input - press Enter to record and speak,
+    or just talk over Alisa while she's replying.
     """
+    loop = asyncio.get_event_loop()
+    enter = None
     while True:
         try:
-            # Wait for user to press Enter
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, lambda: input("🎤 Press ENTER to speak... "))
-            
-            print("🎤 Listening...")
-            
-            # Record and transcribe (blocking operations in executor)
-            def record_and_transcribe():
-                record_audio()
-                return speech_to_text()
-            
-            user_text = await loop.run_in_executor(None, record_and_transcribe)
+            # Wait for user to press Enter (the prompt stays up across barge-ins)
+            if enter is None or enter.done():
+                enter = loop.run_in_executor(None, lambda: input("🎤 Press ENTER to speak... "))
+            barged = asyncio.ensure_future(barge_in.utterances.get())
+            done, _ = await asyncio.wait({enter, barged}, return_when=asyncio.FIRST_COMPLETED)
+
+            if barged in done:
+                # User talked over Alisa - already recorded
+                audio = barged.result()
+            else:
+                barged.cancel()
+                enter.result()  # Raises EOFError when input ends
+
+                # ENTER while Alisa is talking cuts her off too
+                await barge_in.interrupt()
+
+                # The barge-in monitor closes its mic stream before we open ours
+                # (if you were already talking, its recording is used instead)
+                audio = await barge_in.claim_mic()
+                try:
+                    if audio is None:
+                        # Record until you stop talking (blocking - runs in executor)
+                        audio = await loop.run_in_executor(None, record_audio)
+                finally:
+                    barge_in.release_mic()
+
+            # Transcribe in the resident Whisper process. Every decoded segment but the
+            # last is shown and sent ahead so the backend can start evaluating the prompt
+            partial_sends = []
+
+            def on_partial(text):
+                print(f"   … {text}")
+                partial_sends.append(asyncio.ensure_future(ws.send(partial_transcript(text))))
+
+            user_text = await speech_to_text_async(audio, on_partial=on_partial)
+            await asyncio.gather(*partial_sends, return_exceptions=True)  # Partials before the final
             
             if not user_text or not user_text.strip():
                 print("⚠️ No speech detected. Try again.\n")
@@ -233,7 +259,7 @@ async def voice_input_loop(ws):
                 break
             
             # Send to backend
-            await ws.send(user_text)
+            await ws.send(user_message(user_text))
             # Response handled by background listener
             
         except EOFError:
@@ -257,6 +283,7 @@ async def voice_chat():
     print("👁️ Alisa can see you and react proactively!")
     print("Commands:")
     print("  - Press ENTER, then speak your message")
+    print("  - Talk over Alisa (or press ENTER) to interrupt her")
     print("  - Say 'exit' or 'quit' to end the chat")
     print("=" * 60)
     print()
@@ -266,16 +293,26 @@ async def voice_chat():
         print("Install requirements: pip install faster-whisper sounddevice")
         return
     
+    # Whisper loads + warms up in its own process while we connect
+    start_stt()
+
+    # Load the voice model and Alisa's usual short lines while connecting
+    warm_up_task = asyncio.create_task(warm_up_speech())
+    warm_up_task.add_done_callback(report_warm_up)
+
     try:
         async with websockets.connect(WS_URL) as ws:
+            # Talking over a reply stops playback and tells the backend to stop generating
+            barge_in = BargeIn(listen_for_barge_in, lambda: ws.send(CANCEL))
+
             # Start background message listener
-            listener_task = asyncio.create_task(listen_for_messages(ws))
+            listener_task = asyncio.create_task(listen_for_messages(ws, barge_in))
             
             # Wait for listener to start
             await asyncio.sleep(0.1)
             
             # Run voice input loop
-            await voice_input_loop(ws)
+            await voice_input_loop(ws, barge_in)
             
             # Cancel listener when done
             listener_task.cancel()
@@ -291,8 +328,5 @@ async def voice_chat():
 
 
 if __name__ == "__main__":
-    # Initialize pygame mixer
-    pygame.mixer.init()
-    
     # Run the voice chat
     asyncio.run(voice_chat())
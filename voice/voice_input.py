@@ -1,31 +1,133 @@
+"""
+Voice Input - streaming microphone capture + Faster Whisper STT
+
+Recording stops when the user stops talking (VAD endpointing, see vad.py),
+and the captured NumPy audio goes straight to the resident Whisper worker
+(stt_worker.py) - no WAV files, no model load on the first turn.
+listen_for_barge_in() does the same while Alisa is speaking (barge_in.py).
+"""
+
+import time
+
 import sounddevice as sd
-import numpy as np
-import scipy.io.wavfile as wav
-from faster_whisper import WhisperModel
 
-SAMPLE_RATE = 16000
-DURATION = 5  # seconds
+from vad import SAMPLE_RATE, FRAME_SAMPLES, AudioRingBuffer, Endpointer, create_barge_in_endpointer
+from stt_worker import stt_worker, FASTER_WHISPER_AVAILABLE
+
+if not FASTER_WHISPER_AVAILABLE:
+    raise ImportError("faster-whisper is not installed")
+
+# Give up if nobody starts talking within this many seconds
+LISTEN_TIMEOUT = 8
+
+# Last recorded utterance (for speech_to_text() without arguments)
+_last_audio = None
+
+
+def _capture(endpointer, timeout=None, stop=None, on_speech_start=None):
+    """
+    Feed microphone frames to the endpointer until it returns an utterance
+    Gives up after timeout seconds, or once stop is set, if nobody started talking
+    """
+    ring = AudioRingBuffer()
+
+    def callback(indata, frames, time_info, status):
+        ring.write(indata[:, 0])  # Audio thread: copy into the ring and return
+
+    audio = None
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with sd.InputStream(samplerate=SAMPLE_RATE, channels=1, dtype="float32",
+                        blocksize=FRAME_SAMPLES, callback=callback):
+        while True:
+            frame = ring.read(FRAME_SAMPLES, timeout=0.1)
+            if frame is not None:
+                was_started = endpointer.started
+                audio = endpointer.feed(frame)
+                if audio is not None:
+                    break
+                if endpointer.started and not was_started and on_speech_start is not None:
+                    on_speech_start()
+            if endpointer.started:
+                continue
+            if stop is not None and stop.is_set():
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                break
+
+    if ring.overruns:
+        print(f"⚠️ Audio overruns: {ring.overruns}")
+    return audio
+
 
-model = WhisperModel("small", device="cpu", compute_type="int8")
+def record_audio(timeout: float = LISTEN_TIMEOUT):
+    """
+    Record one utterance from the microphone
+    Starts capturing immediately and returns as soon as the user stops talking
+    Returns float32 mono audio at 16 kHz, or None if nothing was said
+    """
+    global _last_audio
 
-def record_audio():
     print("🎙️ Listening...")
-    audio = sd.rec(
-        int(DURATION * SAMPLE_RATE),
-        samplerate=SAMPLE_RATE,
-        channels=1,
-        dtype="int16"
-    )
-    sd.wait()
-    wav.write("input.wav", SAMPLE_RATE, audio)
-    print("🎤 Done recording")
-
-def speech_to_text():
-    segments, _ = model.transcribe("input.wav")
-    text = " ".join(seg.text for seg in segments)
+    audio = _capture(Endpointer(), timeout)
+
+    if audio is None:
+        print("🎤 No speech detected")
+    else:
+        print(f"🎤 Done recording ({len(audio) / SAMPLE_RATE:.1f}s)")
+    _last_audio = audio
+    return audio
+
+
+def listen_for_barge_in(stop, on_speech_start):
+    """
+    Listen while Alisa is speaking (blocking - run it in a thread)
+    Calls on_speech_start() as soon as the user talks over her, then keeps
+    recording until they finish. Returns that utterance, or None if stop
+    (a threading.Event) was set before anyone spoke.
+    """
+    global _last_audio
+
+    audio = _capture(create_barge_in_endpointer(), stop=stop, on_speech_start=on_speech_start)
+    if audio is not None:
+        print(f"🎤 Done recording ({len(audio) / SAMPLE_RATE:.1f}s)")
+        _last_audio = audio
+    return audio
+
+
+def start_stt():
+    """Load + warm up Whisper in the background (call at startup)"""
+    stt_worker.start()
+
+
+def speech_to_text(audio=None, on_partial=None):
+    """
+    Transcribe a float32 16 kHz array (defaults to the last recording)
+    on_partial(text) is called as each segment is decoded
+    """
+    if audio is None:
+        audio = _last_audio
+    if audio is None or len(audio) == 0:
+        return ""
+    try:
+        text = stt_worker.transcribe(audio, on_partial=on_partial)
+    except (RuntimeError, TimeoutError) as e:
+        print(f"❌ Transcription failed: {e}")
+        return ""
     print("📝 You said:", text)
     return text
 
+
+async def speech_to_text_async(audio, on_partial=None):
+    """speech_to_text for the chat loop; on_partial runs on the event loop"""
+    if audio is None or len(audio) == 0:
+        return ""
+    try:
+        return await stt_worker.transcribe_async(audio, on_partial=on_partial)
+    except (RuntimeError, TimeoutError) as e:
+        print(f"❌ Transcription failed: {e}")
+        return ""
+
+
 if __name__ == "__main__":
-    record_audio()
-    speech_to_text()
+    start_stt()
+    speech_to_text(record_audio())
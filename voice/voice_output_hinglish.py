@@ -5,17 +5,15 @@ Automatically detects Hinglish and uses appropriate base voice before RVC conver
 Pipeline:
 Text (Hinglish) → Auto-detect language → Base TTS (Indian/English voice) 
 → RVC Voice Conversion → Final Waifu Voice (Hinglish)
+
+Everything stays in memory (see audio_buffer.py): edge-tts chunks are
+decoded once to a NumPy array, converted and played without temp files.
 """
 
 import asyncio
 import edge_tts
-import soundfile as sf
-import os
 import sys
-import tempfile
-import time
 from pathlib import Path
-from pydub import AudioSegment
 
 # Try to import overlay controller
 sys.path.append(str(Path(__file__).parent.parent / "overlay"))
@@ -30,11 +28,9 @@ except ImportError:
         pass
 
 # Import RVC converter
-from rvc.inferencer import convert
-import pygame
-
-# Initialize pygame mixer for audio playback
-pygame.mixer.init()
+from rvc.inferencer import convert_array, model_id, rvc_engine
+from audio_buffer import stream_tts_bytes, decode_audio, play_pcm_async
+from tts_cache import tts_cache
 
 # Import voice configuration with Hinglish support
 from voice_config import (
@@ -43,11 +39,11 @@ from voice_config import (
     is_hinglish
 )
 
-async def tts_base(text, output_file):
+async def tts_base(text):
     """
     Generate base TTS with automatic Hinglish detection
     Uses appropriate voice based on text content
-    Converts MP3 to WAV for compatibility
+    Returns (pcm, sample_rate) - streamed into memory and decoded once
     """
     # Auto-detect voice and parameters
     voice = get_voice_for_text(text)
@@ -58,26 +54,40 @@ async def tts_base(text, output_file):
     
     print(f"🎤 TTS: {lang_label} | Voice: {voice}")
     
-    # Generate TTS to temporary MP3 file
-    temp_mp3 = output_file + ".mp3"
     communicate = edge_tts.Communicate(
         text, 
         voice,
         rate=params["rate"],
         pitch=params["pitch"]
     )
-    await communicate.save(temp_mp3)
-    
-    # Convert MP3 to WAV for pygame/RVC compatibility
-    try:
-        audio = AudioSegment.from_mp3(temp_mp3)
-        audio.export(output_file, format="wav")
-        os.unlink(temp_mp3)  # Clean up temp MP3
-    except Exception as e:
-        print(f"⚠️ MP3 to WAV conversion failed: {e}")
-        # Fallback: just rename (might not work with pygame)
-        if os.path.exists(temp_mp3):
-            os.rename(temp_mp3, output_file)
+    mp3_bytes = await stream_tts_bytes(communicate)
+    return await asyncio.to_thread(decode_audio, mp3_bytes, format="mp3")
+
+async def synthesize_async(text):
+    """
+    Base TTS + RVC conversion for one piece of text, without playing it
+    Returns (pcm, sample_rate)
+    Used by the sentence-level speech pipeline (speech_pipeline.py)
+    Short phrases come from the TTS cache (tts_cache.py)
+    """
+    params = get_tts_params_for_text(text)
+    return await tts_cache.get_or_create(
+        text,
+        get_voice_for_text(text),
+        params["rate"],
+        params["pitch"],
+        _synthesize_uncached,
+        model=model_id()
+    )
+
+async def _synthesize_uncached(text):
+    pcm, sample_rate = await tts_base(text)
+    # CPU-bound with a real RVC model - keep the event loop free
+    return await asyncio.to_thread(convert_array, pcm, sample_rate)
+
+async def warm_up():
+    """Load the RVC model now instead of on the first reply"""
+    await asyncio.to_thread(rvc_engine.load)
 
 async def speak_async(text):
     """
@@ -89,16 +99,7 @@ async def speak_async(text):
     3. Convert using RVC to waifu voice
     4. Play converted audio
     """
-    base_wav = None
-    rvc_wav = None
-    
     try:
-        # Create unique temporary files
-        fd_base, base_wav = tempfile.mkstemp(suffix='.wav', prefix='alisa_base_')
-        os.close(fd_base)
-        fd_rvc, rvc_wav = tempfile.mkstemp(suffix='.wav', prefix='alisa_rvc_')
-        os.close(fd_rvc)
-        
         # Safe overlay notification
         if OVERLAY_AVAILABLE:
             try:
@@ -106,33 +107,12 @@ async def speak_async(text):
             except:
                 pass
 
-        # Step 1: Generate base TTS with auto language detection
-        await tts_base(text, base_wav)
-        
-        # Step 2: Convert using RVC to get waifu voice
-        print(f"🎀 Converting to waifu voice...")
-        convert(base_wav, rvc_wav)
-
-        # Step 3: Play converted audio
-        if not pygame.mixer.get_init():
-            pygame.mixer.init()
+        # Steps 1-3: TTS with auto language detection + RVC conversion
+        audio = await synthesize_async(text)
 
-        # Stop previous audio
-        if pygame.mixer.get_init():
-            pygame.mixer.music.stop()
-            pygame.mixer.music.unload()
-
-        pygame.mixer.music.load(rvc_wav)
-        pygame.mixer.music.play()
-        
-        print(f"🎵 Playing waifu voice...")
-        
-        # Wait for playback to finish
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-
-        # Unload to release file
-        pygame.mixer.music.unload()
+        # Step 4: Play converted audio
+        print("🎵 Playing waifu voice...")
+        await play_pcm_async(audio)
 
         # Safe overlay notification
         if OVERLAY_AVAILABLE:
@@ -141,23 +121,13 @@ async def speak_async(text):
             except:
                 pass
         
-        print(f"✅ Playback complete")
+        print("✅ Playback complete")
                 
     except Exception as e:
         print(f"❌ Hinglish RVC Voice error: {e}")
         import traceback
         traceback.print_exc()
         print(f"[TEXT] {text}")
-    
-    finally:
-        # Clean up temporary files
-        for temp_file in [base_wav, rvc_wav]:
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    time.sleep(0.1)  # Small delay for file release
-                    os.unlink(temp_file)
-                except Exception as cleanup_error:
-                    print(f"⚠️ Could not delete temp file: {cleanup_error}")
 
 def speak(text):
     """
@@ -1,7 +1,5 @@
 import asyncio
 import edge_tts
-import soundfile as sf
-import os
 import sys
 from pathlib import Path
 
@@ -17,11 +15,9 @@ except ImportError:
     def on_speech_end():
         pass
 
-from rvc.inferencer import convert
-import pygame
-
-# Initialize pygame mixer for audio playback
-pygame.mixer.init()
+from rvc.inferencer import convert_array
+from audio_buffer import stream_tts_bytes, decode_audio
+from audio_engine import audio_engine
 
 # Import voice configuration
 try:
@@ -33,10 +29,8 @@ except ImportError:
     SPEECH_RATE = "+10%"
     PITCH_SHIFT = "+5Hz"
 
-BASE_WAV = "base.wav"
-RVC_WAV = "alisa.wav"
-
 async def tts_base(text):
+    """Edge TTS as (pcm, sample_rate) - the MP3 stream is decoded in memory"""
     # Add prosody for cuter voice
     communicate = edge_tts.Communicate(
         text, 
@@ -44,7 +38,8 @@ async def tts_base(text):
         rate=SPEECH_RATE,
         pitch=PITCH_SHIFT
     )
-    await communicate.save(BASE_WAV)
+    mp3_bytes = await stream_tts_bytes(communicate)
+    return await asyncio.to_thread(decode_audio, mp3_bytes, format="mp3")
 
 async def speak_async(text):
     """Async version of speak with RVC conversion"""
@@ -57,22 +52,13 @@ async def speak_async(text):
                 pass  # Ignore overlay errors
 
         # Generate TTS audio
-        await tts_base(text)
+        pcm, sample_rate = await tts_base(text)
         
-        # Convert using RVC (this runs synchronously)
-        convert(BASE_WAV, RVC_WAV)
+        # Convert using RVC (off the event loop; passthrough returns the array as-is)
+        audio = await asyncio.to_thread(convert_array, pcm, sample_rate)
 
-        # Initialize pygame mixer if not already
-        if not pygame.mixer.get_init():
-            pygame.mixer.init()
-
-        # Use pygame to play audio (works better on Windows than simpleaudio)
-        pygame.mixer.music.load(RVC_WAV)
-        pygame.mixer.music.play()
-        
-        # Wait for playback to finish
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
+        # Play through the shared output stream (returns once it has been heard)
+        await audio_engine.play(audio)
 
         # Safe overlay notification
         if OVERLAY_AVAILABLE:
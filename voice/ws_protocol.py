@@ -0,0 +1,69 @@
+"""
+WebSocket Protocol Helpers for the voice clients
+Typed JSON frames (protocol=1) shared by text_chat and voice_chat
+
+Mirrors backend/app/protocol.py:
+    {"type": "chat", "text": "hi"}
+    {"type": "partial_transcript", "text": "so what do you"}
+    {"type": "cancel"}
+    {"type": "lipsync", "fps": 25, "levels": [0, 4, 9, 7, 2]}
+    {"type": "token", "text": "Hmph"}
+    {"type": "emotion", "emotion": "teasing"}
+    {"type": "end"}
+"""
+
+import json
+import os
+
+PROTOCOL_VERSION = 1
+
+# Conversation session shared by every client on this device (overlay, vision, chat)
+SESSION_ID = os.getenv("ALISA_SESSION", "default")
+
+
+# Broadcast topics the voice clients need (no vision-state, and speech-control
+# is what they send, not what they listen to)
+VOICE_TOPICS = ("tokens", "emotion")
+
+
+def ws_url(role, topics=VOICE_TOPICS):
+    """Backend chat endpoint for a client role, negotiating the JSON protocol"""
+    return (f"ws://127.0.0.1:8000/ws/chat?role={role}&protocol={PROTOCOL_VERSION}"
+            f"&subscribe={','.join(topics)}&session={SESSION_ID}")
+
+
+def encode(msg_type, **data):
+    return json.dumps({"type": msg_type, **data}, ensure_ascii=False)
+
+
+SPEECH_START = encode("speech_start")
+SPEECH_END = encode("speech_end")
+CANCEL = encode("cancel")  # Barge-in: stop generating the current reply
+
+
+def user_message(text):
+    """Encode typed/spoken user input ('/mode x' becomes a mode message)"""
+    if text.startswith("/mode"):
+        return encode("mode", mode=text.split()[-1])
+    return encode("chat", text=text)
+
+
+def partial_transcript(text):
+    """Interim STT text - lets the backend warm the LLM's cache while Whisper finishes"""
+    return encode("partial_transcript", text=text)
+
+
+def lipsync_message(levels, fps):
+    """Mouth envelope (0-9 per frame) for the segment that just started playing"""
+    return encode("lipsync", fps=fps, levels=levels)
+
+
+def decode(raw):
+    """Parse a server frame into a dict with at least a 'type' key"""
+    try:
+        msg = json.loads(raw)
+        if isinstance(msg, dict) and "type" in msg:
+            return msg
+    except ValueError:
+        pass
+    return {"type": "unknown", "raw": raw}